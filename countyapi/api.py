@@ -1,21 +1,51 @@
 from copy import copy
+from hashlib import md5
+from cStringIO import StringIO
+from tempfile import mkstemp
+from threading import Thread
 import csv
+import logging
 import os
+import time
 
-from django.http import HttpResponse
-from django.core.exceptions import ObjectDoesNotExist
+from django.conf.urls import url
+from django.http import HttpResponse, QueryDict, StreamingHttpResponse
+from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist, ValidationError
 from django.conf import settings
-from tastypie.exceptions import ApiFieldError, Unauthorized
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+from django.utils.encoding import force_text, iri_to_uri
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from tastypie import http
+from tastypie.exceptions import ApiFieldError, BadRequest, ImmediateHttpResponse, Unauthorized, UnsupportedFormat
 from tastypie.bundle import Bundle
-from tastypie.fields import ToManyField, ToOneField
+from tastypie.fields import RelatedField, ToManyField, ToOneField
 from tastypie.resources import ModelResource, ALL, ALL_WITH_RELATIONS
 from tastypie.serializers import Serializer
 from tastypie.authorization import Authorization
+from tastypie.utils import is_valid_jsonp_callback_value, trailing_slash
+from tastypie.utils.mime import build_content_type
 
+from countyapi import exports, metrics, single_flight
+from countyapi.cache import generation_path
+from countyapi.compression import GZIP, accepts_gzip, gzip_compressor, gzip_response, gzipped
+from countyapi.generation import current_generation, generation_time
 from countyapi.models import CountyInmate, CourtLocation, CourtDate, HousingLocation, HousingHistory, \
     DailyPopulationCounts, DailyBookingsCounts, ChargesHistory
+from countyapi.counts import cached_count, estimated_count
+from countyapi.paginator import JailPaginator
+from countyapi.snapshots import snapshot
+from countyapi.throttle import CostThrottle
+from countyapi.streaming import STREAMING_BUFFER_SIZE, STREAMING_CHUNK_SIZE, chunks, in_list_size, read_file, \
+    stream_objects, stream_rows
 from utils import convert_to_int
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+log = logging.getLogger('main')
 
 COUNTY_API_INMATE_RESOURCE = 'countyapi.api.CountyInmateResource'
 
@@ -45,6 +75,10 @@ HOUSING_HISTORY = 'housing_history'
 
 COURT_DATES = 'court_dates'
 
+CURRENT_CHARGE = 'current_charge'
+
+CURRENT_HOUSING_LOCATION = 'current_housing_location'
+
 GET = 'get'
 
 INMATE_JAIL_ID = 'inmate_jail_id'
@@ -63,8 +97,33 @@ INMATE = 'inmate'
 
 NEGATIVE_VALUES = {'0', 'false'}
 
+COUNT_ONLY = 'count_only'
+
+FIELDS = 'fields'
+
+CALLBACK = 'callback'
+
+JSONP = 'text/javascript'
+
+CONTENT = 'content'
+
+CONTENT_TYPE = 'content_type'
+
+FILE = 'file'
+
+CONTENT_ENCODING = 'content_encoding'
+
+
+RESPONSES = 'responses'
+
+SOFT_EXPIRES = 'soft_expires'
+
 API_PATH_FORMAT = '/api/1.0/%s/'
 
+RESOURCE_URI = 'resource_uri'
+
+URI_PLACEHOLDER = 'values-plan-pk'
+
 
 def use_caching():
     """
@@ -80,8 +139,23 @@ def cache_ttl():
     return convert_to_int(the_cache_ttl, default_ttl) if the_cache_ttl else default_ttl
 
 
+def cost_throttle():
+    return CostThrottle(throttle_at=settings.THROTTLE_BUDGET, timeframe=settings.THROTTLE_TIMEFRAME,
+                        free_cost=settings.THROTTLE_FREE_COST)
+
+
+def cache_soft_ttl():
+    """
+    Seconds cached lists are fresh for, after which they are served stale while they are rebuilt, until
+    cache_ttl() is up.
+    """
+    default_ttl = cache_ttl() / 2
+    the_cache_soft_ttl = os.environ.get('CACHE_SOFT_TTL')
+    return convert_to_int(the_cache_soft_ttl, default_ttl) if the_cache_soft_ttl else default_ttl
+
+
 if use_caching():
-    from tastypie.cache import SimpleCache
+    from countyapi.cache import GenerationCache
 
 
 DISCLAIMER = """
@@ -112,6 +186,9 @@ CHARGES_HISTORY_URL = API_PATH_FORMAT % 'chargeshistory'
 
 class JailToOneField(ToOneField):
     def dehydrate(self, bundle, for_list=False):
+        if not self.full and isinstance(self.attribute, basestring) and '__' not in self.attribute:
+            return self._dehydrate_uri(bundle)
+
         foreign_obj = None
 
         if isinstance(self.attribute, basestring):
@@ -141,8 +218,42 @@ class JailToOneField(ToOneField):
         else:
             return super(JailToOneField, self).dehydrate(bundle)
 
+    def _dehydrate_uri(self, bundle):
+        """
+        Builds the related resource's URI from the foreign key's id, so the related object is never fetched.
+        """
+        foreign_key = bundle.obj._meta.get_field(self.attribute)
+        foreign_key_id = getattr(bundle.obj, foreign_key.attname)
+        if foreign_key_id is None:
+            if not self.null:
+                raise ApiFieldError("The model '%r' has an empty attribute '%s' and doesn't allow a null value."
+                                    % (bundle.obj, self.attribute))
+
+            return None
+
+        foreign_obj = foreign_key.rel.to(pk=foreign_key_id)
+        self.fk_resource = self.get_related_resource(foreign_obj)
+        return self.fk_resource.get_resource_uri(Bundle(obj=foreign_obj, request=bundle.request))
+
 
 class JailToManyField(ToManyField):
+    def __init__(self, to, attribute, prefetch_related=None, **kwargs):
+        """
+        prefetch_related lists the relations of the related objects that their resource's dehydrate follows.
+        """
+        super(JailToManyField, self).__init__(to, attribute, **kwargs)
+        self.prefetch_related = prefetch_related or []
+
+    def prefetch_lookups(self, prefix='', nested=False):
+        """
+        Returns the QuerySet.prefetch_related lookups that load this field's objects for a whole page at once,
+        and with nested their relations as well.
+        """
+        lookups = [self.attribute]
+        if nested:
+            lookups.extend('%s__%s' % (self.attribute, lookup) for lookup in self.prefetch_related)
+        return [prefix + lookup for lookup in lookups]
+
     def dehydrate(self, bundle, for_list=False):
         if not bundle.obj or not bundle.obj.pk:
             if not self.null:
@@ -193,12 +304,207 @@ class JailToManyField(ToManyField):
                 m2m_dehydrated.append(self.dehydrate_related(m2m_bundle, m2m_resource))
 
 
+class NotCompilable(Exception):
+    pass
+
+
+class ValuesPlan(object):
+    """
+    Compiled form of a resource's full_dehydrate for one kind of request.
+
+    The plan lists the columns to read with values_list and builds, from each row, the same dict that
+    full_dehydrate followed by the resource's dehydrate put in bundle.data. Related objects shown in full are
+    read from the same row through their foreign key. Lists of related objects are loaded with one query for
+    each chunk of rows and grouped by their foreign key. Resources add what their dehydrate adds in
+    values_steps.
+
+    fields is the tree of keys to build, see requested_fields, or None for all of them. Keys left out are
+    never read from the database.
+    """
+
+    def __init__(self, resource, request, prefix='', root=None, fields=None):
+        self.resource = resource
+        self.request = request
+        self.prefix = prefix
+        self.root = root or self
+        self.fields = fields
+        self.columns = []
+        self._column_indexes = {}
+        self.steps = []
+        self.children = []
+        for name, field in resource.fields.items():
+            if self.selects(name):
+                self.steps.append((name, self._field_step(name, field)))
+        resource.values_steps(self)
+
+    @property
+    def related(self):
+        return self.request.REQUEST.get(RELATED) == '1'
+
+    def path_starts_with(self, url):
+        return self.request.path.startswith(url)
+
+    def selects(self, key):
+        return self.fields is None or key in self.fields
+
+    def selected_fields(self, key):
+        return None if self.fields is None else self.fields[key]
+
+    def column(self, name):
+        """
+        Returns the index in the row of the named column, which is read from the related object for nested plans.
+        """
+        name = self.prefix + name
+        root = self.root
+        if name not in root._column_indexes:
+            root._column_indexes[name] = len(root.columns)
+            root.columns.append(name)
+        return root._column_indexes[name]
+
+    def add_value(self, key, column):
+        if not self.selects(key):
+            return
+        index = self.column(column)
+        self.steps.append((key, lambda row: row[index]))
+
+    def add_object(self, key, resource):
+        """
+        Shows the object related through the key foreign key in full, as resource.full_dehydrate would.
+        """
+        if not self.selects(key):
+            return
+        nested = ValuesPlan(resource, self.request, self.prefix + key + '__', self.root, self.selected_fields(key))
+        if nested.children:
+            raise NotCompilable('%s shows lists of related objects' % resource.__class__.__name__)
+        pk_index = nested.column(nested.pk_name())
+        self.steps.append((key, lambda row: nested.build_one(row) if row[pk_index] is not None else None))
+
+    def add_children(self, key, resource, foreign_key):
+        """
+        Shows the list of objects related through the foreign_key of resource's model, in full.
+        """
+        if not self.selects(key):
+            return
+        child = ValuesPlan(resource, self.request, fields=self.selected_fields(key))
+        child.column(foreign_key)
+        self.column(self.pk_name())
+        self.steps.append((key, lambda row: None))
+        self.children.append((key, child, foreign_key))
+
+    def pk_name(self):
+        return self.resource._meta.object_class._meta.pk.name
+
+    def bundles(self, queryset, chunk_size=STREAMING_CHUNK_SIZE):
+        """
+        Iterates over bundles holding the dehydrated rows of the queryset, a chunk of rows at a time.
+        """
+        rows = stream_rows(queryset.prefetch_related(None).values_list(*self.columns), chunk_size)
+        for chunk in chunks(rows, in_list_size(queryset, chunk_size)):
+            for data in self.build(chunk):
+                yield Bundle(data=data, request=self.request)
+
+    def build(self, rows):
+        objects = [self.build_one(row) for row in rows]
+        if self.children:
+            pk_index = self.column(self.pk_name())
+            pks = [row[pk_index] for row in rows]
+            for key, child, foreign_key in self.children:
+                grouped = child.grouped_by(foreign_key, pks)
+                for data, pk in zip(objects, pks):
+                    data[key] = grouped.get(pk, [])
+        return objects
+
+    def build_one(self, row):
+        data = {}
+        for key, step in self.steps:
+            data[key] = step(row)
+        return data
+
+    def grouped_by(self, foreign_key, pks):
+        """
+        Returns the dehydrated objects whose foreign_key is one of pks, in lists keyed by the foreign key.
+        """
+        queryset = self.resource._meta.queryset.filter(**{foreign_key + '__in': pks})
+        rows = list(queryset.values_list(*self.columns))
+        foreign_key_index = self.column(foreign_key)
+        grouped = {}
+        for data, row in zip(self.build(rows), rows):
+            grouped.setdefault(row[foreign_key_index], []).append(data)
+        return grouped
+
+    def _field_step(self, name, field):
+        if getattr(field, 'use_in', 'all') != 'all':
+            raise NotCompilable('%s is not used in all views' % name)
+
+        if name == RESOURCE_URI:
+            index = self.column(self.pk_name())
+            uri = resource_uri_builder(self.resource)
+            return lambda row: uri(row[index])
+
+        if hasattr(self.resource, 'dehydrate_%s' % name):
+            raise NotCompilable('%s has a dehydrate method' % name)
+
+        if isinstance(field, JailToManyField):
+            # JailToManyField.dehydrate never returns the related objects it dehydrates
+            return lambda row: None
+
+        if isinstance(field, JailToOneField) and not field.full and isinstance(field.attribute, basestring):
+            index = self.column(field.attribute)
+            related_resource = field.to_class()
+            if related_resource._meta.api_name is None:
+                related_resource._meta.api_name = self.resource._meta.api_name
+            uri = resource_uri_builder(related_resource)
+
+            def related_step(row):
+                if row[index] is None:
+                    if not field.null:
+                        raise ApiFieldError("The model has an empty attribute '%s' and doesn't allow a null value."
+                                            % field.attribute)
+                    return None
+                return uri(row[index])
+            return related_step
+
+        if isinstance(field, RelatedField):
+            raise NotCompilable('%s is a related field' % name)
+
+        if field.attribute is None:
+            value = field.convert(field.default) if field.has_default() else None
+            return lambda row: value
+
+        index = self.column(field.attribute)
+
+        def value_step(row):
+            value = row[index]
+            if value is None:
+                if field.has_default():
+                    value = field._default
+                    if callable(value):
+                        value = value()
+                elif not field.null:
+                    raise ApiFieldError("The object has an empty attribute '%s' and doesn't allow a default or null "
+                                        "value." % field.attribute)
+            return field.convert(value)
+        return value_step
+
+
+def resource_uri_builder(resource):
+    """
+    Returns a function building the resource's detail URIs from primary keys, reversing the URL only once.
+    """
+    template = resource.get_resource_uri(resource._meta.object_class(pk=URI_PLACEHOLDER))
+    if URI_PLACEHOLDER not in template:
+        return lambda pk: resource.get_resource_uri(resource._meta.object_class(pk=pk))
+    prefix, suffix = template.split(URI_PLACEHOLDER)
+    return lambda pk: prefix + iri_to_uri(force_text(pk)) + suffix
+
+
 class JailSerializer(Serializer):
     """
-    Serialize to json, jsonp, xml, and csv.
+    Serialize to json, jsonp, xml, csv, newline delimited json and MessagePack.
     """
 
-    formats = ['json', 'jsonp', 'xml', 'csv']
+    formats = ['json', 'jsonp', 'xml', 'csv', 'ndjson', 'msgpack']
+    streaming_formats = ['csv', 'json', 'jsonp', 'ndjson', 'msgpack']
     content_types = {
         'json': 'application/json',
         'jsonp': 'text/javascript',
@@ -207,6 +513,8 @@ class JailSerializer(Serializer):
         'html': 'text/html',
         'plist': 'application/x-plist',
         'csv': TEXT_CSV,
+        'ndjson': 'application/x-ndjson',
+        'msgpack': 'application/x-msgpack',
     }
 
     def to_csv(self, data, options=None):
@@ -219,13 +527,96 @@ class JailSerializer(Serializer):
         response['Content-Disposition'] = 'attachment; filename="cookcountyjail.csv"'
 
         writer = csv.writer(response)
-        writer.writerow(data[OBJECTS][0].keys())
+        rows = data[OBJECTS] if OBJECTS in data else [data[META]]
+        if rows:
+            # an empty page has no header, as when streamed
+            writer.writerow(rows[0].keys())
 
-        for item in data[OBJECTS]:
+        for item in rows:
             writer.writerow(item.values())
 
         return response
 
+    def streams(self, format):
+        return any(format == self.content_types[short_format] for short_format in self.streaming_formats)
+
+    def stream(self, data, format, options=None):
+        """
+        Given list data whose objects are an iterator of bundles, returns an iterator over the data serialized
+        in the given format, serializing one object at a time.
+        """
+        for short_format in self.streaming_formats:
+            if format == self.content_types[short_format]:
+                return getattr(self, 'stream_%s' % short_format)(data, options or {})
+
+        raise UnsupportedFormat("The format indicated '%s' has no streaming serialization method." % format)
+
+    def stream_csv(self, data, options):
+        """
+        Write to the same CSV format as to_csv, a buffer full of rows at a time.
+        """
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        header_written = False
+
+        for item in data[OBJECTS]:
+            item = self.to_simple(item, options)
+            if not header_written:
+                writer.writerow(item.keys())
+                header_written = True
+            writer.writerow(item.values())
+            if buffer.tell() >= STREAMING_BUFFER_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def stream_json(self, data, options):
+        """
+        Write the same JSON as to_json, the meta straight away and then the objects a buffer full at a time.
+        """
+        yield u'{"%s": %s, "%s": [' % (META, self.to_json(data[META], options), OBJECTS)
+
+        objects = (self.to_json(item, options) for item in data[OBJECTS])
+        for json in buffered(separated(objects, u', ')):
+            yield json
+
+        yield u']}'
+
+    def stream_jsonp(self, data, options):
+        """
+        Write the same JSONP as to_jsonp, wrapping the streamed JSON in the callback.
+        """
+        yield u'%s(' % options['callback']
+        for json in self.stream_json(data, options):
+            yield json.replace(u'\u2028', u'\\u2028').replace(u'\u2029', u'\\u2029')
+        yield u')'
+
+    def to_ndjson(self, data, options=None):
+        return u''.join(self.stream_ndjson(data, options or {}))
+
+    def stream_ndjson(self, data, options):
+        """
+        Write newline delimited JSON, a line for each object of a list or a single line for a detail. Lists
+        leave out the meta so every line is an object.
+        """
+        return buffered(self.to_json(item, options) + u'\n' for item in list_objects(data))
+
+    def to_msgpack(self, data, options=None):
+        return ''.join(self.stream_msgpack(data, options or {}))
+
+    def stream_msgpack(self, data, options):
+        """
+        Write a MessagePack map for each object of a list, or a single one for a detail. Lists leave out the
+        meta so the stream is made of objects only.
+        """
+        if msgpack is None:
+            raise ImproperlyConfigured("Usage of the msgpack format requires msgpack-python.")
+
+        return buffered(msgpack.packb(self.to_simple(item, options)) for item in list_objects(data))
+
 
 class JailAuthorization(Authorization):
 
@@ -270,6 +661,9 @@ class JailResource(ModelResource):
     """
     ModelResource overrides for our project. Add caching and disclaimer.
     """
+    use_values_plan = True
+    caches_lists = use_caching()
+
     def __init__(self, api_name=None):
         """
         Patched init that doesn't use deepcopy,
@@ -280,17 +674,580 @@ class JailResource(ModelResource):
         if api_name:
             self._meta.api_name = api_name
 
+    def prepend_urls(self):
+        """
+        Lets long lists of identifiers be posted to set/ rather than put in the URL.
+        """
+        return [
+            url(r'^(?P<resource_name>%s)/set%s$' % (self._meta.resource_name, trailing_slash()),
+                self.wrap_view('get_multiple'), name='api_post_multiple'),
+        ]
+
+    def get_object_list(self, request):
+        """
+        Prefetches the relations dehydrate follows for this request, so a page costs a fixed number of queries.
+        """
+        object_list = super(JailResource, self).get_object_list(request)
+        lookups = self.prefetch_related_lookups(request)
+        if lookups:
+            object_list = object_list.prefetch_related(*lookups)
+        return object_list
+
+    def prefetch_related_lookups(self, request):
+        return []
+
+    def get_list(self, request, **kwargs):
+        """
+        Serves the list from the cache. The first request for a list that is not cached builds it, while the
+        same request in any worker waits for it to be cached rather than building it too, see single_flight.
+        A request that waits longer than settings.SINGLE_FLIGHT_WAIT_TIMEOUT builds the list itself.
+
+        Cached lists are fresh for cache_soft_ttl() seconds and kept for the resource cache's timeout. In
+        between, the stale list is served straight away while one request rebuilds it in the background.
+
+        Lists are built and cached for the canonical_request, so the same list asked for differently is cached
+        once, and JSONP lists with the default callback, which is replaced by the requested one when served.
+
+        Lists are cached gzipped, and sent as they are to clients accepting gzip, see gzip_response.
+
+        Whole lists asked for without filters are sent from their snapshot export once it has been made for
+        the current scrape generation, see snapshot_response.
+        """
+        callback = jsonp_callback(request) if self.determine_format(request) == JSONP else None
+        canonical = self.canonical_request(request)
+        replace_callback = callback not in (None, CALLBACK)
+        if replace_callback:
+            # the callback is replaced in the JSON, not in gzip
+            canonical.META.pop('HTTP_ACCEPT_ENCODING', None)
+        response = self.snapshot_response(canonical)
+        if response is None and not self.caches_lists:
+            response = self.costly_response(canonical, **kwargs)
+            return response if response is not None else self.build_list(request, **kwargs)
+        if response is None:
+            response = self.cached_list(canonical, **kwargs)
+        if replace_callback:
+            response = with_callback(response, callback)
+        if response.streaming:
+            request.streaming_response = response
+        return response
+
+    def snapshot_response(self, request):
+        """
+        Returns the response sending the snapshot export of the whole list the canonical request asks for
+        when it has no other parameter than limit=0 and the format, or None when there is no such snapshot.
+        See countyapi.snapshots.
+        """
+        params = request.GET
+        if params.getlist('limit') != ['0'] or set(params) - {'limit', 'format'}:
+            return None
+        desired_format = self.determine_format(request)
+        short_formats = [short_format for short_format in self._meta.serializer.formats
+                         if self._meta.serializer.content_types.get(short_format) == desired_format]
+        entry = snapshot(self._meta.resource_name, short_formats[0]) if short_formats else None
+        if entry is None:
+            return None
+        try:
+            content = open(entry['path'], 'rb')
+        except IOError:
+            # removed by a newer export in between
+            return None
+        metrics.increment('snapshot_hits')
+        return gzip_response(request, read_file(content), entry['content_type'], streaming=True)
+
+    def costly_response(self, request, **kwargs):
+        """
+        Charges the client for the cost of building the list, see request_cost and countyapi.throttle, responding
+        with Too Many Requests when the client's budget is spent. Returns the redirection to the export job of
+        the list, see countyapi.exports, when it would cost more than settings.FOREGROUND_COST_LIMIT, otherwise
+        None.
+        """
+        cost = self.request_cost(request, **kwargs)
+        self.charge(request, cost)
+        if cost <= settings.FOREGROUND_COST_LIMIT:
+            return None
+        metrics.increment('export_redirects')
+        job = exports.submit(*exports.list_query(request.get_full_path()))
+        return exports.job_response(job, status=http.HttpSeeOther.status_code)
+
+    def charge(self, request, cost):
+        identifier = client_identifier(request)
+        retry_after = self._meta.throttle.should_be_throttled(identifier, cost=cost)
+        if retry_after:
+            metrics.increment('throttled')
+            response = http.HttpTooManyRequests()
+            response['Retry-After'] = str(retry_after)
+            raise ImmediateHttpResponse(response=response)
+        self._meta.throttle.accessed(identifier, cost=cost)
+
+    def canonical_request(self, request):
+        """
+        Returns a copy of the request whose parameters are sorted, without the JSONP callback and the
+        parameters set to their default value.
+        """
+        defaults = {'offset': '0', 'limit': str(self._meta.limit)}
+        params = QueryDict('', mutable=True)
+        for key in sorted(request.GET):
+            values = request.GET.getlist(key)
+            if key == CALLBACK or values == [defaults.get(key)]:
+                continue
+            if key == COUNT_ONLY and all(value.lower() in NEGATIVE_VALUES for value in values):
+                continue
+            if key == RELATED and '1' not in values:
+                continue
+            params.setlist(key, values)
+
+        canonical = copy(request)
+        canonical.GET = params
+        canonical.META = dict(request.META)
+        # REQUEST merges GET and POST once read
+        canonical.__dict__.pop('_request', None)
+        return canonical
+
+    def cached_list(self, request, **kwargs):
+        cache_key = self.list_cache_key(request)
+        cached = self._meta.cache.get(cache_key)
+        response = self.cached_response(request, cached)
+        if response is not None:
+            if cached[SOFT_EXPIRES] > time.time():
+                metrics.increment('list_cache_hits')
+            else:
+                metrics.increment('list_cache_stale_hits')
+                self.revalidate(request, cache_key, **kwargs)
+            return response
+
+        response = self.costly_response(request, **kwargs)
+        if response is not None:
+            return response
+
+        # a request that waited in vain builds the list too, leaving the lock to the request holding it
+        owns_lock = single_flight.acquire(cache_key)
+        if owns_lock:
+            # the request that held the lock before may have cached the list in between
+            response = self.cached_response(request, self._meta.cache.get(cache_key))
+            if response is not None:
+                single_flight.release(cache_key)
+                return response
+        else:
+            metrics.increment('list_cache_waits')
+            response = single_flight.wait_for(
+                cache_key, lambda: self.cached_response(request, self._meta.cache.get(cache_key)))
+            if response is not None:
+                return response
+            metrics.increment('list_cache_wait_misses')
+
+        metrics.increment('list_cache_computes')
+        try:
+            response = self.build_list(request, **kwargs)
+        except Exception:
+            if owns_lock:
+                single_flight.release(cache_key)
+            raise
+        return self.cache_response(request, cache_key, response, owns_lock)
+
+    def list_cache_key(self, request):
+        """
+        Returns the cache key of the list, the same for the same parameters in any order.
+        See canonical_request.
+        """
+        params = sorted((key, value) for key in request.GET for value in request.GET.getlist(key))
+        digest = md5(repr((request.path, self.determine_format(request), params))).hexdigest()
+        return self.generate_cache_key('list', digest)
+
+    def revalidate(self, request, cache_key, **kwargs):
+        """
+        Rebuilds and caches the stale list in the background, unless a request in any worker already is.
+        """
+        # the copy this worker keeps may be older than the shared one, which is read instead from now on
+        self._meta.cache.forget(cache_key)
+        if not single_flight.acquire(cache_key):
+            return
+        cached = self._meta.cache.get(cache_key)
+        if cached is not None and cached[SOFT_EXPIRES] > time.time():
+            # already refreshed by another worker
+            single_flight.release(cache_key)
+            return
+
+        refresh_request = copy(request)
+        if hasattr(refresh_request, 'streaming_response'):
+            del refresh_request.streaming_response
+
+        def refresh():
+            try:
+                response = self.build_list(refresh_request, **kwargs)
+            except Exception:
+                single_flight.release(cache_key)
+                log.exception('Could not refresh %s', request.get_full_path())
+                return
+            response = self.cache_response(refresh_request, cache_key, response)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+
+        metrics.increment('list_cache_refreshes')
+        self.start_refresh(refresh)
+
+    def start_refresh(self, refresh):
+        def run():
+            try:
+                refresh()
+            finally:
+                connection.close()
+        Thread(target=run).start()
+
+    def cached_response(self, request, cached):
+        """
+        Returns the response from the cached entry, or None when it is not cached. Streamed responses are sent
+        from the file they were cached in, a buffer full at a time.
+        """
+        if cached is None:
+            return None
+        if FILE not in cached:
+            if cached.get(CONTENT_ENCODING) == GZIP:
+                return gzip_response(request, cached[CONTENT], cached[CONTENT_TYPE])
+            return HttpResponse(cached[CONTENT], content_type=cached[CONTENT_TYPE])
+        try:
+            content = open(cached[FILE], 'rb')
+        except IOError:
+            # removed with the generation it was cached in
+            return None
+        if cached.get(CONTENT_ENCODING) == GZIP:
+            return gzip_response(request, read_file(content), cached[CONTENT_TYPE], streaming=True)
+        request.streaming_response = StreamingHttpResponse(read_file(content), content_type=cached[CONTENT_TYPE])
+        return request.streaming_response
+
+    def cache_response(self, request, cache_key, response, owns_lock=True):
+        """
+        Caches successful responses gzipped and releases the lock of the cache key, when this request owns it,
+        once a streamed response has been sent whole. Streamed responses are compressed to a file as they are
+        sent rather than held in memory, and the cache keeps the path of the file.
+        """
+        def release():
+            if owns_lock:
+                single_flight.release(cache_key)
+
+        if response.status_code != 200:
+            release()
+            return response
+        if not response.streaming:
+            content = gzipped(response.content)
+            self._meta.cache.set(cache_key, {CONTENT: content, CONTENT_TYPE: response['Content-Type'],
+                                             CONTENT_ENCODING: GZIP, SOFT_EXPIRES: time.time() + cache_soft_ttl()})
+            release()
+            return gzip_response(request, content, response['Content-Type'])
+
+        path = generation_path(RESPONSES, md5(cache_key).hexdigest())
+
+        def caching_stream(content, send_gzip):
+            temporary_name = None
+            compressor = gzip_compressor()
+            try:
+                if not os.path.isdir(os.path.dirname(path)):
+                    try:
+                        os.makedirs(os.path.dirname(path))
+                    except OSError:
+                        # made by another worker in between
+                        pass
+                fd, temporary_name = mkstemp(dir=os.path.dirname(path))
+                with os.fdopen(fd, 'wb') as cached_file:
+                    for chunk in content:
+                        compressed = compressor.compress(chunk)
+                        cached_file.write(compressed)
+                        if not send_gzip:
+                            yield chunk
+                        elif compressed:
+                            yield compressed
+                    compressed = compressor.flush()
+                    cached_file.write(compressed)
+                    if send_gzip:
+                        yield compressed
+                os.rename(temporary_name, path)
+                temporary_name = None
+                self._meta.cache.set(cache_key, {FILE: path, CONTENT_TYPE: response['Content-Type'],
+                                                 CONTENT_ENCODING: GZIP, SOFT_EXPIRES: time.time() + cache_soft_ttl()})
+            finally:
+                if temporary_name is not None:
+                    os.remove(temporary_name)
+                release()
+
+        send_gzip = accepts_gzip(request)
+        request.streaming_response = StreamingHttpResponse(caching_stream(response.streaming_content, send_gzip),
+                                                           content_type=response['Content-Type'])
+        if send_gzip:
+            request.streaming_response['Content-Encoding'] = GZIP
+        patch_vary_headers(request.streaming_response, ['Accept-Encoding'])
+        return request.streaming_response
+
+    def build_list(self, request, **kwargs):
+        """
+        Builds the list with the resource's values plan when it has one, rather than with full_dehydrate.
+        Whole lists, limit=0, in the serializer's streaming formats are streamed instead of built in memory,
+        the objects are read from the database and dehydrated a chunk at a time as the response is sent.
+        count_only=1 responds with just the meta and its total_count, no objects are read.
+        """
+        desired_format = self.determine_format(request)
+        plan = self.values_plan(request)
+        streamed = self._meta.serializer.streams(desired_format)
+        count_only = request.GET.get(COUNT_ONLY, '0').lower() not in NEGATIVE_VALUES
+        if plan is None and not streamed and not count_only:
+            return super(JailResource, self).get_list(request, **kwargs)
+
+        paginator = self.list_paginator(request, **kwargs)
+        if count_only:
+            return self.create_response(request,
+                                        self.alter_list_data_to_serialize(request, paginator.count_page()))
+
+        streamed = streamed and paginator.get_limit() == 0
+        if plan is None and not streamed:
+            return super(JailResource, self).get_list(request, **kwargs)
+
+        to_be_serialized = paginator.page()
+        page_objects = to_be_serialized[self._meta.collection_name]
+        if plan is None:
+            bundles = self.dehydrate_stream(request, page_objects)
+        else:
+            bundles = plan.bundles(page_objects)
+        to_be_serialized[self._meta.collection_name] = bundles if streamed else list(bundles)
+        to_be_serialized = self.alter_list_data_to_serialize(request, to_be_serialized)
+        if not streamed:
+            return self.create_response(request, to_be_serialized)
+
+        request.streaming_response = StreamingHttpResponse(
+            self.serialize_stream(request, to_be_serialized, desired_format),
+            content_type=build_content_type(desired_format))
+        return request.streaming_response
+
+    def list_paginator(self, request, **kwargs):
+        base_bundle = self.build_bundle(request=request)
+        objects = self.obj_get_list(bundle=base_bundle, **self.remove_api_resource_names(kwargs))
+        sorted_objects = self.apply_sorting(objects, options=request.GET)
+        return self._meta.paginator_class(request.GET, sorted_objects, resource_uri=self.get_resource_uri(),
+                                          limit=self._meta.limit, max_limit=self._meta.max_limit,
+                                          collection_name=self._meta.collection_name)
+
+    def request_cost(self, request, **kwargs):
+        """
+        Returns the estimated cost of the list request, the number of objects it reads times the depth of
+        the relations it shows: 1, plus the lists of related objects each object shows with related=1.
+        Pages cost their limit, only whole lists, limit=0, are counted, and count_only=1 costs nothing.
+        """
+        if request.GET.get(COUNT_ONLY, '0').lower() not in NEGATIVE_VALUES:
+            return 0
+        paginator = self.list_paginator(request, **kwargs)
+        rows = paginator.get_limit()
+        if rows == 0:
+            rows = estimated_count(paginator.objects)
+            if rows is None:
+                rows = cached_count(paginator.objects)
+        depth = 1
+        if request.GET.get(RELATED) == '1':
+            depth += len([field for field in self.fields.values() if isinstance(field, ToManyField)])
+        return rows * depth
+
+    def get_detail(self, request, **kwargs):
+        """
+        Builds the detail with the resource's values plan when it has one, rather than with full_dehydrate.
+        """
+        plan = self.values_plan(request)
+        if plan is None:
+            return super(JailResource, self).get_detail(request, **kwargs)
+
+        kwargs = self.remove_api_resource_names(kwargs)
+        cache_key = self.values_detail_cache_key(request, plan, **kwargs)
+        data = self._meta.cache.get(cache_key)
+        if data is None:
+            rows = list(self.get_object_list(request).filter(**kwargs)[:2].prefetch_related(None)
+                        .values_list(*plan.columns))
+            if not rows:
+                return http.HttpNotFound()
+            if len(rows) > 1:
+                return http.HttpMultipleChoices("More than one resource is found at this URI.")
+            data = plan.build(rows)[0]
+            self._meta.cache.set(cache_key, data)
+
+        bundle = self.build_bundle(request=request)
+        bundle.data = data
+        bundle = self.alter_detail_data_to_serialize(request, bundle)
+        return self.create_response(request, bundle)
+
+    def get_multiple(self, request, **kwargs):
+        """
+        Returns the objects whose identifiers are in the URL, separated by semicolons, or, for long lists,
+        posted to set/ as a JSON list. The details get_detail cached are reused, the other objects are read
+        with one query for each chunk of identifiers, plus one for each list of related objects they show.
+        """
+        self.method_check(request, allowed=[GET, POST])
+        self.is_authenticated(request)
+        self.throttle_check(request)
+
+        identifiers = self.multiple_identifiers(request, kwargs)
+        plan = self.values_plan(request)
+        objects_data = {}
+        missing = []
+        for identifier in set(identifiers):
+            data = None
+            if plan is not None:
+                data = self._meta.cache.get(self.values_detail_cache_key(request, plan, pk=identifier))
+            if data is None:
+                missing.append(identifier)
+            else:
+                objects_data[identifier] = data
+        objects_data.update(self.multiple_data(request, plan, missing))
+
+        objects = []
+        not_found = []
+        for identifier in identifiers:
+            if identifier in objects_data:
+                objects.append(select_fields(Bundle(data=objects_data[identifier], request=request),
+                                             requested_fields(request)))
+            else:
+                not_found.append(identifier)
+
+        object_list = {
+            self._meta.collection_name: objects,
+        }
+        if not_found:
+            object_list['not_found'] = not_found
+
+        self.log_throttled_access(request)
+        return self.create_response(request, object_list)
+
+    def multiple_identifiers(self, request, kwargs):
+        identifiers = [identifier for identifier in kwargs.get('%s_list' % self._meta.detail_uri_name, '').split(';')
+                       if identifier]
+        if request.method == 'POST':
+            try:
+                posted = self.deserialize(request, request.body,
+                                          format=request.META.get('CONTENT_TYPE', 'application/json'))
+            except (UnsupportedFormat, ValueError):
+                raise BadRequest('Post the identifiers as a JSON list.')
+            if not isinstance(posted, list):
+                raise BadRequest('Post a list of identifiers.')
+            identifiers.extend(force_text(identifier) for identifier in posted)
+        return identifiers
+
+    def multiple_data(self, request, plan, identifiers):
+        """
+        Returns the dehydrated data of the objects with the identifiers, keyed by identifier, caching the
+        details built with the values plan.
+        """
+        pk_field = self._meta.object_class._meta.pk
+        pks = {}
+        for identifier in identifiers:
+            try:
+                pks[pk_field.to_python(identifier)] = identifier
+            except ValidationError:
+                pass
+
+        objects_data = {}
+        object_list = self.get_object_list(request)
+        lookup = '%s__in' % self._meta.detail_uri_name
+        for chunk in chunks(pks.keys(), in_list_size(object_list)):
+            if plan is None:
+                for obj in object_list.filter(**{lookup: chunk}):
+                    bundle = self.full_dehydrate(self.build_bundle(obj=obj, request=request), for_list=True)
+                    objects_data[pks[obj.pk]] = bundle.data
+                continue
+
+            pk_index = plan.column(plan.pk_name())
+            rows = list(object_list.filter(**{lookup: chunk}).prefetch_related(None).values_list(*plan.columns))
+            for row, data in zip(rows, plan.build(rows)):
+                identifier = pks[row[pk_index]]
+                self._meta.cache.set(self.values_detail_cache_key(request, plan, pk=identifier), data)
+                objects_data[identifier] = data
+        return objects_data
+
+    def values_detail_cache_key(self, request, plan, **kwargs):
+        return self.generate_cache_key('values_detail', related=plan.related, fields=request.GET.get(FIELDS, ''),
+                                       **kwargs)
+
+    def values_plan(self, request):
+        """
+        Returns the compiled values plan for the request, or None when a field can only be dehydrated from
+        model instances.
+        """
+        if not self.use_values_plan:
+            return None
+        try:
+            return ValuesPlan(self, request, fields=requested_fields(request))
+        except NotCompilable:
+            return None
+
+    def values_steps(self, plan):
+        """
+        Adds to the plan what the resource's dehydrate adds to bundle.data, see ValuesPlan.
+        """
+        pass
+
+    def serialize_stream(self, request, data, format, options=None):
+        """
+        Streaming counterpart of serialize, returns an iterator over the serialized data.
+        """
+        options = options or {}
+
+        if JSONP in format:
+            options['callback'] = jsonp_callback(request)
+
+        return self._meta.serializer.stream(data, format, options)
+
+    def dispatch(self, request_type, request, **kwargs):
+        """
+        Lets streamed responses through, tastypie's dispatch replaces any response that is not an HttpResponse
+        with an empty one.
+
+        The data only changes when a scrape completes, so GET responses carry an ETag and a Last-Modified of
+        the scrape generation, and requests whose If-None-Match or If-Modified-Since they match are answered
+        with Not Modified before anything is read or serialized.
+        """
+        if request.method != 'GET':
+            response = super(JailResource, self).dispatch(request_type, request, **kwargs)
+            return getattr(request, 'streaming_response', response)
+
+        etag = self.etag(request)
+        last_modified = generation_time()
+        if not_modified(request, etag, last_modified):
+            metrics.increment('not_modified')
+            response = http.HttpNotModified()
+        else:
+            response = super(JailResource, self).dispatch(request_type, request, **kwargs)
+            response = getattr(request, 'streaming_response', response)
+        if response.status_code in (200, 304):
+            gzipped_response = response.get('Content-Encoding') == GZIP
+            if gzipped_response or (response.status_code == 304 and self.caches_lists and accepts_gzip(request)):
+                etag = gzip_etag(etag)
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def etag(self, request):
+        """
+        Returns the ETag of the response to the GET request for the current scrape generation, the same for
+        requests canonical_request makes the same except for their JSONP callback.
+        """
+        digest = md5(repr((self.list_cache_key(self.canonical_request(request)), request.GET.get(CALLBACK))))
+        return quote_etag('%d-%s' % (current_generation(), digest.hexdigest()))
+
+    def dehydrate_stream(self, request, objects):
+        for obj in stream_objects(objects):
+            bundle = self.build_bundle(obj=obj, request=request)
+            yield self.full_dehydrate(bundle, for_list=True)
+
     def alter_detail_data_to_serialize(self, request, data):
         """
-        Add message to data.
+        Keep the requested fields and add message to data.
         """
+        data = select_fields(data, requested_fields(request))
         data.data[ABOUT_THIS_DATA] = DISCLAIMER
         return data
 
     def alter_list_data_to_serialize(self, request, data):
         """
-        Add message to meta.
+        Keep the requested fields of the objects and add message to meta.
         """
+        fields = requested_fields(request)
+        if fields is not None and OBJECTS in data:
+            objects = (select_fields(bundle, fields) for bundle in data[OBJECTS])
+            data[OBJECTS] = list(objects) if isinstance(data[OBJECTS], list) else objects
         data[META][ABOUT_THIS_DATA] = DISCLAIMER
         return data
 
@@ -305,19 +1262,29 @@ class CourtLocationResource(JailResource):
         limit = 100
         max_limit = 0
         if use_caching():
-            cache = SimpleCache(timeout=cache_ttl())
+            cache = GenerationCache(timeout=cache_ttl())
+        throttle = cost_throttle()
         serializer = JailSerializer()
+        paginator_class = JailPaginator
         filtering = {
             LOCATION: ALL,
         }
 
+    def prefetch_related_lookups(self, request):
+        if shows_nested_objects(request, COURT_LOCATION_URL):
+            return [COURT_DATES]
+        return []
+
+    def values_steps(self, plan):
+        if plan.path_starts_with(COURT_LOCATION_URL) and shows_nested_objects(plan.request, COURT_LOCATION_URL):
+            plan.add_children(COURT_DATES, CourtDateResource(), LOCATION)
+
     def dehydrate(self, bundle, for_list=False):
         """
         Show court dates in location lists and detail views.
         """
         if request_path_starts_with(bundle, COURT_LOCATION_URL) and \
-                (bundle.request.path != COURT_LOCATION_URL or
-                 has_related_request(bundle)):
+                shows_nested_objects(bundle.request, COURT_LOCATION_URL):
             dates = bundle.obj.court_dates.all()
             resource = CourtDateResource()
             bundle.data[COURT_DATES] = []
@@ -336,13 +1303,15 @@ class CourtDateResource(JailResource):
     inmate = JailToOneField(COUNTY_API_INMATE_RESOURCE, INMATE, null=True, full=False)
 
     class Meta:
-        queryset = CourtDate.objects.select_related(LOCATION).select_related(INMATE).all()
+        queryset = CourtDate.objects.select_related(LOCATION, INMATE).all()
         allowed_methods = [GET]
         limit = 100
         max_limit = 0
         if use_caching():
-            cache = SimpleCache(timeout=cache_ttl())
+            cache = GenerationCache(timeout=cache_ttl())
+        throttle = cost_throttle()
         serializer = JailSerializer()
+        paginator_class = JailPaginator
         filtering = {
             DATE: ALL,
             LOCATION: ALL_WITH_RELATIONS,
@@ -350,6 +1319,24 @@ class CourtDateResource(JailResource):
         }
         ordering = filtering.keys()
 
+    def prefetch_related_lookups(self, request):
+        if request.path.startswith(COURT_DATE_URL) and request.REQUEST.get(RELATED) == '1':
+            return inmate_prefetch_lookups()
+        return []
+
+    def values_steps(self, plan):
+        if plan.path_starts_with(COURT_LOCATION_URL):
+            plan.add_value(INMATE, INMATE)
+        if plan.path_starts_with(COUNTY_INMATE_URL):
+            plan.add_object(LOCATION, CourtLocationResource())
+        if plan.path_starts_with(COURT_DATE_URL) and not plan.related:
+            plan.add_value(LOCATION_ID, LOCATION)
+            plan.add_value(LOCATION, LOCATION + '__' + LOCATION)
+            plan.add_value(INMATE_JAIL_ID, INMATE)
+        if plan.path_starts_with(COURT_DATE_URL) and plan.related:
+            plan.add_object(INMATE, CountyInmateResource())
+            plan.add_object(LOCATION, CourtLocationResource())
+
     def dehydrate(self, bundle, for_list=False):
         """
         Set up bidirectional relationships based on request.
@@ -357,7 +1344,7 @@ class CourtDateResource(JailResource):
 
         # Include inmate ID when called from location
         if request_path_starts_with(bundle, COURT_LOCATION_URL):
-            bundle.data[INMATE] = bundle.obj.inmate.pk
+            bundle.data[INMATE] = bundle.obj.inmate_id
 
         # Include location when called from inmate
         if request_path_starts_with(bundle, COUNTY_INMATE_URL):
@@ -368,9 +1355,9 @@ class CourtDateResource(JailResource):
 
         # Include primary keys on court dates
         if request_path_starts_with(bundle, COURT_DATE_URL) and not has_related_request(bundle):
-            bundle.data[LOCATION_ID] = bundle.obj.location.pk
+            bundle.data[LOCATION_ID] = bundle.obj.location_id
             bundle.data[LOCATION] = bundle.obj.location.location
-            bundle.data[INMATE_JAIL_ID] = bundle.obj.inmate.pk
+            bundle.data[INMATE_JAIL_ID] = bundle.obj.inmate_id
 
         # Include full inmate in related query
         if request_path_starts_with(bundle, COURT_DATE_URL) and has_related_request(bundle):
@@ -398,8 +1385,10 @@ class HousingLocationResource(JailResource):
         limit = 100
         max_limit = 0
         if use_caching():
-            cache = SimpleCache(timeout=cache_ttl())
+            cache = GenerationCache(timeout=cache_ttl())
+        throttle = cost_throttle()
         serializer = JailSerializer()
+        paginator_class = JailPaginator
         filtering = {
             HOUSING_LOCATION: ALL,
             'division': ALL,
@@ -420,13 +1409,15 @@ class HousingHistoryResource(JailResource):
     inmate = JailToOneField(COUNTY_API_INMATE_RESOURCE, INMATE, null=True, full=False)
 
     class Meta:
-        queryset = HousingHistory.objects.select_related(LOCATION).select_related(INMATE).all()
+        queryset = HousingHistory.objects.select_related(HOUSING_LOCATION, INMATE).all()
         allowed_methods = [GET]
         serializer = JailSerializer()
+        paginator_class = JailPaginator
         limit = 100
         max_limit = 0
         if use_caching():
-            cache = SimpleCache(timeout=cache_ttl())
+            cache = GenerationCache(timeout=cache_ttl())
+        throttle = cost_throttle()
         filtering = {
             INMATE: ALL_WITH_RELATIONS,
             HOUSING_DATE_DISCOVERED: ALL,
@@ -434,6 +1425,23 @@ class HousingHistoryResource(JailResource):
         }
         ordering = filtering.keys()
 
+    def prefetch_related_lookups(self, request):
+        if request.path.startswith(HOUSING_HISTORY_URL) and request.REQUEST.get(RELATED) == '1':
+            return inmate_prefetch_lookups()
+        return []
+
+    def values_steps(self, plan):
+        if plan.path_starts_with(HISTORY_LOCATION_URL):
+            plan.add_value(INMATE, INMATE)
+        if plan.path_starts_with(COUNTY_INMATE_URL):
+            plan.add_object(HOUSING_LOCATION, HousingLocationResource())
+        if plan.path_starts_with(HOUSING_HISTORY_URL) and not plan.related:
+            plan.add_value(LOCATION_ID, HOUSING_LOCATION)
+            plan.add_value(INMATE_JAIL_ID, INMATE)
+        if plan.path_starts_with(HOUSING_HISTORY_URL) and plan.related:
+            plan.add_object(INMATE, CountyInmateResource())
+            plan.add_object(HOUSING_LOCATION, HousingLocationResource())
+
     def dehydrate(self, bundle, for_list=False):
         """
         Set up bidirectional relationships based on request.
@@ -441,7 +1449,7 @@ class HousingHistoryResource(JailResource):
 
         # Include inmate ID when called from location
         if request_path_starts_with(bundle, HISTORY_LOCATION_URL):
-            bundle.data[INMATE] = bundle.obj.inmate.pk
+            bundle.data[INMATE] = bundle.obj.inmate_id
 
         # Include location when called from inmate
         if request_path_starts_with(bundle, COUNTY_INMATE_URL):
@@ -453,8 +1461,8 @@ class HousingHistoryResource(JailResource):
         # Include primary keys on court dates
         if request_path_starts_with(bundle, HOUSING_HISTORY_URL) and not \
                 has_related_request(bundle):
-            bundle.data[LOCATION_ID] = bundle.obj.housing_location.pk
-            bundle.data[INMATE_JAIL_ID] = bundle.obj.inmate.pk
+            bundle.data[LOCATION_ID] = bundle.obj.housing_location_id
+            bundle.data[INMATE_JAIL_ID] = bundle.obj.inmate_id
 
         # Include full inmate in related query
         if request_path_starts_with(bundle, HOUSING_HISTORY_URL) and \
@@ -482,10 +1490,12 @@ class ChargesHistoryResource(JailResource):
         queryset = ChargesHistory.objects.select_related(INMATE).all()
         allowed_methods = [GET]
         serializer = JailSerializer()
+        paginator_class = JailPaginator
         limit = 100
         max_limit = 0
         if use_caching():
-            cache = SimpleCache(timeout=cache_ttl())
+            cache = GenerationCache(timeout=cache_ttl())
+        throttle = cost_throttle()
         filtering = {
             INMATE: ALL_WITH_RELATIONS,
             'charges': ALL,
@@ -495,6 +1505,12 @@ class ChargesHistoryResource(JailResource):
         }
         ordering = filtering.keys()
 
+    def values_steps(self, plan):
+        if plan.path_starts_with(CHARGES_HISTORY_URL) and not plan.related:
+            plan.add_value(INMATE_JAIL_ID, INMATE)
+        if plan.path_starts_with(HOUSING_HISTORY_URL) and plan.related:
+            plan.add_object(INMATE, CountyInmateResource())
+
     def dehydrate(self, bundle, for_list=False):
         """
         Set up bidirectional relationships based on request.
@@ -503,7 +1519,7 @@ class ChargesHistoryResource(JailResource):
         # Include primary keys on court dates
         related_request = has_related_request(bundle)
         if request_path_starts_with(bundle, CHARGES_HISTORY_URL) and not related_request:
-            bundle.data[INMATE_JAIL_ID] = bundle.obj.inmate.pk
+            bundle.data[INMATE_JAIL_ID] = bundle.obj.inmate_id
 
         # Include full inmate in related query
         if request_path_starts_with(bundle, HOUSING_HISTORY_URL) and related_request:
@@ -519,21 +1535,23 @@ class CountyInmateResource(JailResource):
     """
     API endpoint for CountyInmate model, which represents a person in jail.
     """
-    court_dates = JailToManyField(CourtDateResource, COURT_DATES)
-    housing_history = JailToManyField(HousingHistoryResource, HOUSING_HISTORY)
+    court_dates = JailToManyField(CourtDateResource, COURT_DATES, prefetch_related=[LOCATION])
+    housing_history = JailToManyField(HousingHistoryResource, HOUSING_HISTORY, prefetch_related=[HOUSING_LOCATION])
     charges_history = JailToManyField(ChargesHistoryResource, CHARGES_HISTORY)
+    current_housing_location = JailToOneField(HousingLocationResource, CURRENT_HOUSING_LOCATION, null=True,
+                                              full=False)
+    current_charge = JailToOneField(ChargesHistoryResource, CURRENT_CHARGE, null=True, full=False)
 
     class Meta:
-        queryset = CountyInmate.objects.select_related(HOUSING_HISTORY)\
-                                       .select_related(CHARGES_HISTORY)\
-                                       .select_related(COURT_DATES)\
-                                       .all()
+        queryset = CountyInmate.objects.all()
         allowed_methods = [GET]
         limit = 100
         max_limit = 0
         if use_caching():
-            cache = SimpleCache(timeout=cache_ttl())
+            cache = GenerationCache(timeout=cache_ttl())
+        throttle = cost_throttle()
         serializer = JailSerializer()
+        paginator_class = JailPaginator
         list_allowed_methods = STD_HTTP_COMMANDS
         detail_allowed_methods = STD_HTTP_COMMANDS
         authorization = JailAuthorization()
@@ -553,17 +1571,29 @@ class CountyInmateResource(JailResource):
             HOUSING_HISTORY: ALL_WITH_RELATIONS,
             CHARGES_HISTORY: ALL_WITH_RELATIONS,
             'person_id': ALL,
-            'in_jail': ALL
+            'in_jail': ALL,
+            CURRENT_HOUSING_LOCATION: ALL_WITH_RELATIONS,
+            CURRENT_CHARGE: ALL_WITH_RELATIONS,
         }
         ordering = filtering.keys()
 
+    def prefetch_related_lookups(self, request):
+        if shows_nested_objects(request, COUNTY_INMATE_URL):
+            return inmate_prefetch_lookups(nested=True)
+        return []
+
+    def values_steps(self, plan):
+        if plan.path_starts_with(COUNTY_INMATE_URL) and shows_nested_objects(plan.request, COUNTY_INMATE_URL):
+            plan.add_children(COURT_DATES, CourtDateResource(), INMATE)
+            plan.add_children(HOUSING_HISTORY, HousingHistoryResource(), INMATE)
+            plan.add_children(CHARGES_HISTORY, ChargesHistoryResource(), INMATE)
+
     def dehydrate(self, bundle, for_list=False):
         """
         Show court dates and housing history in inmate lists and detail views.
         """
         if request_path_starts_with(bundle, COUNTY_INMATE_URL) and \
-                (bundle.request.path != COUNTY_INMATE_URL or
-                 has_related_request(bundle)):
+                shows_nested_objects(bundle.request, COUNTY_INMATE_URL):
             dates = bundle.obj.court_dates.all()
             resource = CourtDateResource()
             bundle.data[COURT_DATES] = []
@@ -597,8 +1627,10 @@ class DailyPopulationCountsResource(JailResource):
         queryset = DailyPopulationCounts.objects.all()
         max_limit = 0
         if use_caching():
-            cache = SimpleCache(timeout=cache_ttl())
+            cache = GenerationCache(timeout=cache_ttl())
+        throttle = cost_throttle()
         serializer = JailSerializer()
+        paginator_class = JailPaginator
         filtering = {
             BOOKING_DATE: ALL
         }
@@ -614,17 +1646,174 @@ class DailyBookingsCountsResource(JailResource):
         queryset = DailyBookingsCounts.objects.all()
         max_limit = 0
         if use_caching():
-            cache = SimpleCache(timeout=cache_ttl())
+            cache = GenerationCache(timeout=cache_ttl())
+        throttle = cost_throttle()
         serializer = JailSerializer()
+        paginator_class = JailPaginator
         filtering = {
             BOOKING_DATE: ALL
         }
         ordering = filtering.keys()
 
 
+def client_identifier(request):
+    """
+    Returns the address of the client, as nginx passes it on.
+    """
+    return request.META.get('HTTP_X_REAL_IP') or request.META.get('REMOTE_ADDR', 'noaddr')
+
+
+def not_modified(request, etag, last_modified):
+    """
+    Returns whether the conditional GET request's copy of the response is still current, given the response's
+    ETag and modification time. If-None-Match is checked first, as in RFC 7232.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = [quote_etag(tag) for tag in parse_etags(if_none_match)]
+        return '"*"' in etags or etag in etags or gzip_etag(etag) in etags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return None not in (if_modified_since, last_modified) and int(last_modified) <= if_modified_since
+
+
+def gzip_etag(etag):
+    """
+    Returns the ETag of the gzipped response whose uncompressed one has the given ETag.
+    """
+    return etag[:-1] + '-gzip"'
+
+
+def jsonp_callback(request):
+    """
+    Returns the name of the requested JSONP callback, "callback" by default.
+    """
+    callback = request.GET.get(CALLBACK, CALLBACK)
+    if not is_valid_jsonp_callback_value(callback):
+        raise BadRequest('JSONP callback name is invalid.')
+    return callback
+
+
+def with_callback(response, callback):
+    """
+    Returns the JSONP response with its default callback replaced by the given one.
+    """
+    callback = callback.encode('utf-8')
+    if not response.streaming:
+        if response.content.startswith(CALLBACK + '('):
+            response.content = callback + response.content[len(CALLBACK):]
+        return response
+
+    def replaced(content):
+        start = ''
+        for chunk in content:
+            if start is None:
+                yield chunk
+                continue
+            start += chunk
+            if len(start) > len(CALLBACK):
+                yield callback + start[len(CALLBACK):] if start.startswith(CALLBACK + '(') else start
+                start = None
+        if start:
+            yield start
+
+    return StreamingHttpResponse(replaced(response.streaming_content), content_type=response['Content-Type'])
+
+
+def list_objects(data):
+    """
+    Returns the objects of serialized list data, or the single object of detail data.
+    """
+    if isinstance(data, dict) and OBJECTS in data:
+        return data[OBJECTS]
+    return [data]
+
+
+def separated(chunks, separator):
+    first = True
+    for chunk in chunks:
+        yield chunk if first else separator + chunk
+        first = False
+
+
+def buffered(chunks, buffer_size=STREAMING_BUFFER_SIZE):
+    """
+    Joins the chunks, all text or all bytes, into pieces of at least buffer_size.
+    """
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            yield buffer[0][:0].join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield buffer[0][:0].join(buffer)
+
+
 def has_related_request(bundle):
     return bundle.request.REQUEST.get(RELATED) == '1'
 
 
+def shows_nested_objects(request, list_url):
+    """
+    Detail views, and list views asked for related data, include the objects related to each one listed.
+    """
+    return request.path != list_url or request.REQUEST.get(RELATED) == '1'
+
+
+def inmate_prefetch_lookups(nested=False):
+    """
+    Returns the prefetch lookups for the histories of an inmate, prefixed with the path to the inmate when the
+    resource listed is one of the histories.
+    """
+    prefix = '' if nested else INMATE + '__'
+    lookups = []
+    for field in CountyInmateResource.base_fields.values():
+        if isinstance(field, JailToManyField):
+            lookups.extend(field.prefetch_lookups(prefix, nested))
+    return lookups
+
+
+def requested_fields(request):
+    """
+    Returns the tree of the keys asked for with fields=, a comma separated list of keys in which those of
+    nested objects are joined to their parent's with dots, as in fields=jail_id,housing_history.housing_location.
+    Each key maps to the tree of its nested keys, or to None when it is shown in full. Returns None when all
+    keys are shown.
+    """
+    value = request.GET.get(FIELDS, '').strip()
+    if not value:
+        return None
+    fields = {}
+    for path in value.split(','):
+        tree = fields
+        keys = [key.strip() for key in path.split('.')]
+        for key in keys[:-1]:
+            if key in tree and tree[key] is None:
+                break
+            tree = tree.setdefault(key, {})
+        else:
+            tree[keys[-1]] = None
+    return fields
+
+
+def select_fields(value, fields):
+    """
+    Returns the dehydrated value, a bundle, dict or list of them, with just the keys in the fields tree.
+    """
+    if fields is None:
+        return value
+    if isinstance(value, Bundle):
+        value.data = select_fields(value.data, fields)
+        return value
+    if isinstance(value, dict):
+        return {key: select_fields(item, fields[key]) for key, item in value.items() if key in fields}
+    if isinstance(value, list):
+        return [select_fields(item, fields) for item in value]
+    return value
+
+
 def request_path_starts_with(bundle, url):
     return bundle.request.path.startswith(url)
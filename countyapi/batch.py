@@ -0,0 +1,145 @@
+from cStringIO import StringIO
+from urlparse import urlsplit
+import json
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.urlresolvers import Resolver404, resolve
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, QueryDict
+from django.views.decorators.csrf import csrf_exempt
+
+from countyapi.paginator import NEGATIVE_VALUES
+
+API_PATH = '/api/1.0/'
+
+BATCH_PATH = API_PATH + 'batch/'
+
+REQUESTS = 'requests'
+
+RESULTS = 'results'
+
+BATCH_MAX_REQUESTS = 25
+
+# the most objects all the requests of a batch may ask for, counting a page of a list as its limit, a detail
+# as one object and a count_only request as none
+BATCH_MAX_OBJECTS = 2500
+
+DEFAULT_PAGE_COST = 100
+
+CONDITIONAL_HEADERS = ['HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE']
+
+
+@csrf_exempt
+def batch(request):
+    """
+    Runs many API GET requests in one round-trip, one after the other in this worker so they share its
+    database connection and cache. Post a JSON object mapping names to requests, or a list of requests,
+    each one an API path relative to /api/1.0/ with its query string:
+
+        {"requests": {"women": "countyinmate/?gender=F&count_only=1", "days": "dailypopulationcounts/"}}
+
+    The responses, all in JSON, come back keyed the same way, each with its status and data:
+
+        {"results": {"women": {"status": 200, "data": {"meta": {"total_count": 312, ...}}}, ...}}
+
+    A batch is refused when it holds more than BATCH_MAX_REQUESTS requests or asks for more than
+    BATCH_MAX_OBJECTS objects. Whole lists, limit=0, can not be asked for in a batch.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        requests = batch_requests(json.loads(request.body))
+    except ValueError, e:
+        return HttpResponseBadRequest(str(e))
+
+    results = {}
+    for name, path in requests:
+        results[name] = run_request(request, path)
+    return HttpResponse(json.dumps({RESULTS: results}), content_type='application/json')
+
+
+def batch_requests(data):
+    """
+    Returns the (name, API path) pairs of the posted batch, raising ValueError when it is malformed or costs
+    too much.
+    """
+    requests = data.get(REQUESTS) if isinstance(data, dict) else data
+    if isinstance(requests, list):
+        requests = [(path, path) for path in requests]
+    elif isinstance(requests, dict):
+        requests = requests.items()
+    else:
+        raise ValueError("Post a list of requests, or an object mapping names to requests, as '%s'." % REQUESTS)
+
+    if len(requests) > BATCH_MAX_REQUESTS:
+        raise ValueError('A batch can hold at most %d requests.' % BATCH_MAX_REQUESTS)
+    if not all(isinstance(path, basestring) for _, path in requests):
+        raise ValueError('Requests are API paths.')
+
+    requests = [(name, api_path(path)) for name, path in requests]
+    cost = sum(request_cost(path) for _, path in requests)
+    if cost > BATCH_MAX_OBJECTS:
+        raise ValueError('The requests of a batch can ask for at most %d objects, these ask for %d.' %
+                         (BATCH_MAX_OBJECTS, cost))
+    return requests
+
+
+def api_path(path):
+    if not path.startswith('/'):
+        path = API_PATH + path
+    if not path.startswith(API_PATH) or path.startswith(BATCH_PATH):
+        raise ValueError("'%s' is not an API path." % path)
+    return path
+
+
+def request_cost(path):
+    """
+    Returns the number of objects the request asks for.
+    """
+    parts = urlsplit(path)
+    params = QueryDict(parts.query)
+    if params.get('count_only', '0').lower() not in NEGATIVE_VALUES:
+        return 0
+    try:
+        match = resolve(parts.path)
+    except Resolver404:
+        return 0
+    if match.url_name == 'api_get_multiple':
+        return len(match.kwargs.get('pk_list', '').split(';'))
+    if match.url_name != 'api_dispatch_list':
+        return 1
+    try:
+        limit = int(params.get('limit', DEFAULT_PAGE_COST))
+    except ValueError:
+        raise ValueError("'%s' has an invalid limit." % path)
+    if limit <= 0:
+        raise ValueError("'%s' asks for a whole list, which can not be done in a batch." % path)
+    return limit
+
+
+def run_request(batch_request, path):
+    """
+    Runs the GET request for the path with the view it resolves to, returning its status and data.
+    """
+    parts = urlsplit(path)
+    params = QueryDict(parts.query, mutable=True)
+    params['format'] = 'json'
+    try:
+        match = resolve(parts.path)
+    except Resolver404:
+        return {'status': 404, 'data': None}
+
+    environ = dict(batch_request.META, REQUEST_METHOD='GET', PATH_INFO=parts.path, SCRIPT_NAME='',
+                   QUERY_STRING=params.urlencode(), CONTENT_LENGTH='0', CONTENT_TYPE='')
+    environ['wsgi.input'] = StringIO()
+    # the conditions of the batch are not those of its requests, whose responses are read uncompressed
+    for header in CONDITIONAL_HEADERS + ['HTTP_ACCEPT_ENCODING']:
+        environ.pop(header, None)
+    response = match.func(WSGIRequest(environ), *match.args, **match.kwargs)
+
+    content = ''.join(response.streaming_content) if response.streaming else response.content
+    try:
+        data = json.loads(content)
+    except ValueError:
+        data = content
+    return {'status': response.status_code, 'data': data}
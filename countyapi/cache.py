@@ -0,0 +1,135 @@
+from collections import OrderedDict
+from threading import Lock
+import os
+import time
+
+from django.conf import settings
+from django.utils.six.moves import cPickle as pickle
+from tastypie.cache import SimpleCache
+
+from countyapi import metrics
+from countyapi.generation import current_generation
+
+# the largest share of the local cache one entry may take, bigger ones are only kept in the shared cache
+LOCAL_ENTRY_SHARE = 8
+
+
+class GenerationCache(SimpleCache):
+    """
+    SimpleCache whose keys are namespaced by the scrape generation, so everything cached before a scrape
+    completed becomes unreachable in every worker as soon as it has, without waiting for it to expire.
+
+    Entries read or set are also kept in this process's local_cache, which is read first, so hot entries do
+    not go to the shared cache on every hit. Hits and misses of both tiers are counted in metrics.
+    """
+
+    def get(self, key, **kwargs):
+        generation = current_generation()
+        if local_cache.enabled():
+            value = local_cache.get(key, generation)
+            if value is not None:
+                metrics.increment('local_cache_hits')
+                return value
+            metrics.increment('local_cache_misses')
+
+        value = super(GenerationCache, self).get(generation_key(key, generation), **kwargs)
+        if value is None:
+            metrics.increment('shared_cache_misses')
+            return None
+        metrics.increment('shared_cache_hits')
+        if local_cache.enabled():
+            local_cache.set(key, value, generation, self.timeout)
+        return value
+
+    def set(self, key, value, timeout=None):
+        generation = current_generation()
+        super(GenerationCache, self).set(generation_key(key, generation), value, timeout)
+        if local_cache.enabled():
+            local_cache.set(key, value, generation, timeout or self.timeout)
+
+    def forget(self, key):
+        """
+        Drops the entry from this process's local cache, so the next get reads it from the shared cache.
+        """
+        local_cache.discard(key)
+
+
+class LocalCache(object):
+    """
+    Least recently used cache in this process, holding at most settings.LOCAL_CACHE_MAX_BYTES of pickled
+    values for at most settings.LOCAL_CACHE_TTL seconds, so an entry another worker replaced in the shared
+    cache is read again soon. It only holds entries of one scrape generation and is emptied once a newer one
+    has started. Values are kept pickled, which sizes them, and every get returns a copy callers may change.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.clear()
+
+    def enabled(self):
+        return settings.LOCAL_CACHE_MAX_BYTES > 0
+
+    def clear(self):
+        self.entries = OrderedDict()
+        self.size = 0
+        self.generation = None
+
+    def get(self, key, generation):
+        with self.lock:
+            if generation != self.generation:
+                self.clear()
+                self.generation = generation
+                return None
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return None
+            pickled, expires = entry
+            if expires < time.time():
+                self.size -= len(pickled)
+                return None
+            self.entries[key] = entry
+        return pickle.loads(pickled)
+
+    def set(self, key, value, generation, timeout):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            if generation != self.generation:
+                self.clear()
+                self.generation = generation
+            self._discard(key)
+            if len(pickled) > settings.LOCAL_CACHE_MAX_BYTES / LOCAL_ENTRY_SHARE:
+                return
+            self.entries[key] = (pickled, time.time() + min(timeout, settings.LOCAL_CACHE_TTL))
+            self.size += len(pickled)
+            while self.size > settings.LOCAL_CACHE_MAX_BYTES:
+                _, (evicted, _) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def discard(self, key):
+        with self.lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[0])
+
+
+local_cache = LocalCache()
+
+
+def generation_key(key, generation=None):
+    """
+    Returns the key namespaced by the scrape generation, the current one unless given.
+    """
+    if generation is None:
+        generation = current_generation()
+    return 'generation-%d:%s' % (generation, key)
+
+
+def generation_path(*names):
+    """
+    Returns the path of a file kept with the entries of the current scrape generation in the default cache's
+    directory, which is removed along with them once a newer generation has started.
+    """
+    return os.path.join(settings.CACHES['default']['LOCATION'], 'generation-%d' % current_generation(), *names)
@@ -28,8 +28,8 @@ class Charges:
             parsed_charges_citation = charges[0]
             parsed_charges = charges[1] if len(charges) > 1 else ''
             create_new_charge = True
-            if len(self._inmate.charges_history.all()) != 0:
-                inmate_latest_charge = self._inmate.charges_history.latest('date_seen')  # last known charge
+            inmate_latest_charge = self._inmate.current_charge  # last known charge
+            if inmate_latest_charge is not None:
                 # if the last known charge is different than the current info then create a new charge
                 if inmate_latest_charge.charges == parsed_charges and \
                    inmate_latest_charge.charges_citation == parsed_charges_citation:
@@ -39,6 +39,7 @@ class Charges:
                                                                      charges_citation=parsed_charges_citation)
                     new_charge.date_seen = yesterday()
                     new_charge.save()
+                    self._inmate.current_charge = new_charge
         except DatabaseError as e:
             self._debug("Could not save charges '%s' and citation '%s'\nException is %s" % (parsed_charges,
                                                                                                 parsed_charges_citation,
@@ -0,0 +1,59 @@
+import re
+import zlib
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+
+GZIP = 'gzip'
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+GZIP_LEVEL = 6
+
+
+def accepts_gzip(request):
+    return bool(ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+
+
+def gzip_compressor():
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def gzipped(content):
+    compressor = gzip_compressor()
+    return compressor.compress(content) + compressor.flush()
+
+
+def gunzip(content):
+    return zlib.decompress(content, 16 + zlib.MAX_WBITS)
+
+
+def gunzipped(chunks):
+    """
+    Returns an iterator over the uncompressed content of the gzipped chunks.
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        content = decompressor.decompress(chunk)
+        if content:
+            yield content
+    content = decompressor.flush()
+    if content:
+        yield content
+
+
+def gzip_response(request, content, content_type, streaming=False):
+    """
+    Returns the response sending the gzipped content, a string or, when streaming, an iterator over chunks of
+    it, as it is to clients accepting gzip and uncompressed to the others.
+    """
+    send_gzip = accepts_gzip(request)
+    if not send_gzip:
+        content = gunzipped(content) if streaming else gunzip(content)
+    response = (StreamingHttpResponse if streaming else HttpResponse)(content, content_type=content_type)
+    if send_gzip:
+        response['Content-Encoding'] = GZIP
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if streaming:
+        request.streaming_response = response
+    return response
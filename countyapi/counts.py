@@ -0,0 +1,56 @@
+from hashlib import md5
+import json
+
+from django.core.cache import cache
+from django.db import connections
+
+from countyapi.cache import generation_key
+
+COUNT_CACHE_TTL = 60 * 60 * 24  # a day, a completed scrape invalidates the counts long before
+
+
+def count_cache_key(queryset):
+    """
+    Returns the cache key of the count of the queryset in the current scrape generation. Querysets are
+    normalized to the SQL of the count, so the same filters give the same key whatever order they were given
+    in, and whatever the ordering of the list they are counted for.
+    """
+    sql, params = _count_sql(queryset)
+    digest = md5(('%s|%r' % (sql, params)).encode('utf-8')).hexdigest()
+    return generation_key('count:%s:%s' % (queryset.model._meta.db_table, digest))
+
+
+def cached_count(queryset):
+    """
+    Returns the number of objects in the queryset, counting them only once per scrape generation.
+    """
+    key = count_cache_key(queryset)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TTL)
+    return count
+
+
+def estimated_count(queryset):
+    """
+    Returns PostgreSQL's planner estimate of the number of objects in the queryset, which comes from the table
+    statistics without reading any rows. Returns None on other databases, which have no such estimate.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = _count_sql(queryset)
+    cursor = connection.cursor()
+    cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, basestring):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _count_sql(queryset):
+    objects = queryset.order_by()
+    objects.query.select_related = False
+    return objects.query.sql_with_params()
@@ -0,0 +1,268 @@
+from copy import copy
+from datetime import datetime
+from hashlib import md5
+from tempfile import mkstemp
+from urlparse import urlsplit
+import json
+import logging
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.urlresolvers import Resolver404, resolve
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseNotFound, \
+    QueryDict
+from django.views.decorators.csrf import csrf_exempt
+from tastypie.exceptions import BadRequest, ImmediateHttpResponse
+
+from countyapi import metrics, single_flight
+from countyapi.batch import api_path
+from countyapi.compression import gzip_response
+from countyapi.generation import current_generation
+from countyapi.snapshots import write_export
+from countyapi.streaming import read_file
+
+EXPORTS_PATH = '/api/1.0/exports/'
+
+QUERY = 'query'
+
+PENDING = 'pending'
+
+RUNNING = 'running'
+
+DONE = 'done'
+
+FAILED = 'failed'
+
+WORKER_LOCK = 'export-worker'
+
+log = logging.getLogger('main')
+
+_workers = []
+
+
+@csrf_exempt
+def export_jobs(request, api):
+    """
+    Submits a job exporting a list in the background, for queries too costly to be answered while the client
+    waits. Post the API path of the list, relative to /api/1.0/, with its query string:
+
+        {"query": "countyinmate/?gender=F&limit=0&related=1&format=csv"}
+
+    The job is answered with 202 Accepted and its status, which is polled at its url until the export is done
+    and can be downloaded, gzipped, from its download url:
+
+        {"id": "...", "status": "pending", "url": "/api/1.0/exports/.../", ...}
+
+    The same query submitted again during a scrape generation gets the same job. Clients are charged for the
+    list as when they ask for it from the API, see JailResource.costly_response, and are answered with Too Many
+    Requests once their budget is spent.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        data = json.loads(request.body)
+        query = data.get(QUERY) if isinstance(data, dict) else None
+        if not isinstance(query, basestring):
+            raise ValueError("Post the API path of the list to export as '%s'." % QUERY)
+        path, query_string = list_query(query)
+        charge(api, request, path, query_string)
+    except (ValueError, BadRequest), e:
+        return HttpResponseBadRequest(str(e))
+    except ImmediateHttpResponse, e:
+        return e.response
+    return job_response(submit(path, query_string), status=202)
+
+
+def export_job(request, job_id):
+    """
+    Returns the status of the export job.
+    """
+    job = read_job(job_id)
+    if job is None:
+        return HttpResponseNotFound()
+    return job_response(job)
+
+
+def export_download(request, job_id):
+    """
+    Sends the list the export job has written, gzipped to clients accepting it.
+    """
+    job = read_job(job_id)
+    if job is None or job['status'] != DONE:
+        return HttpResponseNotFound()
+    try:
+        content = open(export_path(job_id), 'rb')
+    except IOError:
+        return HttpResponseNotFound()
+    return gzip_response(request, read_file(content), job['content_type'], streaming=True)
+
+
+def list_query(query):
+    """
+    Returns the API path and sorted query string of the list the query asks for, raising ValueError when it
+    is not a list of the API.
+    """
+    parts = urlsplit(api_path(query))
+    try:
+        match = resolve(parts.path)
+    except Resolver404:
+        match = None
+    if match is None or match.url_name != 'api_dispatch_list':
+        raise ValueError("'%s' is not a list of the API." % query)
+    return parts.path, '&'.join(sorted(QueryDict(parts.query).urlencode().split('&')))
+
+
+def charge(api, request, path, query_string):
+    """
+    Charges the client for the list of the api at the path, raising ImmediateHttpResponse with Too Many Requests
+    when its budget is spent.
+    """
+    match = resolve(path)
+    resource = api.canonical_resource_for(match.kwargs['resource_name'])
+    list_request = copy(request)
+    list_request.method = 'GET'
+    list_request.GET = QueryDict(query_string)
+    resource.charge(list_request, resource.request_cost(list_request, **match.kwargs))
+
+
+def submit(path, query_string):
+    """
+    Returns the export job of the list, made and handed to a worker when there is none for the current scrape
+    generation or the last one failed.
+    """
+    generation = current_generation()
+    job_id = md5(repr((generation, path, query_string))).hexdigest()
+    job = read_job(job_id)
+    if job is not None and job['status'] != FAILED:
+        if job['status'] != DONE and not single_flight.is_locked(WORKER_LOCK):
+            # the worker stopped, or died, before running it
+            start_worker()
+        return job
+
+    job = {
+        'id': job_id,
+        'path': path,
+        QUERY: query_string,
+        'generation': generation,
+        'status': PENDING,
+        'created': datetime.now().isoformat(),
+    }
+    write_job(job)
+    metrics.increment('export_jobs')
+    if not single_flight.is_locked(WORKER_LOCK):
+        start_worker()
+    return job
+
+
+def job_response(job, status=200):
+    data = {
+        'id': job['id'],
+        'status': job['status'],
+        QUERY: '%s?%s' % (job['path'], job[QUERY]),
+        'created': job['created'],
+        'url': '%s%s/' % (EXPORTS_PATH, job['id']),
+    }
+    if job['status'] == DONE:
+        data['download'] = '%s%s/download/' % (EXPORTS_PATH, job['id'])
+    if job['status'] == FAILED:
+        data['error'] = job['error']
+    response = HttpResponse(json.dumps(data), content_type='application/json', status=status)
+    response['Location'] = data['url']
+    return response
+
+
+def start_worker():
+    """
+    Starts a worker process running the pending export jobs, see run_jobs. It stops as soon as it finds
+    another worker is already running them, so it is only started when none is.
+    """
+    # reaps the workers started before that have stopped
+    _workers[:] = [worker for worker in _workers if worker.poll() is None]
+    _workers.append(subprocess.Popen([sys.executable, os.path.join(settings.SITE_DIR, 'manage.py'),
+                                      'run_export_jobs'], close_fds=True))
+
+
+def run_jobs(api):
+    """
+    Runs the pending export jobs one at a time, oldest first, until there are none left, unless another worker
+    is running them. The resources of the lists are those of the api. Jobs of older scrape generations are
+    removed along with their exports.
+    """
+    while single_flight.acquire(WORKER_LOCK):
+        try:
+            remove_old_jobs()
+            # jobs left running while no worker held the lock belong to a worker that died
+            for job in pending_jobs([PENDING, RUNNING]):
+                run_job(api, job)
+        finally:
+            single_flight.release(WORKER_LOCK)
+        # a job submitted while the lock was being released started a worker that stopped straight away
+        if not pending_jobs():
+            return
+
+
+def run_job(api, job):
+    job.update(status=RUNNING, started=datetime.now().isoformat())
+    write_job(job)
+    try:
+        resource = api.canonical_resource_for(resolve(job['path']).kwargs['resource_name'])
+        job['content_type'] = write_export(resource, QueryDict(job[QUERY]), export_path(job['id']))
+    except Exception, e:
+        log.exception('Export %s?%s failed', job['path'], job[QUERY])
+        job.update(status=FAILED, error=str(e))
+    else:
+        job['status'] = DONE
+    job['finished'] = datetime.now().isoformat()
+    write_job(job)
+
+
+def pending_jobs(statuses=(PENDING,)):
+    jobs = [read_job(name[:-len('.json')]) for name in _job_names()]
+    return sorted((job for job in jobs if job is not None and job['status'] in statuses),
+                  key=lambda job: job['created'])
+
+
+def remove_old_jobs():
+    generation = current_generation()
+    for name in _job_names():
+        job_id = name[:-len('.json')]
+        job = read_job(job_id)
+        if job is not None and job['generation'] < generation:
+            for path in [export_path(job_id), job_path(job_id)]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def read_job(job_id):
+    try:
+        with open(job_path(job_id)) as job_file:
+            return json.load(job_file)
+    except (IOError, ValueError):
+        return None
+
+
+def write_job(job):
+    if not os.path.isdir(settings.EXPORT_DIR):
+        os.makedirs(settings.EXPORT_DIR)
+    fd, temporary_name = mkstemp(dir=settings.EXPORT_DIR)
+    with os.fdopen(fd, 'w') as job_file:
+        json.dump(job, job_file)
+    os.rename(temporary_name, job_path(job['id']))
+
+
+def job_path(job_id):
+    return os.path.join(settings.EXPORT_DIR, '%s.json' % job_id)
+
+
+def export_path(job_id):
+    return os.path.join(settings.EXPORT_DIR, '%s.gz' % job_id)
+
+
+def _job_names():
+    try:
+        return [name for name in os.listdir(settings.EXPORT_DIR) if name.endswith('.json')]
+    except OSError:
+        return []
@@ -0,0 +1,108 @@
+from contextlib import contextmanager
+from hashlib import md5
+from tempfile import mkstemp
+import fcntl
+import os
+import re
+import shutil
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.utils.encoding import force_bytes
+from django.utils.six.moves import cPickle as pickle
+
+GENERATION_KEY = re.compile(r'(?:^|:)(generation-\d+):')
+
+SHARED = 'shared'
+
+
+class GenerationFileCache(FileBasedCache):
+    """
+    FileBasedCache keeping the entries of each scrape generation in a directory of their own, see
+    countyapi.cache.generation_key, and other entries in a shared one.
+
+    Writes never count or cull the entries, which FileBasedCache does by walking the whole cache. The entries
+    of a generation are instead removed all at once by purge_generations_before once a newer generation has
+    started, as nothing reads them again. Entries are written to a temporary file and renamed into place, so
+    readers in other workers never see them half written.
+
+    add and incr are atomic across workers, each holding a lock file next to the entry while it reads and
+    writes it.
+    """
+
+    def add(self, key, value, timeout=None, version=None):
+        with self._locked(key, version):
+            return super(GenerationFileCache, self).add(key, value, timeout, version=version)
+
+    def set(self, key, value, timeout=None, version=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        self._write(self._file(key, version), time.time() + timeout, value)
+
+    def incr(self, key, delta=1, version=None):
+        """
+        Adds delta to the value of the key, keeping the time it expires. Raises ValueError when the key does
+        not exist.
+        """
+        with self._locked(key, version):
+            fname = self._file(key, version)
+            try:
+                with open(fname, 'rb') as f:
+                    expires = pickle.load(f)
+                    value = pickle.load(f)
+            except (IOError, OSError, EOFError, pickle.PickleError):
+                expires = None
+            if expires is None or expires < time.time():
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            self._write(fname, expires, value)
+            return value
+
+    def _write(self, fname, expires, value):
+        dirname = os.path.dirname(fname)
+        try:
+            if not os.path.exists(dirname):
+                os.makedirs(dirname)
+
+            fd, temporary_name = mkstemp(dir=dirname)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(expires, f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(temporary_name, fname)
+        except (IOError, OSError):
+            pass
+
+    @contextmanager
+    def _locked(self, key, version):
+        lock_name = self._file(key, version) + '.lock'
+        if not os.path.exists(os.path.dirname(lock_name)):
+            try:
+                os.makedirs(os.path.dirname(lock_name))
+            except OSError:
+                # made by another worker in between
+                pass
+        with open(lock_name, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _file(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._key_to_file(key)
+
+    def purge_generations_before(self, generation):
+        """
+        Removes the entries of the generations before the given one.
+        """
+        try:
+            names = os.listdir(self._dir)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith('generation-') and int(name.split('-')[1]) < generation:
+                shutil.rmtree(os.path.join(self._dir, name), ignore_errors=True)
+
+    def _key_to_file(self, key):
+        match = GENERATION_KEY.search(key)
+        path = md5(force_bytes(key)).hexdigest()
+        return os.path.join(self._dir, match.group(1) if match else SHARED, path[:2], path[2:4], path[4:])
@@ -0,0 +1,44 @@
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def current_generation():
+    """
+    Returns the generation of the scraped data, a number that goes up every time a scrape completes. It is
+    kept in the settings.SCRAPE_GENERATION_FILE marker so every process serving the API sees the same
+    generation, and is 0 before the first scrape has completed.
+    """
+    try:
+        with open(settings.SCRAPE_GENERATION_FILE) as marker:
+            return int(marker.read().strip() or 0)
+    except (IOError, ValueError):
+        return 0
+
+
+def generation_time():
+    """
+    Returns when the current generation started, in seconds since the epoch, or None before the first scrape
+    has completed.
+    """
+    try:
+        return os.path.getmtime(settings.SCRAPE_GENERATION_FILE)
+    except OSError:
+        return None
+
+
+def bump_generation():
+    """
+    Starts a new generation of the scraped data, which invalidates everything cached for the current one,
+    and removes what the cache holds for the older ones. The marker is replaced with a rename so readers never
+    see it half written.
+    """
+    generation = current_generation() + 1
+    new_marker = '%s.%d' % (settings.SCRAPE_GENERATION_FILE, os.getpid())
+    with open(new_marker, 'w') as marker:
+        marker.write('%d\n' % generation)
+    os.rename(new_marker, settings.SCRAPE_GENERATION_FILE)
+    if hasattr(cache, 'purge_generations_before'):
+        cache.purge_generations_before(generation)
+    return generation
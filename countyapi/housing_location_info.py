@@ -80,6 +80,7 @@ class HousingLocationInfo:
                         housing_history.housing_date_discovered = yesterday()
                         housing_history.save()
                         self._inmate.in_jail = self._housing_location.in_jail
+                        self._inmate.current_housing_location = self._housing_location
                 except DatabaseError as e:
                     self._debug("For inmate %s, could not save housing history '%s'.\nException is %s" %
                                 (self._inmate.jail_id, inmate_housing_location, str(e)))
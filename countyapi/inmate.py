@@ -1,12 +1,14 @@
 from datetime import datetime, date, time
 
+from django.db.models import F
 from django.db.utils import DatabaseError
 
-from utils import convert_to_int
+from utils import convert_to_int, yesterday
 from models import CountyInmate
 from charges import Charges
 from court_date_info import CourtDateInfo
 from housing_location_info import HousingLocationInfo
+from streaming import stream_rows
 from utils import ONE_DAY
 
 _MIDNIGHT = time()
@@ -28,6 +30,13 @@ class Inmate:
     def active_inmates():
         return CountyInmate.objects.filter(discharge_date_earliest__exact=None, last_seen_date__lt=date.today())
 
+    @staticmethod
+    def active_inmates_ids():
+        """
+        Streams the jail ids of the active inmates, most recently booked first.
+        """
+        return _stream_jail_ids(Inmate.active_inmates())
+
     def _clear_discharged(self):
         """
         Because the Cook County Jail website has issues, we can have misclassified inmates as discharged. This
@@ -38,33 +47,43 @@ class Inmate:
         if resurrected:
             self._inmate.discharge_date_earliest = None
             self._inmate.discharge_date_latest = None
-            self._inmate.in_jail = self._inmate.housing_history.latest().housing_location.in_jail
+            if self._inmate.current_housing_location is not None:
+                self._inmate.in_jail = self._inmate.current_housing_location.in_jail
         return resurrected
 
     def _debug(self, msg):
         self._monitor.debug('Inmate: %s' % msg)
 
     @staticmethod
-    def discharge(inmate_id, monitor):
+    def discharge(inmate_ids, monitor):
+        """
+        Discharges a batch of inmates with one set based update: the earliest discharge date becomes the date the
+        inmate was last seen and the latest discharge date becomes now, as does the date it was last seen since
+        an update does not touch it the way save does.
+        @param inmate_ids: jail ids of the inmates whose details pages could not be found
+        @return number of inmates discharged
+        """
+        now = datetime.now()
         try:
-            inmate = CountyInmate.objects.get(jail_id=inmate_id)
-            if inmate:
-                now = datetime.now()
-                inmate.discharge_date_earliest = inmate.last_seen_date
-                inmate.discharge_date_latest = now
-                inmate.in_jail = False
-                inmate.save()
-                monitor.debug("Inmate: Discharged inmate %s" % inmate_id)
+            number_discharged = CountyInmate.objects.filter(jail_id__in=inmate_ids)\
+                                                    .update(discharge_date_earliest=F('last_seen_date'),
+                                                            discharge_date_latest=now, last_seen_date=now,
+                                                            in_jail=False)
+            monitor.debug("Inmate: Discharged %d of %d inmates" % (number_discharged, len(inmate_ids)))
+            return number_discharged
         except DatabaseError as e:
-            monitor.debug("Could not save inmate '%s'\nException is %s" % (inmate_id, str(e)))
+            monitor.debug("Could not discharge inmates '%s'\nException is %s" % (inmate_ids, str(e)))
         except Exception, e:
-            monitor.debug("Unknown exception for inmate '%s'\nException is %s" % (inmate_id, str(e)))
+            monitor.debug("Unknown exception discharging inmates '%s'\nException is %s" % (inmate_ids, str(e)))
+        return 0
 
     def _inmate_record_get_or_create(self):
         """
-        Gets or creates inmate record based on jail_id and stores the url used to fetch the inmate info
+        Gets or creates inmate record based on jail_id and stores the url used to fetch the inmate info,
+        the inmate's current housing location and charge are fetched with it
         """
-        inmate, created = CountyInmate.objects.get_or_create(jail_id=self._inmate_id)
+        inmate, created = CountyInmate.objects.select_related('current_housing_location', 'current_charge')\
+                                              .get_or_create(jail_id=self._inmate_id)
         return inmate, created
 
     @staticmethod
@@ -76,6 +95,15 @@ class Inmate:
         """
         return CountyInmate.objects.filter(booking_date=booking_date)
 
+    @staticmethod
+    def known_inmates_ids_starting_with(start_date):
+        """
+        Streams the jail ids of all inmates booked from start_date up to and including yesterday, most
+        recently booked first, using a single query.
+        """
+        return _stream_jail_ids(CountyInmate.objects.filter(booking_date__gte=start_date,
+                                                            booking_date__lte=yesterday()))
+
     @staticmethod
     def recently_discharged_inmates():
         today = date.today()
@@ -83,6 +111,13 @@ class Inmate:
         return CountyInmate.objects.filter(discharge_date_earliest__gte=discharge_starting_date,
                                            last_seen_date__lt=today)
 
+    @staticmethod
+    def recently_discharged_inmates_ids():
+        """
+        Streams the jail ids of the recently discharged inmates, most recently booked first.
+        """
+        return _stream_jail_ids(Inmate.recently_discharged_inmates())
+
     def save(self):
         """
         Fetches inmates detail page and creates or updates inmates record based on it,
@@ -143,3 +178,7 @@ class Inmate:
         self._inmate.height = self._inmate_details.height()
         self._inmate.weight = self._inmate_details.weight()
         self._inmate.age_at_booking = self._inmate_details.age_at_booking()
+
+
+def _stream_jail_ids(inmates):
+    return stream_rows(inmates.values_list('jail_id', flat=True).order_by('-jail_id'))
@@ -25,12 +25,6 @@ class Command(BaseCommand):
         IN_JAIL_INCORRECT: 0,
     }
 
-    # Django uses lazy evaluation when dealing with the database so for instance the test
-    #        inmate.housing_history.all() == []
-    # will fail as the left hand side of the comparison is returning an object that is not
-    # a list, it may evaluate to an empty list. This means that you have force the lazy
-    # evaluation to occur so you get the right testing to occur
-
     def handle(self, *args, **options):
         """
         Audits the Cook County Jail Database reports on what it finds, primarily looking for
@@ -46,7 +40,7 @@ class Command(BaseCommand):
         inmate_id = 'Uninitialized'
         print("Starting database audit: %s" % str(start_time))
         try:
-            for inmate in CountyInmate.objects.all():
+            for inmate in CountyInmate.objects.select_related('current_housing_location').iterator():
                 self.increment_stat(NUMBER)
                 inmate_id = inmate.jail_id
                 self.check_in_jail(inmate)
@@ -61,14 +55,12 @@ class Command(BaseCommand):
 
     def check_in_jail(self, inmate):
         if inmate.discharge_date_earliest is None:
-            housing_history = inmate.housing_history.all()
-            housing_history_length = len(housing_history)
-            if housing_history_length == 0:
+            if inmate.current_housing_location is None:
                 self.increment_stat(NO_HOUSING_LOC)
                 if not inmate.in_jail:
                     self.increment_stat(IN_JAIL_INCORRECT)
             else:
-                if inmate.in_jail != housing_history[housing_history_length - 1].housing_location.in_jail:
+                if inmate.in_jail != inmate.current_housing_location.in_jail:
                     self.increment_stat(IN_JAIL_INCORRECT)
         elif inmate.in_jail:
             self.increment_stat(IN_JAIL_INCORRECT)
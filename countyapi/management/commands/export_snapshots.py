@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from countyapi.snapshots import export_snapshots
+from countyapi.urls import v1_api
+
+
+class Command(BaseCommand):
+
+    help = "Export the whole lists of the API resources to gzipped files, which unfiltered limit=0 requests " \
+           "are then served from."
+
+    def handle(self, *args, **options):
+        resources = [resource for _, resource in sorted(v1_api._registry.items())
+                     if 'get' in resource._meta.list_allowed_methods]
+        manifest = export_snapshots(resources)
+        for resource_name, formats in sorted(manifest['resources'].items()):
+            for short_format, entry in sorted(formats.items()):
+                self.stdout.write('%s %s: %d bytes' % (resource_name, short_format, entry['bytes']))
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand
+from countyapi.generation import bump_generation
 from countyapi.models import CountyInmate, DailyPopulationCounts, DailyBookingsCounts
 from django.db.models import Max, Min, Q
 from copy import copy
@@ -89,6 +90,7 @@ class Command(BaseCommand):
 
         self.save_count(counts, DailyPopulationCounts)
         self.save_count(booking_counts, DailyBookingsCounts)
+        bump_generation()
 
     def count_dictionary(self, inmates, counts_template, track_minors=False):
         row = copy(counts_template)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from countyapi.exports import run_jobs
+from countyapi.urls import v1_api
+
+
+class Command(BaseCommand):
+
+    help = "Run the pending export jobs of the API, unless another worker already is."
+
+    def handle(self, *args, **options):
+        run_jobs(v1_api)
@@ -0,0 +1,97 @@
+from collections import Counter
+from tempfile import mkstemp
+from uuid import uuid4
+import errno
+import json
+import os
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+counters = Counter()
+
+# cache tiers whose hit ratios are reported, from their <tier>_cache_hits and <tier>_cache_misses counters
+TIERS = ['local', 'shared']
+
+# seconds between writes of the counters of a process, which are counted on every cache read
+WRITE_INTERVAL = 1
+
+_process = {}
+
+
+def increment(name, value=1):
+    """
+    Adds to the named counter of this process, which is written to a file of its own in metrics_dir() so that
+    the counters of every worker can be added up, at most every WRITE_INTERVAL seconds.
+    """
+    if _process.get('pid') != os.getpid():
+        # a new worker, forked or not, starts its own counters
+        counters.clear()
+        _process.update(pid=os.getpid(), name='%d-%s.json' % (os.getpid(), uuid4().hex), written=0)
+    counters[name] += value
+    if time.time() - _process['written'] >= WRITE_INTERVAL:
+        _write_counters()
+
+
+def total_counters():
+    """
+    Returns the counters added up over every process that has counted.
+    """
+    if _process.get('pid') == os.getpid():
+        _write_counters()
+    totals = Counter()
+    try:
+        names = os.listdir(metrics_dir())
+    except OSError:
+        names = []
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(metrics_dir(), name)) as counters_file:
+                totals.update(json.load(counters_file))
+        except (IOError, ValueError):
+            pass
+    return totals
+
+
+def metrics(request):
+    """
+    Returns the cache counters of all the workers, added up, and the hit ratio of each cache tier, as JSON.
+    """
+    totals = total_counters()
+    return HttpResponse(json.dumps({'counters': dict(totals), 'hit_ratios': hit_ratios(totals)}, sort_keys=True),
+                        content_type='application/json')
+
+
+def hit_ratios(totals):
+    """
+    Returns the share of the reads each cache tier answered, for the tiers that were read.
+    """
+    ratios = {}
+    for tier in TIERS:
+        hits, misses = totals['%s_cache_hits' % tier], totals['%s_cache_misses' % tier]
+        if hits + misses:
+            ratios[tier] = float(hits) / (hits + misses)
+    return ratios
+
+
+def metrics_dir():
+    return os.path.join(settings.SINGLE_FLIGHT_LOCK_DIR, 'metrics')
+
+
+def _write_counters():
+    _process['written'] = time.time()
+    try:
+        os.makedirs(metrics_dir())
+    except OSError, e:
+        if e.errno != errno.EEXIST:
+            return
+    try:
+        fd, temporary_name = mkstemp(dir=metrics_dir())
+        with os.fdopen(fd, 'w') as counters_file:
+            json.dump(dict(counters), counters_file)
+        os.rename(temporary_name, os.path.join(metrics_dir(), _process['name']))
+    except (IOError, OSError):
+        pass
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+# Indexes Django can not declare on a model: the partial indexes behind Inmate.active_inmates and
+# Inmate.recently_discharged_inmates.
+PARTIAL_INDEXES = {
+    'countyapi_countyinmate_active':
+        'CREATE INDEX countyapi_countyinmate_active ON countyapi_countyinmate (last_seen_date) '
+        'WHERE discharge_date_earliest IS NULL',
+    'countyapi_countyinmate_discharged':
+        'CREATE INDEX countyapi_countyinmate_discharged ON countyapi_countyinmate '
+        '(discharge_date_earliest, last_seen_date) WHERE discharge_date_earliest IS NOT NULL',
+}
+
+PARTIAL_INDEX_BACKENDS = ['postgres', 'sqlite3']
+
+# (table, columns) of the indexes declared on the models, used by scripts/benchmark_indexes.py
+QUERY_INDEXES = [
+    (u'countyapi_housinghistory', ['inmate_id', 'housing_date_discovered']),
+    (u'countyapi_chargeshistory', ['inmate_id', 'date_seen']),
+    (u'countyapi_countyinmate', ['bail_amount']),
+    (u'countyapi_countyinmate', ['person_id']),
+    (u'countyapi_countyinmate', ['gender', 'race']),
+    (u'countyapi_countyinmate', ['booking_date', 'discharge_date_earliest']),
+    (u'countyapi_countyinmate', ['in_jail', 'jail_id']),
+]
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding index on 'HousingHistory', fields ['inmate', 'housing_date_discovered']
+        db.create_index(u'countyapi_housinghistory', ['inmate_id', 'housing_date_discovered'])
+
+        # Adding index on 'ChargesHistory', fields ['inmate', 'date_seen']
+        db.create_index(u'countyapi_chargeshistory', ['inmate_id', 'date_seen'])
+
+        # Adding index on 'CountyInmate', fields ['bail_amount']
+        db.create_index(u'countyapi_countyinmate', ['bail_amount'])
+
+        # Adding index on 'CountyInmate', fields ['person_id']
+        db.create_index(u'countyapi_countyinmate', ['person_id'])
+
+        # Adding index on 'CountyInmate', fields ['gender', 'race']
+        db.create_index(u'countyapi_countyinmate', ['gender', 'race'])
+
+        # Adding index on 'CountyInmate', fields ['booking_date', 'discharge_date_earliest']
+        db.create_index(u'countyapi_countyinmate', ['booking_date', 'discharge_date_earliest'])
+
+        # Adding index on 'CountyInmate', fields ['in_jail', 'jail_id']
+        db.create_index(u'countyapi_countyinmate', ['in_jail', 'jail_id'])
+
+        # Adding partial indexes for active and recently discharged inmates
+        if db.backend_name in PARTIAL_INDEX_BACKENDS:
+            for create_index_sql in PARTIAL_INDEXES.values():
+                db.execute(create_index_sql)
+
+    def backwards(self, orm):
+        # Removing partial indexes for active and recently discharged inmates
+        if db.backend_name in PARTIAL_INDEX_BACKENDS:
+            for index_name in PARTIAL_INDEXES.keys():
+                db.execute('DROP INDEX %s' % index_name)
+
+        # Removing index on 'CountyInmate', fields ['in_jail', 'jail_id']
+        db.delete_index(u'countyapi_countyinmate', ['in_jail', 'jail_id'])
+
+        # Removing index on 'CountyInmate', fields ['booking_date', 'discharge_date_earliest']
+        db.delete_index(u'countyapi_countyinmate', ['booking_date', 'discharge_date_earliest'])
+
+        # Removing index on 'CountyInmate', fields ['gender', 'race']
+        db.delete_index(u'countyapi_countyinmate', ['gender', 'race'])
+
+        # Removing index on 'CountyInmate', fields ['person_id']
+        db.delete_index(u'countyapi_countyinmate', ['person_id'])
+
+        # Removing index on 'CountyInmate', fields ['bail_amount']
+        db.delete_index(u'countyapi_countyinmate', ['bail_amount'])
+
+        # Removing index on 'ChargesHistory', fields ['inmate', 'date_seen']
+        db.delete_index(u'countyapi_chargeshistory', ['inmate_id', 'date_seen'])
+
+        # Removing index on 'HousingHistory', fields ['inmate', 'housing_date_discovered']
+        db.delete_index(u'countyapi_housinghistory', ['inmate_id', 'housing_date_discovered'])
+
+
+    models = {
+        u'countyapi.chargeshistory': {
+            'Meta': {'object_name': 'ChargesHistory', 'index_together': "[['inmate', 'date_seen']]"},
+            'charges': ('django.db.models.fields.TextField', [], {'null': 'True'}),
+            'charges_citation': ('django.db.models.fields.TextField', [], {'null': 'True'}),
+            'date_seen': ('django.db.models.fields.DateField', [], {'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'inmate': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'charges_history'", 'to': u"orm['countyapi.CountyInmate']"})
+        },
+        u'countyapi.countyinmate': {
+            'Meta': {'ordering': "['-jail_id']", 'object_name': 'CountyInmate', 'index_together': "[['booking_date', 'discharge_date_earliest'], ['gender', 'race'], ['in_jail', 'jail_id']]"},
+            'age_at_booking': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'}),
+            'bail_amount': ('django.db.models.fields.IntegerField', [], {'db_index': 'True', 'null': 'True', 'blank': 'True'}),
+            'bail_status': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'booking_date': ('django.db.models.fields.DateField', [], {'null': 'True'}),
+            'discharge_date_earliest': ('django.db.models.fields.DateTimeField', [], {'null': 'True'}),
+            'discharge_date_latest': ('django.db.models.fields.DateTimeField', [], {'null': 'True'}),
+            'gender': ('django.db.models.fields.CharField', [], {'max_length': '1', 'null': 'True', 'blank': 'True'}),
+            'height': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'}),
+            'in_jail': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'jail_id': ('django.db.models.fields.CharField', [], {'max_length': '15', 'primary_key': 'True'}),
+            'last_seen_date': ('django.db.models.fields.DateTimeField', [], {'auto_now': 'True', 'blank': 'True'}),
+            'person_id': ('django.db.models.fields.CharField', [], {'max_length': '64', 'null': 'True', 'db_index': 'True'}),
+            'race': ('django.db.models.fields.CharField', [], {'max_length': '4', 'null': 'True', 'blank': 'True'}),
+            'weight': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'})
+        },
+        u'countyapi.courtdate': {
+            'Meta': {'ordering': "['date']", 'object_name': 'CourtDate'},
+            'date': ('django.db.models.fields.DateField', [], {}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'inmate': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'court_dates'", 'to': u"orm['countyapi.CountyInmate']"}),
+            'location': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'court_dates'", 'to': u"orm['countyapi.CourtLocation']"})
+        },
+        u'countyapi.courtlocation': {
+            'Meta': {'object_name': 'CourtLocation'},
+            'address': ('django.db.models.fields.CharField', [], {'max_length': '100', 'null': 'True'}),
+            'branch_name': ('django.db.models.fields.CharField', [], {'max_length': '60', 'null': 'True'}),
+            'city': ('django.db.models.fields.CharField', [], {'max_length': '30', 'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'location': ('django.db.models.fields.TextField', [], {}),
+            'location_name': ('django.db.models.fields.CharField', [], {'max_length': '20', 'null': 'True'}),
+            'room_number': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'}),
+            'state': ('django.db.models.fields.CharField', [], {'max_length': '3', 'null': 'True'}),
+            'zip_code': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'})
+        },
+        u'countyapi.dailybookingscounts': {
+            'Meta': {'ordering': "['booking_date']", 'object_name': 'DailyBookingsCounts'},
+            'booking_date': ('django.db.models.fields.DateField', [], {'null': 'True'}),
+            'female_as': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_b': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_bk': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_in': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_lb': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_lt': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_lw': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_minors': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_w': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_wh': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'male_as': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_b': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_bk': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_in': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_lb': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_lt': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_lw': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_minors': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_w': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_wh': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'total': ('django.db.models.fields.IntegerField', [], {'default': '0'})
+        },
+        u'countyapi.dailypopulationcounts': {
+            'Meta': {'ordering': "['booking_date']", 'object_name': 'DailyPopulationCounts'},
+            'booking_date': ('django.db.models.fields.DateField', [], {'null': 'True'}),
+            'female_as': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_b': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_bk': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_in': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_lb': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_lt': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_lw': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_w': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'female_wh': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'male_as': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_b': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_bk': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_in': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_lb': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_lt': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_lw': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_w': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'male_wh': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'total': ('django.db.models.fields.IntegerField', [], {'default': '0'})
+        },
+        u'countyapi.housinghistory': {
+            'Meta': {'ordering': "['housing_date_discovered']", 'object_name': 'HousingHistory', 'index_together': "[['inmate', 'housing_date_discovered']]"},
+            'housing_date_discovered': ('django.db.models.fields.DateField', [], {'null': 'True'}),
+            'housing_location': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'housing_history'", 'to': u"orm['countyapi.HousingLocation']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'inmate': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'housing_history'", 'to': u"orm['countyapi.CountyInmate']"})
+        },
+        u'countyapi.housinglocation': {
+            'Meta': {'object_name': 'HousingLocation'},
+            'division': ('django.db.models.fields.CharField', [], {'max_length': '4'}),
+            'housing_location': ('django.db.models.fields.CharField', [], {'max_length': '40', 'primary_key': 'True'}),
+            'in_jail': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'in_program': ('django.db.models.fields.CharField', [], {'max_length': '60'}),
+            'sub_division': ('django.db.models.fields.CharField', [], {'max_length': '20'}),
+            'sub_division_location': ('django.db.models.fields.CharField', [], {'max_length': '20'})
+        },
+        u'countyapi.inmatesummaries': {
+            'Meta': {'object_name': 'InmateSummaries'},
+            'current_inmate_count': ('django.db.models.fields.IntegerField', [], {}),
+            'date': ('django.db.models.fields.DateField', [], {}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        }
+    }
+
+    complete_apps = ['countyapi']
\ No newline at end of file
@@ -6,7 +6,7 @@ class CountyInmate(models.Model):
     Model that represents a Cook County Jail inmate.
     """
     jail_id = models.CharField(max_length=15, primary_key=True)
-    person_id = models.CharField(max_length=64, null=True)
+    person_id = models.CharField(max_length=64, null=True, db_index=True)
     race = models.CharField(max_length=4, null=True, blank=True)
     last_seen_date = models.DateTimeField(auto_now=True)
     booking_date = models.DateField(null=True)
@@ -17,14 +17,25 @@ class CountyInmate(models.Model):
     weight = models.IntegerField(null=True, blank=True)
     age_at_booking = models.IntegerField(null=True, blank=True)
     bail_status = models.CharField(max_length=50, null=True)
-    bail_amount = models.IntegerField(null=True, blank=True)
+    bail_amount = models.IntegerField(null=True, blank=True, db_index=True)
     in_jail = models.BooleanField(default=True)
+    # Denormalized from housing_history and charges_history, maintained by the scraper when it saves an inmate
+    current_housing_location = models.ForeignKey('HousingLocation', null=True, on_delete=models.SET_NULL,
+                                                 related_name='current_inmates')
+    current_charge = models.ForeignKey('ChargesHistory', null=True, on_delete=models.SET_NULL, related_name='+')
 
     def __unicode__(self):
         return self.jail_id
 
     class Meta:
         ordering = ['-jail_id']
+        # The partial indexes used to find active and recently discharged inmates can not be declared
+        # here, see migration 0035 for them.
+        index_together = [
+            ['booking_date', 'discharge_date_earliest'],
+            ['gender', 'race'],
+            ['in_jail', 'jail_id'],
+        ]
 
 
 class CourtDate(models.Model):
@@ -65,6 +76,9 @@ class HousingHistory(models.Model):
     class Meta:
         ordering = ['housing_date_discovered']
         get_latest_by = 'housing_date_discovered'
+        index_together = [
+            ['inmate', 'housing_date_discovered'],
+        ]
 
 
 class HousingLocation(models.Model):
@@ -88,6 +102,11 @@ class ChargesHistory(models.Model):
     charges_citation = models.TextField(null=True)
     date_seen = models.DateField(null=True)
 
+    class Meta:
+        index_together = [
+            ['inmate', 'date_seen'],
+        ]
+
 
 class InmateSummaries(models.Model):
     """
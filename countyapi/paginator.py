@@ -0,0 +1,209 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+from decimal import Decimal
+import json
+
+from django.db.models import Q
+from django.utils.http import urlencode
+from tastypie.exceptions import BadRequest
+from tastypie.paginator import Paginator
+
+from countyapi.counts import cached_count, estimated_count
+
+CURSOR = 'cursor'
+
+TOTAL_COUNT = 'total_count'
+
+TOTAL_COUNT_IS_ESTIMATE = 'total_count_is_estimate'
+
+COUNT = 'count'
+
+ESTIMATE = 'estimate'
+
+NEGATIVE_VALUES = {'0', 'false'}
+
+
+class JailPaginator(Paginator):
+    """
+    Tastypie's offset paginator with cached counts and a few opt-in additions.
+
+    meta.total_count is counted once per filter set and scrape generation, see countyapi.counts.
+    count=estimate uses PostgreSQL's planner estimate for it instead, meta.total_count_is_estimate is then
+    set and the next page is found by looking for an object after this one. Other databases count exactly.
+
+    total_count=0 leaves out the COUNT(*) behind meta.total_count, the next page is found by looking for a
+    single object after this one instead.
+
+    cursor= pages with a keyset on the resource ordering rather than an offset, so every page is an index
+    seek no matter how deep into the collection it is. The ordering has the primary key added to it to make
+    it unique, and meta.next carries the opaque cursor of the next page. Orderings on fields that can be null
+    are refused, and the model ordering is replaced by the primary key when it has such fields.
+    """
+
+    estimated = False
+
+    def page(self):
+        if CURSOR in self.request_data:
+            return self.cursor_page()
+        if self.counts_total():
+            return self.count_estimated(super(JailPaginator, self).page())
+
+        limit = self.get_limit()
+        offset = self.get_offset()
+        meta = {
+            'offset': offset,
+            'limit': limit,
+            TOTAL_COUNT: None,
+        }
+
+        if limit:
+            meta['previous'] = self.get_previous(limit, offset)
+            meta['next'] = self.get_next_by_lookahead(limit, offset)
+
+        return {
+            self.collection_name: self.get_slice(limit, offset),
+            'meta': meta,
+        }
+
+    def cursor_page(self):
+        limit = self.get_limit()
+        keys = self.get_keys()
+        objects = self.objects.order_by(*[('-' + name) if descending else name for name, descending in keys])
+        cursor = self.request_data.get(CURSOR)
+        if cursor:
+            objects = objects.filter(after_keys(keys, decode_cursor(cursor, keys)))
+
+        meta = {
+            'limit': limit,
+            'previous': None,
+            'next': None,
+            TOTAL_COUNT: self.get_count() if self.counts_total() else None,
+        }
+
+        if limit:
+            last_keys = list(objects.values_list(*[name for name, _ in keys])[limit - 1:limit + 1])
+            if len(last_keys) == 2:
+                meta['next'] = self._generate_cursor_uri(limit, encode_cursor(keys, last_keys[0]))
+            objects = objects[:limit]
+
+        return self.count_estimated({
+            self.collection_name: objects,
+            'meta': meta,
+        })
+
+    def count_page(self):
+        """
+        Returns the meta of a page with just the count, for count_only=1 requests.
+        """
+        return self.count_estimated({'meta': {TOTAL_COUNT: self.get_count()}})
+
+    def get_count(self):
+        if self.request_data.get(COUNT) == ESTIMATE:
+            count = estimated_count(self.objects)
+            if count is not None:
+                self.estimated = True
+                return count
+        return cached_count(self.objects)
+
+    def count_estimated(self, page):
+        if self.estimated:
+            page['meta'][TOTAL_COUNT_IS_ESTIMATE] = True
+        return page
+
+    def get_next(self, limit, offset, count):
+        if self.estimated:
+            return self.get_next_by_lookahead(limit, offset)
+        return super(JailPaginator, self).get_next(limit, offset, count)
+
+    def get_next_by_lookahead(self, limit, offset):
+        """
+        Returns the uri of the next page when there is an object after this page, without counting them all.
+        """
+        if self.objects[offset + limit:offset + limit + 1].exists():
+            return self._generate_uri(limit, offset + limit)
+        return None
+
+    def counts_total(self):
+        return self.request_data.get(TOTAL_COUNT, '').lower() not in NEGATIVE_VALUES
+
+    def get_keys(self):
+        """
+        Returns the (field name, descending) pairs the cursor pages on.
+        """
+        model = self.objects.model
+        pk_name = model._meta.pk.name
+        ordering = list(self.objects.query.order_by)
+        explicit = bool(ordering)
+        if not explicit and self.objects.query.default_ordering:
+            ordering = list(model._meta.ordering)
+
+        keys = []
+        for order in ordering:
+            name = order.lstrip('-')
+            if name == 'pk':
+                name = pk_name
+            if '__' in name or name == '?':
+                raise BadRequest("Cursor pagination can not order on '%s'." % order)
+            if model._meta.get_field(name).null:
+                if explicit:
+                    raise BadRequest("Cursor pagination can not order on '%s', which can be null." % name)
+                keys = []
+                break
+            keys.append((name, order.startswith('-')))
+
+        if pk_name not in [name for name, _ in keys]:
+            keys.append((pk_name, keys[-1][1] if keys else False))
+        return keys
+
+    def _generate_cursor_uri(self, limit, cursor):
+        if self.resource_uri is None:
+            return None
+
+        request_params = self.request_data.copy()
+        for param in ['limit', 'offset', CURSOR]:
+            if param in request_params:
+                del request_params[param]
+        request_params['limit'] = limit
+        request_params[CURSOR] = cursor
+        try:
+            encoded_params = request_params.urlencode()
+        except AttributeError:
+            encoded_params = urlencode(request_params)
+
+        return '%s?%s' % (self.resource_uri, encoded_params)
+
+
+def after_keys(keys, values):
+    """
+    Returns the filter for the objects after the given key values, in the order of the keys.
+    """
+    after = Q()
+    for i, (name, descending) in enumerate(keys):
+        condition = Q(**{'%s__%s' % (name, 'lt' if descending else 'gt'): values[i]})
+        for j in range(i):
+            condition &= Q(**{keys[j][0]: values[j]})
+        after |= condition
+    return after
+
+
+def encode_cursor(keys, values):
+    names = [name for name, _ in keys]
+    return urlsafe_b64encode(json.dumps([names, [_simple(value) for value in values]]))
+
+
+def decode_cursor(cursor, keys):
+    try:
+        names, values = json.loads(urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError, UnicodeError):
+        raise BadRequest('Invalid cursor.')
+    if names != [name for name, _ in keys] or len(values) != len(keys):
+        raise BadRequest('The cursor is for a different ordering.')
+    return values
+
+
+def _simple(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
@@ -60,6 +60,48 @@ else:
         }
     }
 
+# Marker file holding the generation of the scraped data, a number bumped every time a scrape completes, which
+# the cache keys are namespaced by
+SCRAPE_GENERATION_FILE = os.environ.get('CCJ_SCRAPE_GENERATION_FILE', os.path.join(SITE_DIR, 'scrape_generation'))
+
+# Cache shared by all the workers serving the API, in files so no cache server is needed. A completed scrape
+# bumps the generation its keys are namespaced by, which invalidates it without restarting the workers, and
+# removes the entries of the older generations
+CACHES = {
+    'default': {
+        'BACKEND': 'countyapi.file_cache.GenerationFileCache',
+        'LOCATION': os.environ.get('CCJ_CACHE_DIR', os.path.join(SITE_DIR, 'cache')),
+    }
+}
+
+# Lock files of the requests computing responses other requests wait for instead of computing them too. A lock
+# older than SINGLE_FLIGHT_LOCK_TIMEOUT belongs to a worker gunicorn killed, waits stop after
+# SINGLE_FLIGHT_WAIT_TIMEOUT, before gunicorn's timeout, and the waiting request computes the response itself
+SINGLE_FLIGHT_LOCK_DIR = os.environ.get('CCJ_LOCK_DIR', os.path.join(SITE_DIR, 'locks'))
+SINGLE_FLIGHT_LOCK_TIMEOUT = 240
+SINGLE_FLIGHT_WAIT_TIMEOUT = 180
+
+# Bytes of cache entries each process keeps in memory in front of the shared cache, 0 to keep none, and the
+# seconds it keeps them, so an entry replaced in the shared cache is seen by every worker soon after
+LOCAL_CACHE_MAX_BYTES = int(os.environ.get('CCJ_LOCAL_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+LOCAL_CACHE_TTL = 60
+
+# Gzipped exports of the whole lists of the API, written by the export_snapshots command once a scrape has
+# completed, which unfiltered limit=0 requests are served from
+SNAPSHOT_DIR = os.environ.get('CCJ_SNAPSHOT_DIR', os.path.join(SITE_DIR, 'snapshots'))
+
+# Export jobs and the gzipped lists they write, for list requests costing more than FOREGROUND_COST_LIMIT, the
+# number of objects they read times the depth of the relations they show, which are redirected to a job run
+# by a worker process rather than built while the client waits
+EXPORT_DIR = os.environ.get('CCJ_EXPORT_DIR', os.path.join(SITE_DIR, 'exports'))
+FOREGROUND_COST_LIMIT = 100000
+
+# Cost of the lists each client may have built in every THROTTLE_TIMEFRAME seconds, and the cost of the lists
+# that are free, see countyapi.throttle
+THROTTLE_BUDGET = 500000
+THROTTLE_TIMEFRAME = 60 * 60
+THROTTLE_FREE_COST = 1000
+
 # Time zone
 TIME_ZONE = 'America/Chicago'
 
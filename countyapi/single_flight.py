@@ -0,0 +1,76 @@
+from hashlib import md5
+import errno
+import os
+import time
+
+from django.conf import settings
+
+POLL_INTERVAL = 0.25
+
+
+def acquire(key):
+    """
+    Takes the lock of the key, returning False when another request in any worker holds it. Locks are files
+    created in settings.SINGLE_FLIGHT_LOCK_DIR, a lock older than settings.SINGLE_FLIGHT_LOCK_TIMEOUT is taken
+    to belong to a request that died and is broken.
+    """
+    path = lock_path(key)
+    for _ in range(2):
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except OSError, e:
+            if e.errno == errno.ENOENT:
+                _make_lock_dir()
+                continue
+            if e.errno != errno.EEXIST:
+                raise
+        if not _is_stale(path):
+            return False
+        release(key)
+    return False
+
+
+def release(key):
+    try:
+        os.remove(lock_path(key))
+    except OSError, e:
+        if e.errno != errno.ENOENT:
+            raise
+
+
+def is_locked(key):
+    return os.path.exists(lock_path(key))
+
+
+def wait_for(key, get, timeout=None):
+    """
+    Waits for the request holding the lock of the key to finish, returning what get returns once it does,
+    or None when get has nothing after timeout seconds, default settings.SINGLE_FLIGHT_WAIT_TIMEOUT.
+    """
+    deadline = time.time() + (settings.SINGLE_FLIGHT_WAIT_TIMEOUT if timeout is None else timeout)
+    while True:
+        locked = is_locked(key)
+        value = get()
+        if value is not None or not locked or time.time() >= deadline:
+            return value
+        time.sleep(POLL_INTERVAL)
+
+
+def lock_path(key):
+    return os.path.join(settings.SINGLE_FLIGHT_LOCK_DIR, md5(key).hexdigest() + '.lock')
+
+
+def _is_stale(path):
+    try:
+        return time.time() - os.path.getmtime(path) > settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+    except OSError:
+        return True
+
+
+def _make_lock_dir():
+    try:
+        os.makedirs(settings.SINGLE_FLIGHT_LOCK_DIR)
+    except OSError, e:
+        if e.errno != errno.EEXIST:
+            raise
@@ -0,0 +1,119 @@
+from cStringIO import StringIO
+from datetime import datetime
+from tempfile import mkstemp
+import json
+import os
+import shutil
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import QueryDict
+
+from countyapi.compression import gzip_compressor
+from countyapi.generation import current_generation
+
+# formats the whole lists are exported in, those asked for most
+SNAPSHOT_FORMATS = ['json', 'jsonp', 'csv']
+
+MANIFEST = 'manifest.json'
+
+
+def export_snapshots(resources):
+    """
+    Exports the whole list of each resource, as an unfiltered limit=0 request would get it, in each of the
+    SNAPSHOT_FORMATS to a gzipped file in settings.SNAPSHOT_DIR, and lists them in its manifest. The files of
+    a scrape generation are kept in a directory of their own, the manifest is replaced once they are all
+    written and the files of older generations are then removed. Returns the manifest.
+    """
+    generation = current_generation()
+    directory = 'generation-%d' % generation
+    manifest = {
+        'generation': generation,
+        'created': datetime.now().isoformat(),
+        'resources': {},
+    }
+    for resource in resources:
+        resource_name = resource._meta.resource_name
+        for short_format in SNAPSHOT_FORMATS:
+            name = os.path.join(directory, '%s.%s.gz' % (resource_name, short_format))
+            path = os.path.join(settings.SNAPSHOT_DIR, name)
+            content_type = write_export(resource, {'format': short_format, 'limit': '0'}, path)
+            manifest['resources'].setdefault(resource_name, {})[short_format] = {
+                'file': name,
+                'content_type': content_type,
+                'bytes': os.path.getsize(path),
+            }
+
+    fd, temporary_name = mkstemp(dir=settings.SNAPSHOT_DIR)
+    with os.fdopen(fd, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    os.rename(temporary_name, os.path.join(settings.SNAPSHOT_DIR, MANIFEST))
+
+    for name in os.listdir(settings.SNAPSHOT_DIR):
+        if name.startswith('generation-') and name != directory:
+            shutil.rmtree(os.path.join(settings.SNAPSHOT_DIR, name), ignore_errors=True)
+    return manifest
+
+
+def write_export(resource, params, path):
+    """
+    Writes the resource's list for the query parameters to the gzipped file at path, a chunk at a time for
+    streamed formats. The file is written under a temporary name and renamed into place. Returns the content
+    type of the list.
+    """
+    request = api_request(resource.get_resource_uri(), params)
+    response = resource.build_list(request)
+    if response.status_code != 200:
+        raise ValueError("Exporting %s?%s responded with %d." %
+                         (request.path, request.META['QUERY_STRING'], response.status_code))
+
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    fd, temporary_name = mkstemp(dir=os.path.dirname(path))
+    try:
+        compressor = gzip_compressor()
+        with os.fdopen(fd, 'wb') as export_file:
+            for chunk in response.streaming_content if response.streaming else [response.content]:
+                export_file.write(compressor.compress(chunk))
+            export_file.write(compressor.flush())
+        os.rename(temporary_name, path)
+    except Exception:
+        os.remove(temporary_name)
+        raise
+    return response['Content-Type']
+
+
+def api_request(path, params):
+    """
+    Returns a GET request for the API path with the query parameters, made without a client.
+    """
+    query = QueryDict('', mutable=True)
+    query.update(params)
+    return WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': query.urlencode(),
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': StringIO(),
+    })
+
+
+def snapshot(resource_name, short_format):
+    """
+    Returns the manifest entry of the resource's whole list exported in the format for the current scrape
+    generation, with the path of its file, or None when it has not been exported.
+    """
+    try:
+        with open(os.path.join(settings.SNAPSHOT_DIR, MANIFEST)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (IOError, ValueError):
+        return None
+    if manifest['generation'] != current_generation():
+        return None
+    entry = manifest['resources'].get(resource_name, {}).get(short_format)
+    if entry is None:
+        return None
+    return dict(entry, path=os.path.join(settings.SNAPSHOT_DIR, entry['file']))
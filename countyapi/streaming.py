@@ -0,0 +1,84 @@
+from uuid import uuid4
+
+from django.db import connections
+
+
+STREAMING_CHUNK_SIZE = 2000
+
+STREAMING_BUFFER_SIZE = 16 * 1024
+
+_SQLITE_MAX_VARIABLES = 999
+
+
+def stream_rows(queryset, chunk_size=STREAMING_CHUNK_SIZE):
+    """
+    Iterates over the rows of a values or values_list queryset without loading the whole result set
+    into memory. On PostgreSQL a named (server side) cursor is used so rows are fetched chunk_size at
+    a time, other databases fall back to QuerySet.iterator().
+    @param queryset: values_list queryset, flat ones yield the single value rather than a tuple
+    @rtype : generator of rows
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        for row in queryset.iterator():
+            yield row
+        return
+
+    flat = getattr(queryset, 'flat', False)
+    sql, params = queryset.query.sql_with_params()
+    connection.cursor()  # makes sure the underlying database connection is open
+    cursor = connection.connection.cursor(name='stream_rows_%s' % uuid4().hex)
+    cursor.itersize = chunk_size
+    try:
+        cursor.execute(sql, params)
+        for row in cursor:
+            yield row[0] if flat else row
+    finally:
+        cursor.close()
+
+
+def stream_objects(queryset, chunk_size=STREAMING_CHUNK_SIZE):
+    """
+    Iterates over the model instances of a queryset, in the queryset's order, holding at most chunk_size of
+    them in memory. The primary keys are walked with stream_rows and each chunk of instances is then loaded
+    with one query, plus one for each of the queryset's prefetch_related lookups.
+    @param queryset: model queryset, which may be ordered and sliced
+    @rtype : generator of model instances
+    """
+    objects = queryset._clone()
+    objects.query.clear_limits()
+    pks = stream_rows(queryset.values_list('pk', flat=True), chunk_size)
+    for chunk in chunks(pks, in_list_size(queryset, chunk_size)):
+        objects_by_pk = objects.in_bulk(chunk)
+        for pk in chunk:
+            if pk in objects_by_pk:
+                yield objects_by_pk[pk]
+
+
+def chunks(rows, chunk_size):
+    """
+    Groups the rows into lists of chunk_size rows, the last list may be shorter.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def in_list_size(queryset, chunk_size=STREAMING_CHUNK_SIZE):
+    """
+    Returns how many values a query on the queryset's database can take in an IN list, at most chunk_size.
+    """
+    if connections[queryset.db].vendor == 'sqlite':
+        return min(chunk_size, _SQLITE_MAX_VARIABLES)
+    return chunk_size
+
+
+def read_file(content, buffer_size=STREAMING_BUFFER_SIZE):
+    with content:
+        for chunk in iter(lambda: content.read(buffer_size), ''):
+            yield chunk
@@ -0,0 +1,59 @@
+import time
+
+from django.core.cache import cache
+from tastypie.throttle import BaseThrottle
+
+from countyapi.cache import generation_key
+
+
+class CostThrottle(BaseThrottle):
+    """
+    Throttles clients by the estimated cost of the lists they have built, see JailResource.request_cost,
+    rather than by the number of their requests. Each client may spend throttle_at in every timeframe, the
+    spending of the current one is kept in the cache shared by all the workers. Requests costing at most
+    free_cost are neither charged nor throttled, and neither are those tastypie checks without a cost.
+
+    A completed scrape starts every client's spending over, as its keys are namespaced by the scrape
+    generation so they are removed with it.
+    """
+
+    def __init__(self, free_cost=0, **kwargs):
+        super(CostThrottle, self).__init__(**kwargs)
+        self.free_cost = free_cost
+
+    def should_be_throttled(self, identifier, cost=0, **kwargs):
+        """
+        Returns the seconds until the client's budget is renewed when the request would take it over budget,
+        otherwise False. A client that has spent nothing may make a request costing more than its budget.
+        """
+        if cost <= self.free_cost:
+            return False
+        window, retry_after = self.window()
+        spent = cache.get(self.spending_key(identifier, window)) or 0
+        if spent and spent + cost > self.throttle_at:
+            return retry_after
+        return False
+
+    def accessed(self, identifier, cost=0, **kwargs):
+        if cost <= self.free_cost:
+            return
+        window, retry_after = self.window()
+        key = self.spending_key(identifier, window)
+        # add and incr, rather than get and set, so the charges of concurrent requests in any worker all count
+        cache.add(key, 0, retry_after)
+        try:
+            cache.incr(key, cost)
+        except ValueError:
+            # the timeframe ended in between
+            cache.add(key, cost, retry_after)
+
+    def window(self):
+        """
+        Returns the number of the current timeframe and the whole seconds left in it.
+        """
+        now = time.time()
+        window = int(now // self.timeframe)
+        return window, max(1, int((window + 1) * self.timeframe - now))
+
+    def spending_key(self, identifier, window):
+        return generation_key('throttle:%s:%d' % (self.convert_identifier_to_key(identifier), window))
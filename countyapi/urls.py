@@ -3,6 +3,9 @@ from tastypie.api import Api
 from countyapi.api import CountyInmateResource, CourtLocationResource, \
     CourtDateResource, HousingLocationResource, HousingHistoryResource, \
     DailyPopulationCountsResource, DailyBookingsCountsResource, ChargesHistoryResource
+from countyapi.batch import batch
+from countyapi.exports import export_download, export_job, export_jobs
+from countyapi.metrics import metrics
 
 v1_api = Api(api_name='1.0')
 v1_api.register(CountyInmateResource())
@@ -14,4 +17,11 @@ v1_api.register(DailyPopulationCountsResource())
 v1_api.register(DailyBookingsCountsResource())
 v1_api.register(ChargesHistoryResource())
 
-urlpatterns = patterns('', url(r'^api/', include(v1_api.urls)))
+urlpatterns = patterns('',
+                       url(r'^api/1.0/batch/$', batch, name='api_batch'),
+                       url(r'^api/1.0/metrics/$', metrics, name='api_metrics'),
+                       url(r'^api/1.0/exports/$', export_jobs, {'api': v1_api}, name='api_export_jobs'),
+                       url(r'^api/1.0/exports/(?P<job_id>\w+)/$', export_job, name='api_export_job'),
+                       url(r'^api/1.0/exports/(?P<job_id>\w+)/download/$', export_download,
+                           name='api_export_download'),
+                       url(r'^api/', include(v1_api.urls)))
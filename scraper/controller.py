@@ -4,6 +4,7 @@ import gevent
 from gevent.queue import Queue
 
 from heartbeat import Heartbeat
+from jail_ids import JailIds
 
 from search_commands import SearchCommands
 from utils import ONE_DAY
@@ -34,7 +35,7 @@ class Controller:
         self._inmates_worker = []
         self._inmates_response = []
         self._start_date_missing_inmates = None
-        self._active_inmate_ids = []
+        self._active_inmate_ids = JailIds()
         self._today = date.today()
 
     def _active_inmates(self):
@@ -44,12 +45,8 @@ class Controller:
     def _debug(self, msg):
         self._monitor.debug('Controller: %s' % msg)
 
-    def _end_index_active_inmate_ids_in_search_window(self):
-        end_date = (self._today - ONE_DAY * (NEW_INMATE_SEARCH_WINDOW_SIZE + 2)).strftime('%Y-%m%d')
-        for i in range(len(self._active_inmate_ids)):
-            if end_date >= self._active_inmate_ids[i][0:9]:
-                return i
-        return len(self._active_inmate_ids)
+    def _active_inmate_ids_in_search_window(self):
+        return self._active_inmate_ids.booked_after(self._today - ONE_DAY * (NEW_INMATE_SEARCH_WINDOW_SIZE + 2))
 
     def find_missing_inmates(self, start_date):
         if not self.is_running:
@@ -100,8 +97,7 @@ class Controller:
         self._debug('find_missing_inmates stopped')
 
     def _find_new_inmates(self):
-        end_index = self._end_index_active_inmate_ids_in_search_window()
-        self._search_commands.find_inmates(exclude_list=self._active_inmate_ids[0:end_index],
+        self._search_commands.find_inmates(exclude_list=self._active_inmate_ids_in_search_window(),
                                            start_date=self._today - ONE_DAY * (NEW_INMATE_SEARCH_WINDOW_SIZE + 1))
 
     def _known_inmates(self):
@@ -170,7 +166,7 @@ class Controller:
                         self._active_inmates()
                     elif msg == self._RECEIVED_ACTIVE_IDS_COMMAND:
                         self._debug('update inmates status')
-                        self._active_inmate_ids = self._inmates_response
+                        self._active_inmate_ids = JailIds.from_ids(self._inmates_response)
                         self._search_commands.update_inmates_status(self._inmates_response)
                     elif msg == self._RECEIVED_RECENTLY_DISCHARGED_INMATES_IDS_COMMAND:
                         self._debug('initiate confirmation search of recently discharged inmates')
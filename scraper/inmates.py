@@ -1,6 +1,8 @@
 
-from utils import ONE_DAY, yesterday
 from concurrent_base import ConcurrentBase
+from jail_ids import JailIds
+
+DISCHARGE_BATCH_SIZE = 500
 
 
 class Inmates(ConcurrentBase):
@@ -9,12 +11,13 @@ class Inmates(ConcurrentBase):
         super(Inmates, self).__init__(monitor)
         self._inmate_class = inmate_class
         self.__raw_inmate_data = raw_inmate_data
+        self._inmates_to_discharge = []
 
     def active_inmates_ids(self, response_queue):
         self._put(self._active_inmates_ids, response_queue)
 
     def _active_inmates_ids(self, response_queue):
-        _send_inmate_ids(response_queue, self._inmate_class.active_inmates())
+        response_queue.put(JailIds.from_ids(self._inmate_class.active_inmates_ids()))
 
     def add(self, inmate_id, inmate_details):
         self._put(self._create_update_inmate, {'inmate_id': inmate_id, 'inmate_details': inmate_details})
@@ -28,31 +31,37 @@ class Inmates(ConcurrentBase):
         self._put(self._discharge, inmate_id)
 
     def _discharge(self, inmate_id):
-        self._inmate_class.discharge(inmate_id, self._monitor)
+        self._inmates_to_discharge.append(inmate_id)
+        if len(self._inmates_to_discharge) >= DISCHARGE_BATCH_SIZE:
+            self._discharge_batch()
+
+    def _discharge_batch(self, args=None):
+        if self._inmates_to_discharge:
+            inmate_ids, self._inmates_to_discharge = self._inmates_to_discharge, []
+            self._inmate_class.discharge(inmate_ids, self._monitor)
+
+    def finish(self):
+        # apply discharges still waiting for a full batch before signalling finished
+        self._put(self._discharge_batch, None)
+        super(Inmates, self).finish()
 
     def known_inmates_ids_starting_with(self, response_queue, start_date):
         self._put(self._known_inmates_ids_starting_with, {'response_queue': response_queue, 'start_date': start_date})
 
     def _known_inmates_ids_starting_with(self, args):
-        known_inmates_ids = []
-        cur_date = args['start_date']
-        the_yesterday = yesterday()
-        while cur_date <= the_yesterday:
-            known_inmates_ids.extend([inmate.jail_id for inmate in self._inmate_class.known_inmates_for_date(cur_date)])
-            cur_date += ONE_DAY
-        args['response_queue'].put(known_inmates_ids)
+        known_inmates_ids = self._inmate_class.known_inmates_ids_starting_with(args['start_date'])
+        args['response_queue'].put(JailIds.from_ids(known_inmates_ids))
 
     def recently_discharged_inmates_ids(self, response_queue):
         self._put(self._recently_discharged_inmates_ids, response_queue)
 
     def _recently_discharged_inmates_ids(self, response_queue):
-        _send_inmate_ids(response_queue, self._inmate_class.recently_discharged_inmates())
+        # applies the discharges still waiting for a full batch before the query, as when each was applied at once;
+        # being seen today they are not among those found
+        self._discharge_batch()
+        response_queue.put(JailIds.from_ids(self._inmate_class.recently_discharged_inmates_ids()))
 
     def update(self, inmate_id, inmate_details):
         self._put(self._create_update_inmate, {'inmate_id': inmate_id, 'inmate_details': inmate_details})
 
 
-def _send_inmate_ids(response_queue, inmates):
-    inmates_ids = [inmate.jail_id for inmate in inmates]
-    response_queue.put(inmates_ids)
-
@@ -0,0 +1,134 @@
+from array import array
+from bisect import bisect_left
+import logging
+
+try:
+    array('q')
+    _TYPECODE = 'q'
+except ValueError:
+    # Python 2 has no 'q' typecode, 'l' is 64 bits on the 64 bit platforms the scraper runs on
+    _TYPECODE = 'l'
+
+_BOOKING_NUMBERS_PER_DAY = 1000
+_DATE_DIVISOR = 10 ** 7
+
+log = logging.getLogger('main')
+
+
+def encode_jail_id(jail_id):
+    """
+    Converts a jail id of the form 'yyyy-mmddNNN' into the integer yyyymmddNNN, raising ValueError when it is
+    not of that form.
+    """
+    if not isinstance(jail_id, basestring) or len(jail_id) != 12 or jail_id[4] != '-' or \
+            not (jail_id[0:4] + jail_id[5:]).isdigit():
+        raise ValueError("'%s' is not a jail id" % (jail_id,))
+    return int(jail_id[0:4] + jail_id[5:])
+
+
+def decode_jail_id(code):
+    return '%04d-%07d' % divmod(code, _DATE_DIVISOR)
+
+
+def _encode_jail_ids(jail_ids):
+    for jail_id in jail_ids:
+        try:
+            yield encode_jail_id(jail_id)
+        except ValueError, e:
+            log.warning('Skipping jail id: %s', e)
+
+
+def _first_code_for(day):
+    return int(day.strftime('%Y%m%d')) * _BOOKING_NUMBERS_PER_DAY
+
+
+def _is_sorted(codes):
+    return all(codes[i] <= codes[i + 1] for i in xrange(len(codes) - 1))
+
+
+class JailIds(object):
+    """
+    Compact, immutable and sorted collection of jail ids.
+
+    The ids are held as yyyymmddNNN integers in an array, oldest booking first, so large exclusion lists
+    take 8 bytes per id and booking date windows are found with a binary search. Slicing and the booking
+    date windows return views onto the same array rather than copies.
+    """
+
+    def __init__(self, codes=None, start=0, stop=None):
+        self._codes = codes if codes is not None else array(_TYPECODE)
+        self._start = start
+        self._stop = len(self._codes) if stop is None else stop
+
+    @staticmethod
+    def from_ids(jail_ids):
+        """
+        Builds the collection from an iterable of jail id strings in any order. Ids that arrive sorted, in
+        either direction, as they do from the Inmate jail id queries, are not sorted again. Malformed ids are
+        logged and left out.
+        """
+        if isinstance(jail_ids, JailIds):
+            return jail_ids
+        codes = array(_TYPECODE, _encode_jail_ids(jail_ids))
+        if not _is_sorted(codes):
+            codes.reverse()
+            if not _is_sorted(codes):
+                codes = array(_TYPECODE, sorted(codes))
+        return JailIds(codes)
+
+    def booked_after(self, day):
+        """
+        Returns the jail ids of the inmates booked after the given day.
+        """
+        return self._view(self._bisect(_first_code_for(day) + _BOOKING_NUMBERS_PER_DAY), self._stop)
+
+    def booked_on(self, day):
+        """
+        Returns the jail ids of the inmates booked on the given day.
+        """
+        first_code = _first_code_for(day)
+        return self._view(self._bisect(first_code), self._bisect(first_code + _BOOKING_NUMBERS_PER_DAY))
+
+    def booking_numbers(self, day):
+        """
+        Returns the set of booking numbers, the NNN part of the jail id, booked on the given day. Used to exclude
+        known inmates from a day's search with constant time lookups.
+        """
+        return set(code % _BOOKING_NUMBERS_PER_DAY for code in self.booked_on(day).codes())
+
+    def codes(self):
+        for i in xrange(self._start, self._stop):
+            yield self._codes[i]
+
+    def _bisect(self, code):
+        return bisect_left(self._codes, code, self._start, self._stop)
+
+    def _view(self, start, stop):
+        return JailIds(self._codes, start, max(start, stop))
+
+    def __contains__(self, jail_id):
+        code = encode_jail_id(jail_id)
+        i = self._bisect(code)
+        return i < self._stop and self._codes[i] == code
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('JailIds slices can not have a step')
+            return self._view(self._start + start, self._start + stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('JailIds index out of range')
+        return decode_jail_id(self._codes[self._start + index])
+
+    def __iter__(self):
+        for code in self.codes():
+            yield decode_jail_id(code)
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __repr__(self):
+        return 'JailIds(%d ids)' % len(self)
@@ -3,6 +3,7 @@ from controller import Controller
 from search_commands import SearchCommands
 from inmates_scraper import InmatesScraper
 from inmates import Inmates
+from countyapi.generation import bump_generation
 from countyapi.inmate import Inmate
 from inmate_details import InmateDetails
 from http import Http
@@ -24,6 +25,7 @@ class Scraper:
         controller.find_missing_inmates(start_date)
         self._debug('waiting for check_for_missing_inmates processing to finish')
         controller.wait_for_finish()
+        bump_generation()
         self._debug('finished check_for_missing_inmates')
 
     def _debug(self, msg):
@@ -40,4 +42,5 @@ class Scraper:
         self._debug('waiting for processing to finish')
         controller.wait_for_finish()
         raw_inmate_data.finish()
+        bump_generation()
         self._debug('finished')
@@ -2,6 +2,7 @@ from datetime import date
 
 from utils import ONE_DAY, yesterday
 from concurrent_base import ConcurrentBase
+from jail_ids import JailIds
 
 MAX_INMATE_NUMBER = 350
 
@@ -35,11 +36,12 @@ class SearchCommands(ConcurrentBase):
                                        'start_date': start_date})
 
     def _find_inmates(self, args):
-        excluded_inmates = set(args['excluded_inmates'])
+        excluded_inmates = JailIds.from_ids(args['excluded_inmates'])
         cur_date = args['start_date']
         while cur_date <= yesterday():
-            for inmate_id in _jail_ids(cur_date, args['number_to_fetch']):
-                if inmate_id not in excluded_inmates:
+            excluded_booking_numbers = excluded_inmates.booking_numbers(cur_date)
+            for booking_number, inmate_id in _jail_ids(cur_date, args['number_to_fetch']):
+                if booking_number not in excluded_booking_numbers:
                     self._inmate_scraper.create_if_exists(inmate_id)
             cur_date += ONE_DAY
         self._notify(self.FINISHED_FIND_INMATES)
@@ -56,5 +58,5 @@ class SearchCommands(ConcurrentBase):
 def _jail_ids(cur_date, number_to_fetch):
     prefix = cur_date.strftime("%Y-%m%d") + '%03d'
     for booking_number in range(1, number_to_fetch + 1):
-        yield prefix % booking_number
+        yield booking_number, prefix % booking_number
 
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Compares how many rows per second each list endpoint serves when built with full_dehydrate and with the
+resources' values plans. Every endpoint is requested as a json page of --limit objects, with and without
+related=1, and timed end to end through the Django test client.
+
+The rows are read from the configured database, which should hold a full scrape:
+
+    USE_POSTGRES=1 PYTHONPATH=. python scripts/benchmark_dehydrate.py --limit 1000
+"""
+
+from datetime import datetime
+import argparse
+import json
+import os
+import timeit
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "countyapi.settings")
+
+from django.test.client import Client
+
+from countyapi.api import JailResource, API_PATH_FORMAT
+
+ENDPOINTS = ['countyinmate', 'courtdate', 'courtlocation', 'housinghistory', 'housinglocation', 'chargeshistory',
+             'dailypopulationcounts', 'dailybookingscounts']
+
+
+def benchmark_dehydrate():
+    parser = argparse.ArgumentParser(description='Compare list rows per second with and without values plans.')
+    parser.add_argument('--limit', action='store', dest='limit', type=int, default=1000,
+                        help='Number of objects in each list page.')
+    parser.add_argument('--runs', action='store', dest='runs', type=int, default=3,
+                        help='Number of times each page is timed.')
+    args = parser.parse_args()
+
+    print('Benchmarking list endpoints - %s' % datetime.now())
+    client = Client()
+    for endpoint in ENDPOINTS:
+        for related in [0, 1]:
+            params = {'format': 'json', 'limit': args.limit, 'related': related}
+            url = API_PATH_FORMAT % endpoint
+            rows = len(json.loads(client.get(url, params).content)['objects'])
+            if not rows:
+                print('%-24s related=%d no rows' % (endpoint, related))
+                continue
+            rates = []
+            for use_values_plan in [False, True]:
+                JailResource.use_values_plan = use_values_plan
+                best = min(timeit.repeat(lambda: client.get(url, params).content, number=1, repeat=args.runs))
+                rates.append(rows / best)
+            print('%-24s related=%d %6d rows: full_dehydrate %9.0f rows/s, values plan %9.0f rows/s, x%.1f' %
+                  (endpoint, related, rows, rates[0], rates[1], rates[1] / rates[0]))
+
+
+if __name__ == '__main__':
+    benchmark_dehydrate()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Measures the whole list exports the nightly scraper.sh primes, built in memory and streamed. For each export
+the time to first byte, the total time, the size and the growth in peak RSS of the process serving it are
+reported.
+
+Each export is served in a forked child process so the peak RSS of one does not hide that of the next. The
+exports are read from the configured database, which should hold a full scrape:
+
+    USE_POSTGRES=1 PYTHONPATH=. python scripts/benchmark_exports.py --export 'format=csv&limit=0'
+"""
+
+from datetime import datetime
+import argparse
+import os
+import resource
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "countyapi.settings")
+
+from django.db import connection
+from django.test.client import Client
+
+from countyapi.api import JailSerializer
+
+INMATE_API = '/api/1.0/countyinmate/'
+EXPORTS = ['format=jsonp&callback=processJSONP&limit=0', 'format=csv&limit=0', 'format=json&limit=0']
+PAGE_SIZE = 4096
+
+
+def current_rss_kb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE / 1024
+
+
+def serve_export(query_string, streamed):
+    if not streamed:
+        JailSerializer.streaming_formats = []
+    start_rss = current_rss_kb()
+    start = time.time()
+    response = Client().get(INMATE_API + '?' + query_string)
+    content = response.streaming_content if response.streaming else [response.content]
+    first_byte = None
+    size = 0
+    for chunk in content:
+        if first_byte is None:
+            first_byte = time.time() - start
+        size += len(chunk)
+    total = time.time() - start
+    peak_rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_rss
+    print('%-45s %-9s first byte %7.2f s, total %7.2f s, %10d bytes, peak RSS growth %8d KB' %
+          (query_string, 'streamed' if streamed else 'buffered', first_byte or total, total, size,
+           peak_rss_growth))
+
+
+def in_child_process(function, *args):
+    connection.close()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            function(*args)
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+
+def benchmark_exports():
+    parser = argparse.ArgumentParser(description='Compare whole list exports built in memory and streamed.')
+    parser.add_argument('--export', action='append', dest='exports',
+                        help='Query string of an export of %s, may be repeated. Defaults to %s.' %
+                             (INMATE_API, ', '.join(EXPORTS)))
+    args = parser.parse_args()
+
+    print('Benchmarking exports - %s' % datetime.now())
+    for query_string in args.exports or EXPORTS:
+        for streamed in [False, True]:
+            in_child_process(serve_export, query_string, streamed)
+
+
+if __name__ == '__main__':
+    benchmark_exports()
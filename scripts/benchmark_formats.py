@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Compares the size and encode time of the inmate list in each of the API's output formats. The inmates are
+dehydrated once and then encoded by each format, so the timings are of the serializer alone. The sizes are
+reported raw and gzipped, as nginx sends them.
+
+The inmates are read from the configured database, which should hold a full scrape:
+
+    USE_POSTGRES=1 PYTHONPATH=. python scripts/benchmark_formats.py --limit 10000
+"""
+
+from datetime import datetime
+import argparse
+import os
+import timeit
+import zlib
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "countyapi.settings")
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test.client import RequestFactory
+
+from countyapi.api import CountyInmateResource, COUNTY_INMATE_URL, META, OBJECTS
+from countyapi.models import CountyInmate
+
+FORMATS = ['json', 'xml', 'csv', 'ndjson', 'msgpack']
+
+
+def dehydrated_inmates(limit):
+    resource = CountyInmateResource()
+    request = RequestFactory().get(COUNTY_INMATE_URL, {'limit': limit})
+    bundles = [resource.full_dehydrate(resource.build_bundle(obj=inmate, request=request), for_list=True)
+               for inmate in CountyInmate.objects.all()[:limit]]
+    data = {META: {'limit': limit, 'offset': 0, 'total_count': len(bundles)}, OBJECTS: bundles}
+    return resource.alter_list_data_to_serialize(request, data)
+
+
+def encode(serializer, data, short_format):
+    encoded = serializer.serialize(data, serializer.content_types[short_format])
+    if hasattr(encoded, 'content'):
+        encoded = encoded.content
+    if isinstance(encoded, unicode):
+        encoded = encoded.encode('utf-8')
+    return encoded
+
+
+def benchmark_formats():
+    parser = argparse.ArgumentParser(description='Compare the size and encode time of the output formats.')
+    parser.add_argument('--limit', action='store', dest='limit', type=int, default=10000,
+                        help='Number of inmates to encode.')
+    parser.add_argument('--runs', action='store', dest='runs', type=int, default=3,
+                        help='Number of times each format is timed.')
+    args = parser.parse_args()
+
+    print('Dehydrating %d inmates - %s' % (args.limit, datetime.now()))
+    data = dehydrated_inmates(args.limit)
+    serializer = CountyInmateResource._meta.serializer
+    for short_format in FORMATS:
+        try:
+            encoded = encode(serializer, data, short_format)
+        except ImproperlyConfigured, e:
+            print('%-8s unavailable, %s' % (short_format, e))
+            continue
+        best = min(timeit.repeat(lambda: encode(serializer, data, short_format), number=1, repeat=args.runs))
+        print('%-8s encode %8.2f ms, %10d bytes, %10d bytes gzipped' %
+              (short_format, best * 1000, len(encoded), len(zlib.compress(encoded, 6))))
+
+
+if __name__ == '__main__':
+    benchmark_formats()
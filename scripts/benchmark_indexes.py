@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Shows the query plans and timings of the hot CountyInmate, ChargesHistory and HousingHistory queries
+with and without the indexes added by migration 0035.
+
+A large synthetic dataset is loaded inside a transaction which is rolled back when the benchmark
+finishes, so the database is left as it was found. Only PostgreSQL is supported because the indexes
+are dropped and restored inside that same transaction.
+
+    USE_POSTGRES=1 PYTHONPATH=. python scripts/benchmark_indexes.py --days 730
+"""
+
+from datetime import date, datetime, time, timedelta
+from importlib import import_module
+import argparse
+import os
+import random
+import timeit
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "countyapi.settings")
+
+from django.db import connection, transaction
+from django.db.models import Q
+from south.db import db
+
+from countyapi.inmate import Inmate
+from countyapi.models import CountyInmate, ChargesHistory, HousingHistory, HousingLocation
+
+query_indexes_migration = import_module('countyapi.migrations.0035_add_query_indexes')
+
+ONE_DAY = timedelta(1)
+INMATES_PER_DAY = 300
+BULK_CREATE_SIZE = 5000
+GENDERS = ['M', 'M', 'M', 'F']
+RACES = ['AS', 'B', 'BK', 'IN', 'LB', 'LW', 'LT', 'W', 'WH']
+HOUSING_LOCATIONS = ['01-', '02-D1-H-2-H', '05-A-1-1-1', '10-B-1', '15-EM', '17-MOMS']
+
+
+def synthetic_inmates(number_days):
+    today = date.today()
+    booking_date = today - ONE_DAY * number_days
+    while booking_date < today:
+        for booking_number in range(1, INMATES_PER_DAY + 1):
+            last_seen = datetime.combine(booking_date + ONE_DAY * random.randint(0, (today - booking_date).days),
+                                         time(random.randint(0, 23)))
+            discharged = last_seen.date() < today - ONE_DAY
+            yield CountyInmate(jail_id=booking_date.strftime('%Y-%m%d') + '%03d' % booking_number,
+                               person_id='%064x' % random.getrandbits(256),
+                               race=random.choice(RACES),
+                               gender=random.choice(GENDERS),
+                               booking_date=booking_date,
+                               last_seen_date=last_seen,
+                               discharge_date_earliest=last_seen if discharged else None,
+                               discharge_date_latest=last_seen + ONE_DAY if discharged else None,
+                               age_at_booking=random.randint(17, 70),
+                               bail_amount=random.choice([None, 1000, 5000, 25000, 100000]),
+                               in_jail=not discharged)
+        booking_date += ONE_DAY
+
+
+def bulk_create(model, objects):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == BULK_CREATE_SIZE:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+def load_synthetic_data(number_days):
+    locations = [HousingLocation.objects.get_or_create(housing_location=location)[0]
+                 for location in HOUSING_LOCATIONS]
+    # last_seen_date is auto_now, turn that off so the synthetic last seen dates are kept
+    last_seen_date_field = CountyInmate._meta.get_field('last_seen_date')
+    last_seen_date_field.auto_now = False
+    try:
+        bulk_create(CountyInmate, synthetic_inmates(number_days))
+    finally:
+        last_seen_date_field.auto_now = True
+    jail_ids = CountyInmate.objects.values_list('jail_id', 'booking_date')
+    bulk_create(ChargesHistory, (ChargesHistory(inmate_id=jail_id, charges='CHARGE %d' % n,
+                                                charges_citation='720 ILCS %d' % n,
+                                                date_seen=booking_date + ONE_DAY * n)
+                                 for jail_id, booking_date in jail_ids.iterator() for n in range(2)))
+    bulk_create(HousingHistory, (HousingHistory(inmate_id=jail_id, housing_location=random.choice(locations),
+                                                housing_date_discovered=booking_date + ONE_DAY * n)
+                                 for jail_id, booking_date in jail_ids.iterator() for n in range(2)))
+    cursor = connection.cursor()
+    for table in ['countyapi_countyinmate', 'countyapi_chargeshistory', 'countyapi_housinghistory']:
+        cursor.execute('ANALYZE %s' % table)
+
+
+def hot_queries():
+    some_day = date.today() - ONE_DAY * 30
+    some_inmate = CountyInmate.objects.filter(booking_date=some_day)[0]
+    return [
+        ('active inmates', Inmate.active_inmates().values('jail_id')),
+        ('recently discharged inmates', Inmate.recently_discharged_inmates().values('jail_id')),
+        ('known inmates for date', Inmate.known_inmates_for_date(some_day).values('jail_id')),
+        ('summaries population for day', CountyInmate.objects.filter(booking_date__lte=some_day).filter(
+            Q(discharge_date_earliest__gt=some_day) | Q(discharge_date_earliest__isnull=True))),
+        ('api in_jail filter', CountyInmate.objects.filter(in_jail=True)[:100]),
+        ('api person_id filter', CountyInmate.objects.filter(person_id=some_inmate.person_id)),
+        ('api gender and race filter', CountyInmate.objects.filter(gender='F', race='LW')[:100]),
+        ('api bail_amount filter', CountyInmate.objects.filter(bail_amount__gte=100000)[:100]),
+        ('latest charge for inmate', ChargesHistory.objects.filter(inmate=some_inmate).order_by('-date_seen')[:1]),
+        ('latest housing for inmate',
+         HousingHistory.objects.filter(inmate=some_inmate).order_by('-housing_date_discovered')[:1]),
+    ]
+
+
+def report(title, queries, runs):
+    print('\n===== %s =====' % title)
+    cursor = connection.cursor()
+    for name, queryset in queries:
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute('EXPLAIN ANALYZE ' + sql, params)
+        plan = '\n    '.join(row[0] for row in cursor.fetchall())
+
+        def run_query():
+            cursor.execute(sql, params)
+            cursor.fetchall()
+        best = min(timeit.repeat(run_query, number=1, repeat=runs))
+        print('\n%s: best of %d runs %.2f ms\n    %s' % (name, runs, best * 1000, plan))
+
+
+def drop_query_indexes():
+    cursor = connection.cursor()
+    for table, columns in query_indexes_migration.QUERY_INDEXES:
+        cursor.execute('DROP INDEX %s' % db.create_index_name(table, columns))
+    for index_name in query_indexes_migration.PARTIAL_INDEXES.keys():
+        cursor.execute('DROP INDEX %s' % index_name)
+
+
+@transaction.commit_manually
+def benchmark_indexes():
+    parser = argparse.ArgumentParser(description='Compare hot query plans with and without the query indexes.')
+    parser.add_argument('--days', action='store', dest='days', type=int, default=365,
+                        help='Number of days of synthetic inmates to load, %d inmates per day.' % INMATES_PER_DAY)
+    parser.add_argument('--runs', action='store', dest='runs', type=int, default=5,
+                        help='Number of times each query is timed.')
+    args = parser.parse_args()
+
+    if connection.vendor != 'postgresql':
+        print('The index benchmark needs PostgreSQL, set USE_POSTGRES=1.')
+        return
+
+    try:
+        print('Loading %d days of synthetic inmates - %s' % (args.days, datetime.now()))
+        load_synthetic_data(args.days)
+        queries = hot_queries()
+
+        with_indexes = transaction.savepoint()
+        drop_query_indexes()
+        report('before: without query indexes', queries, args.runs)
+        transaction.savepoint_rollback(with_indexes)
+
+        report('after: with query indexes', queries, args.runs)
+    finally:
+        transaction.rollback()
+
+
+if __name__ == '__main__':
+    benchmark_indexes()
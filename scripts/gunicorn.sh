@@ -5,6 +5,7 @@ LOGFILE=/home/ubuntu/logs/cookcountyjail.log
 LOGDIR=$(dirname $LOGFILE)
 export CCJ_PRODUCTION=1
 export CACHE_TTL=86400
+export CACHE_SOFT_TTL=3600
 NUM_WORKERS=4
 TIMEOUT=240
 
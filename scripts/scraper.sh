@@ -15,7 +15,6 @@ export DJANGO_SETTINGS_MODULE=countyapi.settings
 PROJECT_DIR=${HOME}'/apps/cookcountyjail'
 SCRIPTS_DIR=${PROJECT_DIR}'/scripts'
 MANAGE='python '${PROJECT_DIR}'/manage.py'
-INMATE_API='http://cookcountyjail.recoveredfactory.net/api/1.0/countyinmate/'
 DB_BACKUPS_DIR=${HOME}/website/1.0/db_backups
 DB_BACKUP_FILE=cookcountyjail-$(date +%Y-%m-%d).json
 SCRAPER_OPTIONS='--verbose'
@@ -48,24 +47,16 @@ echo ${AUDIT_RESULT}
 echo "Generating summaries - `date`"
 ${MANAGE} generate_summaries
 
-echo "Priming the cache - `date`"
+echo "Exporting snapshots - `date`"
+time ${MANAGE} export_snapshots
+
+# nginx would otherwise keep serving the lists of the previous scrape for up to a day
+echo "Purging the nginx cache - `date`"
 sudo -u www-data find /var/www/cache -type f -delete
-time curl -v -L -G -s -o/dev/null -d "format=jsonp&callback=processJSONP&limit=0" ${INMATE_API}
-time curl -v -L -G -s -o/dev/null -d "format=csv&limit=0" ${INMATE_API}
-time curl -v -L -G -s -o/dev/null -d "format=json&limit=0" ${INMATE_API}
 
 # TODO: port the dumpdata command
 echo "Dumping database for `date`"
 ${MANAGE} dumpdata countyapi > ${DB_BACKUPS_DIR}/${DB_BACKUP_FILE}
 (cd ${DB_BACKUPS_DIR} && gzip ${DB_BACKUP_FILE} && ln -sf ${DB_BACKUP_FILE}.gz latest.json.gz)
 
-echo "Restart gunicorn servers for better user experience."
-sudo service cookcountyjail restart
-
-# now wait until server is back up and running before terminating the scraper
-http_code='0'
-while [ "$http_code" != "301" ];do
-  http_code=`curl -o /dev/null --silent --head --write-out '%{http_code}\n' "http://cookcountyjail.recoveredfactory.net/api/1.0/countyinmate?format=json&limit=0&booking_date__exact=2014-03-15"`
-done
-
 echo "Cook County Jail scraper V1.0 finished at `date`"
@@ -0,0 +1,27 @@
+from django.core.cache import cache
+import pytest
+
+from countyapi import metrics
+from countyapi.cache import local_cache
+from countyapi.urls import v1_api
+
+
+@pytest.fixture(autouse=True)
+def fresh_generation(tmpdir, settings, monkeypatch):
+    """
+    Starts every test with empty caches of its own, no locks, counters, snapshots or exports and no scrape
+    having completed, so counts and responses cached by one test are never seen by the next, and the cache in
+    the project is left alone.
+    Requests do not wait for the responses of earlier ones that a test has not read yet.
+    """
+    settings.SCRAPE_GENERATION_FILE = str(tmpdir.join('scrape_generation'))
+    settings.SINGLE_FLIGHT_LOCK_DIR = str(tmpdir.join('locks'))
+    settings.SINGLE_FLIGHT_WAIT_TIMEOUT = 0
+    settings.SNAPSHOT_DIR = str(tmpdir.join('snapshots'))
+    settings.EXPORT_DIR = str(tmpdir.join('exports'))
+    cache_dir = str(tmpdir.join('cache'))
+    settings.CACHES = dict(settings.CACHES, default=dict(settings.CACHES['default'], LOCATION=cache_dir))
+    for backend in [cache] + [resource._meta.cache.cache for resource in v1_api._registry.values()]:
+        monkeypatch.setattr(backend, '_dir', cache_dir)
+    local_cache.clear()
+    metrics.counters.clear()
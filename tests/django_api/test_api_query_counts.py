@@ -0,0 +1,97 @@
+from datetime import date, datetime, timedelta
+import json
+
+from django.core.cache import cache
+from django.test.client import Client
+import pytest
+
+from countyapi.api import JailResource
+from countyapi.cache import local_cache
+from countyapi.models import CountyInmate, CourtDate, CourtLocation, ChargesHistory, HousingHistory, \
+    HousingLocation
+from test_inmate import QueryCounter
+
+ONE_DAY = timedelta(1)
+
+# endpoint -> number of queries a page takes with full_dehydrate and with the values plan. One to count the
+# objects, one to list them and then one per prefetch or per list of related objects.
+QUERIES_PER_PAGE = [
+    ('/api/1.0/countyinmate/', 2, 2),
+    ('/api/1.0/countyinmate/?related=1', 7, 5),
+    ('/api/1.0/courtdate/', 2, 2),
+    ('/api/1.0/courtdate/?related=1', 5, 2),
+    ('/api/1.0/courtlocation/', 2, 2),
+    ('/api/1.0/courtlocation/?related=1', 3, 3),
+    ('/api/1.0/housinghistory/', 2, 2),
+    ('/api/1.0/housinghistory/?related=1', 5, 2),
+    ('/api/1.0/housinglocation/', 2, 2),
+    ('/api/1.0/chargeshistory/', 2, 2),
+    ('/api/1.0/chargeshistory/?related=1', 2, 2),
+]
+
+
+class TestApiQueryCounts:
+
+    """
+        Tests the number of queries the API endpoints make. Things to check:
+
+        - a list page takes the same number of queries however many objects are on it
+        - an inmate's detail view loads the inmate's histories with one query each
+    """
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize(('url', 'full_dehydrate_queries', 'values_plan_queries'), QUERIES_PER_PAGE)
+    def test_list_page_queries(self, url, full_dehydrate_queries, values_plan_queries, monkeypatch):
+        make_inmates_with_histories(2)
+        assert list_page_queries(url) == values_plan_queries
+        make_inmates_with_histories(5, first_booking_number=3)
+        assert list_page_queries(url) == values_plan_queries
+        monkeypatch.setattr(JailResource, 'use_values_plan', False)
+        assert list_page_queries(url) == full_dehydrate_queries
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize(('use_values_plan', 'expected_queries'), [(True, 4), (False, 6)])
+    def test_inmate_detail_queries(self, use_values_plan, expected_queries, monkeypatch):
+        monkeypatch.setattr(JailResource, 'use_values_plan', use_values_plan)
+        jail_ids = make_inmates_with_histories(1)
+        cache.clear()
+        local_cache.clear()
+        with QueryCounter() as counter:
+            response = Client().get('/api/1.0/countyinmate/%s/' % jail_ids[0])
+        inmate = json.loads(response.content)
+        assert len(inmate['court_dates']) == 2
+        assert inmate['court_dates'][0]['location']['location'] == 'Room 101'
+        assert len(inmate['housing_history']) == 2
+        assert len(inmate['charges_history']) == 2
+        assert counter.count == expected_queries
+
+
+def list_page_queries(url):
+    cache.clear()
+    local_cache.clear()
+    with QueryCounter() as counter:
+        response = Client().get(url)
+    assert response.status_code == 200
+    assert json.loads(response.content)['objects']
+    return counter.count
+
+
+def make_inmates_with_histories(number_inmates, first_booking_number=1):
+    booking_date = date.today() - ONE_DAY
+    court_location, _ = CourtLocation.objects.get_or_create(location='Room 101')
+    housing_location, _ = HousingLocation.objects.get_or_create(housing_location='01-')
+    jail_ids = []
+    for booking_number in range(first_booking_number, first_booking_number + number_inmates):
+        jail_id = booking_date.strftime('%Y-%m%d') + '%03d' % booking_number
+        inmate = CountyInmate.objects.create(jail_id=jail_id, booking_date=booking_date)
+        for days in range(2):
+            CourtDate.objects.create(inmate=inmate, location=court_location, date=booking_date + ONE_DAY * days)
+            HousingHistory.objects.create(inmate=inmate, housing_location=housing_location,
+                                          housing_date_discovered=booking_date + ONE_DAY * days)
+            inmate.current_charge = ChargesHistory.objects.create(inmate=inmate, charges='CHARGE %d' % days,
+                                                                  date_seen=booking_date + ONE_DAY * days)
+        inmate.current_housing_location = housing_location
+        inmate.last_seen_date = datetime.now()
+        inmate.save()
+        jail_ids.append(jail_id)
+    return jail_ids
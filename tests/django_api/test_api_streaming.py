@@ -0,0 +1,111 @@
+import json
+
+from django.http import StreamingHttpResponse
+from django.test.client import Client
+import pytest
+
+from countyapi.api import JailSerializer
+from countyapi.models import CountyInmate
+from countyapi.streaming import stream_objects
+from test_api_query_counts import make_inmates_with_histories
+
+INMATES_URL = '/api/1.0/countyinmate/'
+
+
+class TestApiStreaming:
+
+    """
+        Tests the streamed list responses. Things to check:
+
+        - stream_objects keeps the queryset's order and slice however the objects are chunked
+        - whole lists, limit=0, in the streaming formats are streamed with the same content as a buffered page
+        - pages of a list are not streamed
+        - an empty CSV page is an empty body, like an empty streamed list
+        - streamed JSON and JSONP are byte for byte what the buffered serializer produces
+        - newline delimited JSON and MessagePack hold one record per object
+    """
+
+    @pytest.mark.django_db
+    def test_stream_objects_keeps_order_and_slice(self):
+        jail_ids = make_inmates_with_histories(5)
+        inmates = CountyInmate.objects.order_by('-jail_id')
+        assert [inmate.jail_id for inmate in stream_objects(inmates, chunk_size=2)] == list(reversed(jail_ids))
+        assert [inmate.jail_id for inmate in stream_objects(inmates[1:], chunk_size=2)] == \
+            list(reversed(jail_ids))[1:]
+
+    @pytest.mark.django_db
+    def test_csv_whole_list_is_streamed(self):
+        make_inmates_with_histories(5)
+        streamed = Client().get(INMATES_URL, {'format': 'csv', 'limit': 0, 'order_by': 'jail_id'})
+        buffered = Client().get(INMATES_URL, {'format': 'csv', 'limit': 100, 'order_by': 'jail_id'})
+        assert isinstance(streamed, StreamingHttpResponse)
+        assert streamed['Content-Type'].startswith('text/csv')
+        streamed_content = ''.join(streamed.streaming_content)
+        assert len(streamed_content.splitlines()) == 6
+        assert streamed_content == buffered.content
+
+    @pytest.mark.django_db
+    def test_csv_page_is_not_streamed(self):
+        make_inmates_with_histories(2)
+        response = Client().get(INMATES_URL, {'format': 'csv', 'limit': 1})
+        assert not isinstance(response, StreamingHttpResponse)
+        assert len(response.content.splitlines()) == 2
+
+    @pytest.mark.django_db
+    def test_csv_empty_page(self):
+        streamed = Client().get(INMATES_URL, {'format': 'csv', 'limit': 0})
+        buffered = Client().get(INMATES_URL, {'format': 'csv', 'limit': 10})
+        assert buffered.status_code == 200
+        assert buffered.content == ''.join(streamed.streaming_content) == ''
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('params', [
+        {'format': 'json'},
+        {'format': 'json', 'related': 1},
+        {'format': 'jsonp', 'callback': 'processJSONP'},
+    ])
+    def test_json_whole_list_is_streamed(self, params, monkeypatch):
+        make_inmates_with_histories(5)
+        params = dict(params, limit=0, order_by='jail_id')
+        streamed = Client().get(INMATES_URL, params)
+        monkeypatch.setattr(JailSerializer, 'streaming_formats', [])
+        buffered = Client().get(INMATES_URL, params)
+        assert isinstance(streamed, StreamingHttpResponse)
+        assert streamed['Content-Type'] == buffered['Content-Type']
+        assert ''.join(streamed.streaming_content) == buffered.content
+
+    @pytest.mark.django_db
+    def test_jsonp_invalid_callback(self):
+        response = Client().get(INMATES_URL, {'format': 'jsonp', 'callback': 'alert(1);', 'limit': 0})
+        assert response.status_code == 400
+
+    @pytest.mark.django_db
+    def test_ndjson_whole_list_is_streamed(self):
+        make_inmates_with_histories(5)
+        params = {'limit': 0, 'order_by': 'jail_id'}
+        streamed = Client().get(INMATES_URL, dict(params, format='ndjson'))
+        as_json = Client().get(INMATES_URL, dict(params, format='json'))
+        assert isinstance(streamed, StreamingHttpResponse)
+        assert streamed['Content-Type'].startswith('application/x-ndjson')
+        lines = ''.join(streamed.streaming_content).splitlines()
+        assert [json.loads(line) for line in lines] == json.loads(''.join(as_json.streaming_content))['objects']
+
+    @pytest.mark.django_db
+    def test_ndjson_detail(self):
+        jail_ids = make_inmates_with_histories(1)
+        response = Client().get(INMATES_URL + jail_ids[0] + '/', {'format': 'ndjson'})
+        lines = response.content.splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])['jail_id'] == jail_ids[0]
+
+    @pytest.mark.django_db
+    def test_msgpack_whole_list_is_streamed(self):
+        msgpack = pytest.importorskip('msgpack')
+        make_inmates_with_histories(5)
+        params = {'limit': 0, 'order_by': 'jail_id'}
+        streamed = Client().get(INMATES_URL, dict(params, format='msgpack'))
+        as_json = Client().get(INMATES_URL, dict(params, format='json'))
+        assert isinstance(streamed, StreamingHttpResponse)
+        unpacker = msgpack.Unpacker(encoding='utf-8')
+        unpacker.feed(''.join(streamed.streaming_content))
+        assert list(unpacker) == json.loads(''.join(as_json.streaming_content))['objects']
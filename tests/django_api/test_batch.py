@@ -0,0 +1,78 @@
+import json
+
+from django.test.client import Client
+import pytest
+
+from countyapi.batch import BATCH_MAX_REQUESTS
+from test_api_query_counts import make_inmates_with_histories
+
+BATCH_URL = '/api/1.0/batch/'
+
+
+class TestBatch:
+
+    """
+        Tests the batch endpoint. Things to check:
+
+        - the responses come back keyed by name, or by request when a list is posted, and are the same as
+          when the requests are made one at a time
+        - unknown paths get a 404 result without failing the batch
+        - the conditional headers of the batch are not applied to its requests
+        - batches that are malformed, too long or ask for too many objects are bad requests
+    """
+
+    @pytest.mark.django_db
+    def test_named_requests(self):
+        jail_ids = make_inmates_with_histories(3)
+        requests = {
+            'inmates': 'countyinmate/?count_only=1',
+            'first': 'countyinmate/%s/' % jail_ids[0],
+            'locations': '/api/1.0/housinglocation/?limit=10',
+        }
+        results = post({'requests': requests})['results']
+        assert sorted(results.keys()) == ['first', 'inmates', 'locations']
+        assert all(result['status'] == 200 for result in results.values())
+        assert results['inmates']['data']['meta']['total_count'] == 3
+        assert results['first']['data']['jail_id'] == jail_ids[0]
+        assert results['locations']['data'] == get('/api/1.0/housinglocation/?limit=10&format=json')
+
+    @pytest.mark.django_db
+    def test_list_of_requests(self):
+        make_inmates_with_histories(1)
+        results = post(['courtdate/', 'nothere/'])['results']
+        assert results['courtdate/']['data'] == get('/api/1.0/courtdate/?format=json')
+        assert results['nothere/']['status'] == 404
+
+    @pytest.mark.django_db
+    def test_conditions_of_batch_not_applied(self):
+        make_inmates_with_histories(1)
+        etag = Client().get('/api/1.0/courtdate/', {'format': 'json'})['ETag']
+        response = Client().post(BATCH_URL, json.dumps(['courtdate/']), content_type='application/json',
+                                 HTTP_IF_NONE_MATCH=etag)
+        assert json.loads(response.content)['results']['courtdate/']['status'] == 200
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('data', [
+        {'requests': 'countyinmate/'},
+        ['countyinmate/'] * (BATCH_MAX_REQUESTS + 1),
+        ['countyinmate/?limit=0'],
+        ['countyinmate/?limit=1000', 'courtdate/?limit=1000', 'chargeshistory/?limit=1000'],
+        ['/admin/'],
+        ['batch/'],
+    ])
+    def test_bad_batches(self, data):
+        response = Client().post(BATCH_URL, json.dumps(data), content_type='application/json')
+        assert response.status_code == 400
+
+    def test_post_only(self):
+        assert Client().get(BATCH_URL).status_code == 405
+
+
+def post(data):
+    response = Client().post(BATCH_URL, json.dumps(data), content_type='application/json')
+    assert response.status_code == 200
+    return json.loads(response.content)
+
+
+def get(url):
+    return json.loads(Client().get(url).content)
@@ -0,0 +1,144 @@
+from threading import Thread
+import json
+import time
+
+from django.core.cache import cache as shared_cache
+from django.test.client import Client
+import py
+import pytest
+
+from countyapi.cache import LOCAL_ENTRY_SHARE, GenerationCache, local_cache
+from countyapi.generation import bump_generation
+from countyapi.models import CountyInmate
+from test_api_query_counts import make_inmates_with_histories
+from test_inmate import QueryCounter
+
+INMATES_URL = '/api/1.0/countyinmate/'
+
+
+class TestGenerationCache:
+
+    """
+        Tests the cache shared by the workers. Things to check:
+
+        - what one cache sets is seen by another, as it is by another worker
+        - a completed scrape makes everything cached before it unreachable, and removes it
+        - cached details are read again once a scrape completes
+        - the local tier answers hot reads, keeps at most its bytes, evicting the least recently used entries,
+          and is emptied by a completed scrape
+        - conditional GETs are answered with Not Modified, without a query, until a scrape completes
+        - add and incr of the shared cache lose no update made at the same time, and incr keeps the expiry
+    """
+
+    def test_shared_between_caches(self):
+        GenerationCache().set('key', 'value')
+        assert GenerationCache().get('key') == 'value'
+
+    def test_new_generation_invalidates(self):
+        cache = GenerationCache()
+        cache.set('key', 'value')
+        bump_generation()
+        assert cache.get('key') is None
+        cache.set('key', 'new value')
+        assert cache.get('key') == 'new value'
+
+    def test_new_generation_purges_older_ones(self, settings):
+        GenerationCache().set('key', 'value')
+        cache_dir = py.path.local(settings.CACHES['default']['LOCATION'])
+        assert cache_dir.join('generation-0').check(dir=1)
+        bump_generation()
+        assert not cache_dir.join('generation-0').check()
+
+    def test_add_and_incr_are_atomic(self):
+        def charge():
+            for _ in range(25):
+                shared_cache.add('spent', 0, 60)
+                shared_cache.incr('spent', 2)
+        threads = [Thread(target=charge) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert shared_cache.get('spent') == 200
+        assert not shared_cache.add('spent', 0, 60)
+
+    def test_incr_keeps_expiry(self):
+        with pytest.raises(ValueError):
+            shared_cache.incr('spent')
+        shared_cache.add('spent', 1, 1)
+        assert shared_cache.incr('spent', 2) == 3
+        time.sleep(1.1)
+        assert shared_cache.get('spent') is None
+        with pytest.raises(ValueError):
+            shared_cache.incr('spent')
+
+    @pytest.mark.django_db
+    def test_detail_read_again_after_scrape(self):
+        jail_ids = make_inmates_with_histories(1)
+        url = '/api/1.0/countyinmate/%s/' % jail_ids[0]
+        Client().get(url)
+        CountyInmate.objects.filter(jail_id=jail_ids[0]).update(gender='F')
+        with QueryCounter() as counter:
+            assert '"gender": "F"' not in Client().get(url).content
+        assert counter.count == 0
+        bump_generation()
+        assert '"gender": "F"' in Client().get(url).content
+
+    def test_local_tier_answers_hot_reads(self, monkeypatch):
+        cache = GenerationCache()
+        cache.set('key', {'value': 1})
+        monkeypatch.setattr(cache.cache, 'get', lambda *args, **kwargs: pytest.fail('read the shared cache'))
+        value = cache.get('key')
+        assert value == {'value': 1}
+        value['value'] = 2
+        assert cache.get('key') == {'value': 1}
+
+    def test_local_tier_evicts_least_recently_used(self, settings):
+        settings.LOCAL_CACHE_MAX_BYTES = 1000 * LOCAL_ENTRY_SHARE
+        cache = GenerationCache()
+        for key in range(LOCAL_ENTRY_SHARE):
+            cache.set(str(key), 'x' * 900)
+        cache.get('0')
+        cache.set('new', 'x' * 900)
+        cache.set('too big', 'x' * 1000)
+        assert local_cache.size <= settings.LOCAL_CACHE_MAX_BYTES
+        assert set(local_cache.entries) == set(['0', 'new'] + [str(key) for key in range(2, LOCAL_ENTRY_SHARE)])
+        assert cache.get('1') == cache.get('too big')[:900]
+
+    def test_local_tier_emptied_by_new_generation(self):
+        cache = GenerationCache()
+        cache.set('key', 'value')
+        bump_generation()
+        assert cache.get('key') is None
+        assert not local_cache.entries
+
+    def test_hit_ratio_of_each_tier(self):
+        cache = GenerationCache()
+        cache.set('key', 'value')
+        local_cache.clear()
+        for key in ['key', 'key', 'key', 'missing']:
+            cache.get(key)
+        ratios = json.loads(Client().get('/api/1.0/metrics/').content)['hit_ratios']
+        assert ratios == {'local': 0.5, 'shared': 0.5}
+
+    @pytest.mark.django_db
+    def test_not_modified_until_scrape_completes(self):
+        jail_ids = make_inmates_with_histories(1)
+        bump_generation()
+        for url in [INMATES_URL, INMATES_URL + '%s/' % jail_ids[0]]:
+            response = Client().get(url)
+            etag, last_modified = response['ETag'], response['Last-Modified']
+            with QueryCounter() as counter:
+                assert Client().get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+                assert Client().get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+            assert counter.count == 0
+            assert Client().get(url, {'format': 'jsonp'}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+            assert Client().get(url, HTTP_IF_MODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT').status_code == 200
+        bump_generation()
+        assert Client().get(INMATES_URL, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    @pytest.mark.django_db
+    def test_etag_of_each_callback(self):
+        etags = set(Client().get(INMATES_URL, {'format': 'jsonp', 'callback': callback})['ETag']
+                    for callback in ['one', 'two'])
+        assert len(etags) == 2
@@ -16,8 +16,7 @@ class TestCharges:
         - inmate_details
             - inmate_details.charges()
         - django_inmate
-            - inmate.charges_history.all()
-            - inmate.charges_history.latest('foo')
+            - inmate.current_charge
             - inmate.charges_history.create(bar, baz)
         - django_charge
             - charge.charges
@@ -34,8 +33,7 @@ class TestCharges:
         fake_inmate_details.charges.return_value = ''
 
         fake_django_inmate = Mock()
-        fake_django_inmate.charges_history.all.return_value = ['']
-        fake_django_inmate.charges_history.latest.return_value = ''
+        fake_django_inmate.current_charge = None
 
         fake_monitor = Mock()
 
@@ -56,8 +54,7 @@ class TestCharges:
         fake_current_charge.charges_citation = '720 ILCS 5 12-3.2(a)(2) [10418'
 
         fake_django_inmate = Mock()
-        fake_django_inmate.charges_history.all.return_value = [fake_current_charge]
-        fake_django_inmate.charges_history.latest.return_value = fake_current_charge
+        fake_django_inmate.current_charge = fake_current_charge
 
         fake_monitor = Mock()
 
@@ -74,7 +71,7 @@ class TestCharges:
                 '720 ILCS 5 12-3.2(a)(2) [10418\r\n\t  DOMESTIC BTRY/PHYSICAL CONTACT'
 
         fake_django_inmate = Mock()
-        fake_django_inmate.charges_history.all.return_value = []
+        fake_django_inmate.current_charge = None
 
         fake_monitor = Mock()        
 
@@ -82,6 +79,7 @@ class TestCharges:
         charge_under_test.save()
 
         assert fake_django_inmate.charges_history.create.called
+        assert fake_django_inmate.current_charge == fake_django_inmate.charges_history.create.return_value
 
 
     def test_different_raw_charge_results_in_new_charge(self):
@@ -95,8 +93,7 @@ class TestCharges:
         fake_current_charge.charges_citation = '720 ILCS 5 16-1(a)(1)(A) [1114'
         
         fake_django_inmate = Mock()
-        fake_django_inmate.charges_history.all.return_value = [fake_current_charge]
-        fake_django_inmate.charges_history.latest.return_value = fake_current_charge
+        fake_django_inmate.current_charge = fake_current_charge
 
         fake_monitor = Mock()
 
@@ -0,0 +1,101 @@
+from cStringIO import StringIO
+import csv
+import json
+
+from django.test.client import Client
+import pytest
+
+from countyapi.counts import count_cache_key
+from countyapi.generation import bump_generation, current_generation
+from countyapi.models import CountyInmate
+from test_api_query_counts import make_inmates_with_histories
+from test_inmate import QueryCounter
+
+INMATES_URL = '/api/1.0/countyinmate/'
+
+
+class TestCounts:
+
+    """
+        Tests the cached and estimated total_count and count_only requests. Things to check:
+
+        - the scrape generation goes up every time it is bumped
+        - a count is cached until the scrape generation changes
+        - the same filters in another order share the cached count
+        - count=estimate counts exactly on databases without planner estimates
+        - count_only=1 responds with just the count
+    """
+
+    def test_generation(self):
+        assert current_generation() == 0
+        assert bump_generation() == 1
+        assert bump_generation() == 2
+        assert current_generation() == 2
+
+    @pytest.mark.django_db
+    def test_count_cached_until_scrape_completes(self):
+        make_inmates_with_histories(3)
+        assert total_count({'jail_id__contains': '-'}) == 3
+        CountyInmate.objects.create(jail_id='2014-0101001')
+        # another page of the list, which is not cached itself, reuses the count
+        with QueryCounter() as counter:
+            assert total_count({'jail_id__contains': '-', 'offset': 1}) == 3
+        assert counter.count == 1
+        bump_generation()
+        assert total_count({'jail_id__contains': '-', 'offset': 2}) == 4
+
+    @pytest.mark.django_db
+    def test_same_filters_share_count(self):
+        make_inmates_with_histories(3)
+        get_url(INMATES_URL + '?format=json&limit=1&jail_id__contains=-&gender=M&order_by=jail_id')
+        with QueryCounter() as counter:
+            data = get_url(INMATES_URL + '?order_by=-jail_id&gender=M&limit=1&format=json&jail_id__contains=-')
+        assert counter.count == 1
+        assert data['meta']['total_count'] == 0
+        assert count_cache_key(CountyInmate.objects.filter(gender='M')) != \
+            count_cache_key(CountyInmate.objects.filter(gender='F'))
+
+    @pytest.mark.django_db
+    def test_estimate_falls_back_to_exact_count(self):
+        make_inmates_with_histories(3)
+        meta = get({'count': 'estimate', 'limit': 2})['meta']
+        assert meta['total_count'] == 3
+        assert 'total_count_is_estimate' not in meta
+        assert meta['next'] is not None
+
+    @pytest.mark.django_db
+    def test_count_only(self):
+        make_inmates_with_histories(3)
+        with QueryCounter() as counter:
+            data = get({'count_only': 1, 'jail_id__contains': '-'})
+        assert counter.count == 1
+        assert 'objects' not in data
+        assert data['meta']['total_count'] == 3
+
+    @pytest.mark.django_db
+    def test_count_only_csv(self):
+        make_inmates_with_histories(2)
+        response = Client().get(INMATES_URL, {'count_only': 1, 'format': 'csv'})
+        assert response.status_code == 200
+        header, row = list(csv_rows(response.content))
+        assert row[header.index('total_count')] == '2'
+
+
+def get(params):
+    return get_url(INMATES_URL, dict(params, format='json'))
+
+
+def get_url(url, params=None):
+    response = Client().get(url, params or {})
+    assert response.status_code == 200
+    if response.streaming:
+        return json.loads(''.join(response.streaming_content))
+    return json.loads(response.content)
+
+
+def total_count(params):
+    return get(dict(params, limit=1))['meta']['total_count']
+
+
+def csv_rows(content):
+    return csv.reader(StringIO(content))
@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+from importlib import import_module
+import json
+
+from django.test.client import Client
+from mock import Mock
+import pytest
+
+from countyapi.housing_location_info import HousingLocationInfo
+from countyapi.inmate import Inmate
+from countyapi.management.commands import audit_db
+from countyapi.models import ChargesHistory, CountyInmate, HousingHistory, HousingLocation
+
+INMATES_URL = '/api/1.0/countyinmate/'
+
+ONE_DAY = timedelta(1)
+
+JAIL_ID = '2014-0117015'
+
+
+class TestCurrentHousingLocation:
+
+    """
+        Tests the current housing location and charge held on CountyInmate against the database. Things to check:
+
+        - HousingLocationInfo.save makes a newly seen location the current one and takes in_jail from it
+        - a resurrected inmate takes in_jail from its current location, and keeps it when it has none
+        - audit_db counts inmates whose in_jail disagrees with their current location
+        - migration 0037 sets the latest housing location and charge of each inmate
+        - the API filters on the in_jail flag of the current location
+    """
+
+    @pytest.mark.django_db
+    def test_housing_location_info_sets_current_location(self):
+        inmate = CountyInmate.objects.create(jail_id=JAIL_ID)
+        inmate_details = Mock()
+        inmate_details.housing_location.return_value = '15-EM'
+        HousingLocationInfo(inmate, inmate_details, Mock()).save()
+        inmate.save()
+        inmate = CountyInmate.objects.get(jail_id=JAIL_ID)
+        assert inmate.current_housing_location_id == '15-EM'
+        assert not inmate.in_jail
+        assert list(inmate.housing_history.values_list('housing_location', flat=True)) == ['15-EM']
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('location_in_jail, in_jail', [(True, True), (False, False), (None, False)])
+    def test_resurrected_inmate_takes_in_jail_from_current_location(self, location_in_jail, in_jail):
+        inmate = CountyInmate.objects.create(jail_id=JAIL_ID, discharge_date_earliest=date.today() - ONE_DAY,
+                                             discharge_date_latest=date.today(), in_jail=False)
+        if location_in_jail is not None:
+            inmate.current_housing_location = HousingLocation.objects.create(housing_location='01-',
+                                                                             in_jail=location_in_jail)
+            inmate.save()
+        the_inmate = Inmate(JAIL_ID, Mock(), Mock())
+        the_inmate._inmate, created = the_inmate._inmate_record_get_or_create()
+        assert the_inmate._clear_discharged()
+        assert the_inmate._inmate.discharge_date_earliest is None
+        assert the_inmate._inmate.discharge_date_latest is None
+        assert the_inmate._inmate.in_jail == in_jail
+
+    @pytest.mark.django_db
+    def test_audit_db_checks_in_jail_against_current_location(self, monkeypatch, capsys):
+        in_jail_location = HousingLocation.objects.create(housing_location='01-', in_jail=True)
+        out_of_jail_location = HousingLocation.objects.create(housing_location='15-EM', in_jail=False)
+        CountyInmate.objects.create(jail_id='2014-0117001', current_housing_location=in_jail_location)
+        CountyInmate.objects.create(jail_id='2014-0117002', current_housing_location=out_of_jail_location)
+        CountyInmate.objects.create(jail_id='2014-0117003', current_housing_location=out_of_jail_location,
+                                    in_jail=False)
+        CountyInmate.objects.create(jail_id='2014-0117004', in_jail=False)
+        inmate_stats = dict((stat, 0) for stat in [audit_db.NUMBER, audit_db.NO_HOUSING_LOC,
+                                                   audit_db.IN_JAIL_INCORRECT])
+        monkeypatch.setattr(audit_db.Command, 'inmate_stats', inmate_stats)
+        audit_db.Command().handle()
+        capsys.readouterr()
+        assert inmate_stats == {audit_db.NUMBER: 4, audit_db.NO_HOUSING_LOC: 1, audit_db.IN_JAIL_INCORRECT: 2}
+
+    @pytest.mark.django_db
+    def test_migration_sets_latest_location_and_charge(self):
+        booking_date = date.today() - ONE_DAY * 3
+        locations = [HousingLocation.objects.create(housing_location=location) for location in ['01-', '02-']]
+        inmate = CountyInmate.objects.create(jail_id=JAIL_ID, booking_date=booking_date)
+        CountyInmate.objects.create(jail_id='2014-0117016', booking_date=booking_date)
+        for days, location in [(2, locations[1]), (1, locations[0])]:
+            HousingHistory.objects.create(inmate=inmate, housing_location=location,
+                                          housing_date_discovered=booking_date + ONE_DAY * days)
+        charges = [ChargesHistory.objects.create(inmate=inmate, charges='CHARGE %d' % days,
+                                                 date_seen=booking_date + ONE_DAY * days) for days in [2, 1]]
+        migration = import_module('countyapi.migrations.0037_populate_current_housing_location_and_charge')
+        migration.Migration().forwards(None)
+        inmate = CountyInmate.objects.get(jail_id=JAIL_ID)
+        assert inmate.current_housing_location_id == '02-'
+        assert inmate.current_charge_id == charges[0].id
+        inmate = CountyInmate.objects.get(jail_id='2014-0117016')
+        assert inmate.current_housing_location_id is None
+        assert inmate.current_charge_id is None
+
+    @pytest.mark.django_db
+    def test_api_filters_on_current_location_in_jail(self):
+        in_jail_location = HousingLocation.objects.create(housing_location='01-', in_jail=True)
+        out_of_jail_location = HousingLocation.objects.create(housing_location='15-EM', in_jail=False)
+        CountyInmate.objects.create(jail_id='2014-0117001', current_housing_location=in_jail_location)
+        CountyInmate.objects.create(jail_id='2014-0117002', current_housing_location=out_of_jail_location)
+        CountyInmate.objects.create(jail_id='2014-0117003')
+        for in_jail, jail_ids in [('true', ['2014-0117001']), ('false', ['2014-0117002'])]:
+            response = Client().get(INMATES_URL, {'format': 'json', 'limit': 10,
+                                                  'current_housing_location__in_jail': in_jail})
+            assert response.status_code == 200
+            assert [inmate['jail_id'] for inmate in json.loads(response.content)['objects']] == jail_ids
@@ -0,0 +1,117 @@
+import json
+
+from django.test.client import Client
+import pytest
+
+from countyapi import exports, single_flight
+from countyapi.generation import bump_generation
+from countyapi.urls import v1_api
+from test_api_query_counts import make_inmates_with_histories
+from test_single_flight import get_content, gunzip
+
+EXPORTS_URL = '/api/1.0/exports/'
+
+INMATES_URL = '/api/1.0/countyinmate/'
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    """
+    Counts the workers started instead of starting them, jobs are run with run_workers.
+    """
+    started = []
+    monkeypatch.setattr(exports, 'start_worker', lambda: started.append(True))
+    return started
+
+
+class TestExports:
+
+    """
+        Tests the background export jobs. Things to check:
+
+        - a submitted job is pending until a worker runs it, then its export can be downloaded
+        - the same query submitted again gets the same job, until a scrape completes
+        - only one worker runs the jobs at a time, and none is started while one is running
+        - clients are charged for the lists they submit
+        - lists costing more than the foreground limit are redirected to their export job
+    """
+
+    @pytest.mark.django_db
+    def test_job(self, workers):
+        make_inmates_with_histories(2)
+        query = 'countyinmate/?limit=0&related=1&format=csv'
+        expected = get_content(Client().get(INMATES_URL, {'limit': 0, 'related': 1, 'format': 'csv'}))
+        job = submit(query)
+        assert job['status'] == 'pending' and len(workers) == 1
+        assert Client().get(job['url']).status_code == 200
+        assert Client().get(job['url'] + 'download/').status_code == 404
+
+        run_workers()
+        job = json.loads(Client().get(job['url']).content)
+        assert job['status'] == 'done'
+        assert get_content(Client().get(job['download'])) == expected
+        assert gunzip(get_content(Client().get(job['download'], HTTP_ACCEPT_ENCODING='gzip'))) == expected
+
+    @pytest.mark.django_db
+    def test_same_job_until_scrape_completes(self, workers):
+        job = submit('countyinmate/?limit=0&gender=F')
+        assert submit('/api/1.0/countyinmate/?gender=F&limit=0')['id'] == job['id']
+        bump_generation()
+        assert submit('countyinmate/?limit=0&gender=F')['id'] != job['id']
+
+    @pytest.mark.django_db
+    def test_one_worker_at_a_time(self, workers):
+        job = submit('courtdate/?limit=0')
+        single_flight.acquire(exports.WORKER_LOCK)
+        run_workers()
+        assert exports.read_job(job['id'])['status'] == 'pending'
+
+    @pytest.mark.django_db
+    def test_no_worker_started_while_one_runs(self, workers):
+        single_flight.acquire(exports.WORKER_LOCK)
+        submit('courtdate/?limit=0')
+        assert len(workers) == 0
+        single_flight.release(exports.WORKER_LOCK)
+        submit('courtlocation/?limit=0')
+        assert len(workers) == 1
+
+    @pytest.mark.django_db
+    def test_submissions_charged(self, workers, monkeypatch):
+        throttle = v1_api.canonical_resource_for('countyinmate')._meta.throttle
+        monkeypatch.setattr(throttle, 'throttle_at', 5)
+        monkeypatch.setattr(throttle, 'free_cost', 2)
+        make_inmates_with_histories(3)
+        submit('countyinmate/?limit=0&related=1')
+        response = post({'query': 'countyinmate/?limit=0&format=csv'})
+        assert response.status_code == 429 and 'Retry-After' in response
+        assert len(workers) == 1
+        assert post({'query': 'countyinmate/?limit=0&gender__nosuchlookup=F'}).status_code == 400
+
+    @pytest.mark.parametrize('data', [{}, {'query': 'batch/'}, {'query': 'countyinmate/1/'}, ['countyinmate/']])
+    def test_bad_jobs(self, data):
+        assert post(data).status_code == 400
+
+    @pytest.mark.django_db
+    def test_costly_list_redirected(self, settings, workers):
+        make_inmates_with_histories(3)
+        settings.FOREGROUND_COST_LIMIT = 10
+        response = Client().get(INMATES_URL, {'limit': 0, 'related': 1})
+        assert response.status_code == 303
+        job = json.loads(response.content)
+        assert response['Location'].endswith(job['url']) and len(workers) == 1
+        for params in [{'limit': 0}, {'limit': 2, 'related': 1}, {'count_only': 1, 'related': 1}]:
+            assert Client().get(INMATES_URL, params).status_code == 200
+
+
+def submit(query):
+    response = post({'query': query})
+    assert response.status_code == 202
+    return json.loads(response.content)
+
+
+def post(data):
+    return Client().post(EXPORTS_URL, json.dumps(data), content_type='application/json')
+
+
+def run_workers():
+    exports.run_jobs(v1_api)
@@ -0,0 +1,71 @@
+import json
+
+from django.db import connection
+import pytest
+
+from test_api_query_counts import make_inmates_with_histories
+from test_inmate import QueryCounter
+from test_values_plan import assert_same_response, get_content
+
+API = '/api/1.0/'
+
+
+class TestFields:
+
+    """
+        Tests the fields= sparse fieldsets. Things to check:
+
+        - lists and details have just the keys asked for, nested ones included
+        - the columns left out are not read from the database
+        - the values plans and full_dehydrate give the same response
+    """
+
+    @pytest.mark.django_db
+    def test_list_fields(self):
+        make_inmates_with_histories(2)
+        inmates = get('countyinmate/', {'fields': 'jail_id,booking_date,in_jail,gender'})['objects']
+        assert len(inmates) == 2
+        assert all(sorted(inmate.keys()) == ['booking_date', 'gender', 'in_jail', 'jail_id'] for inmate in inmates)
+
+    @pytest.mark.django_db
+    def test_list_projection(self):
+        make_inmates_with_histories(2)
+        with QueryCounter():
+            get('countyinmate/', {'fields': 'jail_id,gender', 'total_count': 0})
+            sql = connection.queries[-1]['sql']
+        assert '"gender"' in sql
+        assert '"race"' not in sql
+
+    @pytest.mark.django_db
+    def test_nested_fields(self):
+        jail_ids = make_inmates_with_histories(1)
+        inmate = get('countyinmate/%s/' % jail_ids[0], {'fields': 'jail_id,housing_history.housing_location'})
+        assert sorted(inmate.keys()) == ['about_this_data', 'housing_history', 'jail_id']
+        assert len(inmate['housing_history']) == 2
+        for housing in inmate['housing_history']:
+            assert housing.keys() == ['housing_location']
+            assert housing['housing_location']['housing_location'] == '01-'
+
+    @pytest.mark.django_db
+    def test_detail_cached_per_fields(self):
+        jail_ids = make_inmates_with_histories(1)
+        url = 'countyinmate/%s/' % jail_ids[0]
+        assert 'gender' not in get(url, {'fields': 'jail_id'})
+        assert 'gender' in get(url, {})
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize(('url', 'params'), [
+        ('countyinmate/', {'fields': 'jail_id,court_dates', 'related': 1}),
+        ('countyinmate/', {'fields': 'jail_id,housing_history.housing_location.in_jail', 'related': 1}),
+        ('courtdate/', {'fields': 'date,location,inmate_jail_id'}),
+        ('courtdate/', {'fields': 'date,inmate.jail_id,inmate.court_dates', 'related': 1}),
+        ('housinghistory/', {'fields': 'housing_location', 'limit': 0}),
+        ('courtlocation/', {'fields': 'location,court_dates.date', 'related': 1, 'format': 'csv'}),
+    ])
+    def test_same_as_full_dehydrate(self, url, params, monkeypatch):
+        make_inmates_with_histories(3)
+        assert_same_response(API + url, dict({'format': 'json'}, **params), monkeypatch)
+
+
+def get(url, params):
+    return json.loads(get_content(API + url, dict(params, format='json')))
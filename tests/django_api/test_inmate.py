@@ -0,0 +1,84 @@
+from datetime import date, datetime, timedelta
+
+from django.core.signals import request_started
+from django.db import connection, reset_queries
+from mock import Mock
+import pytest
+
+from countyapi.inmate import Inmate
+from countyapi.models import CountyInmate
+
+ONE_DAY = timedelta(1)
+
+
+class TestInmate:
+
+    """
+        Tests the jail id queries of the Inmate class against the database. Things to check:
+
+        - the ids come back most recently booked first, which is what the Controller expects
+        - known inmates from a start date up to yesterday are found with a single query
+        - a discharge takes the earliest discharge date from when the inmate was last seen, then marks it seen now
+    """
+
+    @pytest.mark.django_db
+    def test_active_inmates_ids(self):
+        jail_ids = make_inmates(date.today() - ONE_DAY * 3, 3)
+        CountyInmate.objects.filter(jail_id=jail_ids[1]).update(discharge_date_earliest=datetime.now())
+        CountyInmate.objects.update(last_seen_date=datetime.now() - ONE_DAY)
+        assert list(Inmate.active_inmates_ids()) == [jail_ids[2], jail_ids[0]]
+
+    @pytest.mark.django_db
+    def test_known_inmates_ids_starting_with_uses_one_query(self):
+        start_date = date.today() - ONE_DAY * 4
+        jail_ids = make_inmates(start_date - ONE_DAY, 6)
+        with QueryCounter() as counter:
+            known_inmates_ids = list(Inmate.known_inmates_ids_starting_with(start_date))
+        assert known_inmates_ids == list(reversed(jail_ids[1:5]))
+        assert counter.count == 1
+
+    @pytest.mark.django_db
+    def test_discharge(self):
+        jail_ids = make_inmates(date.today() - ONE_DAY * 3, 3)
+        last_seen_date = datetime.now() - ONE_DAY * 2
+        CountyInmate.objects.update(last_seen_date=last_seen_date, in_jail=True)
+        before_discharge = datetime.now()
+        assert Inmate.discharge(jail_ids[:2], Mock()) == 2
+        for inmate in CountyInmate.objects.filter(jail_id__in=jail_ids[:2]):
+            assert not inmate.in_jail
+            assert inmate.discharge_date_earliest == last_seen_date
+            assert inmate.discharge_date_latest >= before_discharge
+            assert inmate.last_seen_date == inmate.discharge_date_latest
+        inmate = CountyInmate.objects.get(jail_id=jail_ids[2])
+        assert inmate.in_jail
+        assert inmate.last_seen_date == last_seen_date
+
+
+class QueryCounter:
+
+    """
+        Counts the queries run inside a with block, including those of requests made with the test client,
+        which would otherwise reset the query log when they start.
+    """
+
+    def __enter__(self):
+        self._use_debug_cursor = connection.use_debug_cursor
+        connection.use_debug_cursor = True
+        request_started.disconnect(reset_queries)
+        self._start = len(connection.queries)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.count = len(connection.queries) - self._start
+        request_started.connect(reset_queries)
+        connection.use_debug_cursor = self._use_debug_cursor
+
+
+def make_inmates(first_booking_date, number_days):
+    jail_ids = []
+    for day in range(number_days):
+        booking_date = first_booking_date + ONE_DAY * day
+        jail_id = booking_date.strftime('%Y-%m%d') + '001'
+        CountyInmate.objects.create(jail_id=jail_id, booking_date=booking_date)
+        jail_ids.append(jail_id)
+    return jail_ids
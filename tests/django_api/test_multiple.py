@@ -0,0 +1,89 @@
+import json
+
+from django.test.client import Client
+import pytest
+
+from countyapi.models import CourtDate
+from test_api_query_counts import make_inmates_with_histories
+from test_inmate import QueryCounter
+from test_values_plan import assert_same_response, get_content
+
+INMATES_URL = '/api/1.0/countyinmate/'
+
+
+class TestMultiple:
+
+    """
+        Tests getting many objects at once from set/. Things to check:
+
+        - the objects come back in the order asked for, the unknown identifiers in not_found
+        - the objects are read with a fixed number of queries however many are asked for
+        - details already cached are reused
+        - long lists of identifiers can be posted
+        - the values plans and full_dehydrate give the same response
+    """
+
+    @pytest.mark.django_db
+    def test_get_multiple(self):
+        jail_ids = make_inmates_with_histories(3)
+        ids = [jail_ids[2], '2014-0101001', jail_ids[0]]
+        data = get(INMATES_URL + 'set/%s/' % ';'.join(ids))
+        assert [inmate['jail_id'] for inmate in data['objects']] == [jail_ids[2], jail_ids[0]]
+        assert data['not_found'] == ['2014-0101001']
+        assert len(data['objects'][0]['court_dates']) == 2
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('number_inmates', [1, 5])
+    def test_get_multiple_queries(self, number_inmates):
+        jail_ids = make_inmates_with_histories(number_inmates)
+        with QueryCounter() as counter:
+            get(INMATES_URL + 'set/%s/' % ';'.join(jail_ids))
+        # one query for the inmates and one for each of their histories
+        assert counter.count == 4
+
+    @pytest.mark.django_db
+    def test_reuses_cached_details(self):
+        jail_ids = make_inmates_with_histories(2)
+        Client().get(INMATES_URL + '%s/' % jail_ids[0])
+        with QueryCounter() as counter:
+            data = json.loads(Client().get(INMATES_URL + 'set/%s/' % jail_ids[0]).content)
+        assert counter.count == 0
+        assert data['objects'][0]['jail_id'] == jail_ids[0]
+
+    @pytest.mark.django_db
+    def test_post_multiple(self):
+        jail_ids = make_inmates_with_histories(3)
+        unknown = ['2013-0101%03d' % number for number in range(1500)]
+        response = Client().post(INMATES_URL + 'set/', json.dumps(unknown + jail_ids),
+                                 content_type='application/json')
+        assert response.status_code == 200
+        data = json.loads(response.content)
+        assert [inmate['jail_id'] for inmate in data['objects']] == jail_ids
+        assert data['not_found'] == unknown
+
+    @pytest.mark.django_db
+    def test_post_not_a_list(self):
+        response = Client().post(INMATES_URL + 'set/', json.dumps({'ids': []}), content_type='application/json')
+        assert response.status_code == 400
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('body, content_type', [
+        ('2014-0101001', 'text/plain'),
+        ('["2014-0101001"', 'application/json'),
+    ])
+    def test_post_not_json(self, body, content_type):
+        response = Client().post(INMATES_URL + 'set/', body, content_type=content_type)
+        assert response.status_code == 400
+
+    @pytest.mark.django_db
+    def test_same_as_full_dehydrate(self, monkeypatch):
+        jail_ids = make_inmates_with_histories(3)
+        assert_same_response(INMATES_URL + 'set/%s;%s/' % (jail_ids[1], jail_ids[0]), {'format': 'json'},
+                             monkeypatch)
+        court_dates = ';'.join(str(pk) for pk in CourtDate.objects.values_list('pk', flat=True))
+        assert_same_response('/api/1.0/courtdate/set/%s;x/' % court_dates, {'format': 'json', 'related': 1},
+                             monkeypatch)
+
+
+def get(url):
+    return json.loads(get_content(url, {'format': 'json'}))
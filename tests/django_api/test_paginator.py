@@ -0,0 +1,88 @@
+import json
+
+from django.test.client import Client
+import pytest
+
+from countyapi.models import CountyInmate, CourtDate
+from test_api_query_counts import make_inmates_with_histories
+from test_inmate import QueryCounter
+
+API = '/api/1.0/'
+
+
+class TestJailPaginator:
+
+    """
+        Tests the cursor and total_count options of the JailPaginator. Things to check:
+
+        - following the next cursors walks the whole collection in the resource ordering, once
+        - the primary key breaks ties in the ordering
+        - total_count=0 leaves out the count but still links the next page
+        - invalid cursors and orderings on nullable fields are bad requests
+    """
+
+    @pytest.mark.django_db
+    def test_cursor_walks_collection(self):
+        jail_ids = make_inmates_with_histories(5)
+        assert walk(API + 'countyinmate/?cursor=&limit=2') == sorted(jail_ids, reverse=True)
+
+    @pytest.mark.django_db
+    def test_cursor_breaks_ties_with_primary_key(self):
+        make_inmates_with_histories(3)
+        court_dates = walk(API + 'courtdate/?cursor=&limit=4&order_by=-date', key='id')
+        expected = CourtDate.objects.order_by('-date', '-id').values_list('id', flat=True)
+        assert court_dates == list(expected)
+
+    @pytest.mark.django_db
+    def test_cursor_page_queries(self):
+        make_inmates_with_histories(5)
+        first_page = get(API + 'countyinmate/?cursor=&limit=2&total_count=0')
+        with QueryCounter() as counter:
+            get(first_page['meta']['next'])
+        # one query for the next cursor and one for the objects
+        assert counter.count == 2
+
+    @pytest.mark.django_db
+    def test_cursor_total_count(self):
+        make_inmates_with_histories(3)
+        assert get(API + 'countyinmate/?cursor=&limit=2')['meta']['total_count'] == 3
+        assert get(API + 'countyinmate/?cursor=&limit=2&total_count=0')['meta']['total_count'] is None
+
+    @pytest.mark.django_db
+    def test_offset_without_total_count(self):
+        make_inmates_with_histories(3)
+        first_page = get(API + 'countyinmate/?limit=2&total_count=false')
+        assert first_page['meta']['total_count'] is None
+        last_page = get(first_page['meta']['next'])
+        assert len(last_page['objects']) == 1
+        assert last_page['meta']['next'] is None
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('url', [
+        'countyinmate/?cursor=not-a-cursor',
+        'countyinmate/?cursor=&order_by=booking_date',
+    ])
+    def test_bad_requests(self, url):
+        CountyInmate.objects.create(jail_id='2014-0101001')
+        assert Client().get(API + url).status_code == 400
+
+    @pytest.mark.django_db
+    def test_cursor_for_other_ordering(self):
+        make_inmates_with_histories(3)
+        cursor_url = get(API + 'courtdate/?cursor=&limit=1&order_by=date')['meta']['next']
+        assert Client().get(cursor_url.replace('order_by=date', 'order_by=inmate')).status_code == 400
+
+
+def get(url):
+    response = Client().get(url)
+    assert response.status_code == 200
+    return json.loads(response.content)
+
+
+def walk(url, key='jail_id'):
+    keys = []
+    while url:
+        page = get(url)
+        keys.extend(obj[key] for obj in page['objects'])
+        url = page['meta']['next']
+    return keys
@@ -0,0 +1,209 @@
+from threading import Timer
+import json
+import os
+import time
+import zlib
+
+from django.http import StreamingHttpResponse
+from django.test.client import Client
+import pytest
+
+from countyapi import single_flight
+from countyapi.metrics import metrics_dir
+from test_api_query_counts import make_inmates_with_histories
+from test_inmate import QueryCounter
+
+INMATES_URL = '/api/1.0/countyinmate/'
+
+
+class TestSingleFlight:
+
+    """
+        Tests the single flight locks and the list cache built on them. Things to check:
+
+        - a lock is held by one request at a time, and broken once it is too old
+        - waiting ends with the value once it is there, or with None when the wait times out
+        - a request that waited in vain builds the list without taking or releasing the lock of another
+        - lists are served from the cache, streamed lists from the file they were written to as they were sent
+        - the same list asked for with parameters in another order, set to their defaults or with another
+          JSONP callback is cached once, and served with the requested callback
+        - lists are cached gzipped, and sent gzipped to the clients accepting it and uncompressed to the others
+        - lists past their soft TTL are served stale while they are rebuilt once, in the background
+        - the cache counters of all the workers are added up
+    """
+
+    def test_lock(self):
+        assert single_flight.acquire('key')
+        assert not single_flight.acquire('key')
+        single_flight.release('key')
+        assert single_flight.acquire('key')
+
+    def test_stale_lock_is_broken(self, settings):
+        assert single_flight.acquire('key')
+        old = time.time() - settings.SINGLE_FLIGHT_LOCK_TIMEOUT - 1
+        os.utime(single_flight.lock_path('key'), (old, old))
+        assert single_flight.acquire('key')
+
+    def test_wait_for(self):
+        values = []
+        single_flight.acquire('key')
+        Timer(0.3, values.append, ['value']).start()
+        assert single_flight.wait_for('key', lambda: values[0] if values else None, timeout=5) == 'value'
+        assert single_flight.wait_for('key', lambda: None, timeout=0.3) is None
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('params', [{'format': 'json', 'limit': 1}, {'format': 'csv', 'limit': 0}])
+    def test_wait_timeout_leaves_lock_to_its_holder(self, params, monkeypatch):
+        make_inmates_with_histories(2)
+        locked = []
+        acquire = single_flight.acquire
+
+        def acquire_held_elsewhere(key):
+            # another worker is building the list
+            assert acquire(key)
+            locked.append(key)
+            return False
+        monkeypatch.setattr(single_flight, 'acquire', acquire_held_elsewhere)
+        response = Client().get(INMATES_URL, params)
+        assert response.status_code == 200
+        get_content(response)
+        assert counters()['list_cache_wait_misses'] == 1
+        assert single_flight.is_locked(locked[0])
+
+    @pytest.mark.django_db
+    def test_list_served_from_cache(self):
+        make_inmates_with_histories(2)
+        first = Client().get(INMATES_URL, {'format': 'json', 'limit': 1})
+        with QueryCounter() as counter:
+            second = Client().get(INMATES_URL, {'limit': 1, 'format': 'json'})
+        assert counter.count == 0
+        assert second.content == first.content
+        assert counters()['list_cache_hits'] >= 1
+
+    @pytest.mark.django_db
+    def test_streamed_list_served_from_file(self, settings):
+        make_inmates_with_histories(3)
+        params = {'format': 'csv', 'limit': 0}
+        first = ''.join(Client().get(INMATES_URL, params).streaming_content)
+        with QueryCounter() as counter:
+            second = Client().get(INMATES_URL, params)
+        assert counter.count == 0
+        assert isinstance(second, StreamingHttpResponse)
+        assert ''.join(second.streaming_content) == first
+        responses_dir = os.path.join(settings.CACHES['default']['LOCATION'], 'generation-0', 'responses')
+        assert len(os.listdir(responses_dir)) == 1
+
+    @pytest.mark.django_db
+    def test_unfinished_stream_is_not_cached(self):
+        make_inmates_with_histories(3)
+        params = {'format': 'csv', 'limit': 0}
+        response = Client().get(INMATES_URL, params)
+        next(iter(response.streaming_content))
+        response.close()
+        with QueryCounter() as counter:
+            ''.join(Client().get(INMATES_URL, params).streaming_content)
+        assert counter.count > 0
+
+    @pytest.mark.django_db
+    def test_same_list_cached_once(self):
+        make_inmates_with_histories(2)
+        first = Client().get(INMATES_URL, {'format': 'json', 'limit': 1})
+        with QueryCounter() as counter:
+            for params in [{'limit': 1, 'format': 'json', 'offset': 0},
+                           {'format': 'json', 'limit': 1, 'count_only': 'false', 'related': 0}]:
+                assert Client().get(INMATES_URL, params).content == first.content
+        assert counter.count == 0
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('limit', [1, 0])
+    def test_jsonp_cached_once_for_all_callbacks(self, limit):
+        make_inmates_with_histories(2)
+        first = get_content(Client().get(INMATES_URL, {'format': 'jsonp', 'limit': limit, 'callback': 'one'}))
+        with QueryCounter() as counter:
+            second = get_content(Client().get(INMATES_URL, {'format': 'jsonp', 'limit': limit, 'callback': 'two'}))
+            default = get_content(Client().get(INMATES_URL, {'format': 'jsonp', 'limit': limit}))
+        assert counter.count == 0
+        assert first.startswith('one(') and second == 'two' + first[len('one'):]
+        assert default == 'callback' + first[len('one'):]
+
+    def test_invalid_callback(self):
+        assert Client().get(INMATES_URL, {'format': 'jsonp', 'callback': 'alert(1);'}).status_code == 400
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('params', [{'format': 'json', 'limit': 1}, {'format': 'csv', 'limit': 0}])
+    def test_list_cached_gzipped(self, params):
+        make_inmates_with_histories(2)
+        built = Client().get(INMATES_URL, params, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        cached = Client().get(INMATES_URL, params, HTTP_ACCEPT_ENCODING='gzip')
+        uncompressed = Client().get(INMATES_URL, params)
+        assert built['Content-Encoding'] == cached['Content-Encoding'] == 'gzip'
+        assert not uncompressed.has_header('Content-Encoding')
+        assert 'Accept-Encoding' in uncompressed['Vary']
+        content = get_content(uncompressed)
+        assert content and gunzip(get_content(built)) == gunzip(get_content(cached)) == content
+        assert built['ETag'] == cached['ETag'] != uncompressed['ETag']
+        not_modified = Client().get(INMATES_URL, params, HTTP_IF_NONE_MATCH=cached['ETag'])
+        assert not_modified.status_code == 304
+
+    @pytest.mark.django_db
+    def test_jsonp_callback_replaced_uncompressed(self):
+        make_inmates_with_histories(1)
+        params = {'format': 'jsonp', 'limit': 1}
+        Client().get(INMATES_URL, params, HTTP_ACCEPT_ENCODING='gzip')
+        response = Client().get(INMATES_URL, dict(params, callback='one'), HTTP_ACCEPT_ENCODING='gzip')
+        assert not response.has_header('Content-Encoding')
+        assert response.content.startswith('one(')
+
+    @pytest.mark.django_db
+    def test_stale_list_served_while_refreshed(self, monkeypatch):
+        refreshes = []
+        monkeypatch.setattr('countyapi.api.cache_soft_ttl', lambda: -1)
+        monkeypatch.setattr('countyapi.api.JailResource.start_refresh', lambda self, refresh: refreshes.append(refresh))
+        make_inmates_with_histories(1)
+        params = {'format': 'json', 'limit': 10}
+        first = Client().get(INMATES_URL, params).content
+        make_inmates_with_histories(1, first_booking_number=2)
+        with QueryCounter() as counter:
+            stale = Client().get(INMATES_URL, params).content
+            Client().get(INMATES_URL, params)
+        assert counter.count == 0
+        assert stale == first
+        assert len(refreshes) == 1
+        refreshes[0]()
+        refreshed = json.loads(Client().get(INMATES_URL, params).content)
+        assert len(refreshed['objects']) == 2
+        assert len(refreshes) == 2
+        assert counters()['list_cache_stale_hits'] >= 3
+
+    @pytest.mark.django_db
+    def test_stale_streamed_list_refreshed(self, monkeypatch):
+        monkeypatch.setattr('countyapi.api.cache_soft_ttl', lambda: -1)
+        monkeypatch.setattr('countyapi.api.JailResource.start_refresh', lambda self, refresh: refresh())
+        make_inmates_with_histories(1)
+        params = {'format': 'csv', 'limit': 0}
+        first = ''.join(Client().get(INMATES_URL, params).streaming_content)
+        make_inmates_with_histories(1, first_booking_number=2)
+        stale = ''.join(Client().get(INMATES_URL, params).streaming_content)
+        refreshed = ''.join(Client().get(INMATES_URL, params).streaming_content)
+        assert stale == first
+        assert len(refreshed.splitlines()) == len(first.splitlines()) + 1
+
+    def test_counters_of_all_workers(self):
+        os.makedirs(metrics_dir())
+        with open(os.path.join(metrics_dir(), '1-other-worker.json'), 'w') as other_worker:
+            json.dump({'list_cache_hits': 5}, other_worker)
+        assert counters()['list_cache_hits'] == 5
+
+
+def get_content(response):
+    if response.streaming:
+        return ''.join(response.streaming_content)
+    return response.content
+
+
+def gunzip(content):
+    return zlib.decompress(content, 16 + zlib.MAX_WBITS)
+
+
+def counters():
+    return json.loads(Client().get('/api/1.0/metrics/').content)['counters']
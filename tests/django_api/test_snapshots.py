@@ -0,0 +1,69 @@
+import json
+import os
+
+from django.core.management import call_command
+from django.test.client import Client
+import pytest
+
+from countyapi import metrics
+from countyapi.generation import bump_generation
+from countyapi.snapshots import MANIFEST, SNAPSHOT_FORMATS
+from test_api_query_counts import make_inmates_with_histories
+from test_inmate import QueryCounter
+from test_single_flight import get_content, gunzip
+
+INMATES_URL = '/api/1.0/countyinmate/'
+
+
+class TestSnapshots:
+
+    """
+        Tests the snapshot exports of the whole lists. Things to check:
+
+        - every resource is exported in every format, and listed in the manifest
+        - unfiltered limit=0 requests are sent the export without a query, the same as the list they replace
+        - filtered requests, and requests once a newer scrape has completed, are not sent the export
+    """
+
+    @pytest.mark.django_db
+    def test_export(self, settings):
+        make_inmates_with_histories(2)
+        bump_generation()
+        call_command('export_snapshots')
+        with open(os.path.join(settings.SNAPSHOT_DIR, MANIFEST)) as manifest_file:
+            manifest = json.load(manifest_file)
+        assert manifest['generation'] == 1
+        assert set(manifest['resources']['countyinmate']) == set(SNAPSHOT_FORMATS)
+        assert len(manifest['resources']) == 8
+        entry = manifest['resources']['countyinmate']['json']
+        with open(os.path.join(settings.SNAPSHOT_DIR, entry['file']), 'rb') as export:
+            assert len(json.loads(gunzip(export.read()))['objects']) == 2
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('params', [{'format': 'json', 'limit': 0}, {'format': 'csv', 'limit': '0'},
+                                        {'format': 'jsonp', 'limit': 0, 'callback': 'one'}])
+    def test_whole_list_sent_from_export(self, params):
+        make_inmates_with_histories(2)
+        built = get_content(Client().get(INMATES_URL, params))
+        call_command('export_snapshots')
+        with QueryCounter() as counter:
+            exported = get_content(Client().get(INMATES_URL, params))
+            gzipped = Client().get(INMATES_URL, params, HTTP_ACCEPT_ENCODING='gzip')
+        assert counter.count == 0
+        assert metrics.counters['snapshot_hits'] == 2
+        assert exported == built
+        if params.get('callback') is None:
+            assert gunzip(get_content(gzipped)) == built
+
+    @pytest.mark.django_db
+    def test_export_not_sent(self):
+        make_inmates_with_histories(2)
+        call_command('export_snapshots')
+        for params in [{'format': 'json', 'limit': 0, 'gender': 'F'}, {'format': 'json', 'limit': 10}]:
+            with QueryCounter() as counter:
+                Client().get(INMATES_URL, params)
+            assert counter.count > 0
+        bump_generation()
+        with QueryCounter() as counter:
+            get_content(Client().get(INMATES_URL, {'format': 'json', 'limit': 0}))
+        assert counter.count > 0
@@ -0,0 +1,67 @@
+from django.test.client import Client
+import pytest
+
+from countyapi import exports
+from countyapi.urls import v1_api
+from test_api_query_counts import make_inmates_with_histories
+
+INMATES_URL = '/api/1.0/countyinmate/'
+
+
+@pytest.fixture
+def throttle(monkeypatch):
+    """
+    Lets clients spend 5 in the hour on the lists of inmates, lists of at most 2 inmates are free.
+    """
+    throttle = v1_api.canonical_resource_for('countyinmate')._meta.throttle
+    monkeypatch.setattr(throttle, 'throttle_at', 5)
+    monkeypatch.setattr(throttle, 'free_cost', 2)
+    return throttle
+
+
+class TestCostThrottle:
+
+    """
+        Tests throttling clients by the cost of the lists they have built. Things to check:
+
+        - a client is throttled once it has spent its budget, and told when to retry
+        - cheap lists, and lists served from the cache, are neither charged nor throttled
+        - every client has a budget of its own
+        - lists redirected to their export job are charged
+    """
+
+    @pytest.mark.django_db
+    def test_throttled_once_budget_spent(self, throttle):
+        make_inmates_with_histories(3)
+        assert get({'format': 'json', 'limit': 0}).status_code == 200
+        response = get({'format': 'csv', 'limit': 0})
+        assert response.status_code == 429
+        assert 0 < int(response['Retry-After']) <= 3600
+
+        assert get({'format': 'json', 'limit': 2}).status_code == 200
+        assert get({'format': 'json', 'limit': 0}).status_code == 200
+        assert get({'format': 'csv', 'limit': 0}, HTTP_X_REAL_IP='10.0.0.2').status_code == 200
+
+    @pytest.mark.django_db
+    def test_cheap_lists_not_charged(self, throttle):
+        make_inmates_with_histories(3)
+        for limit in [1, 2, 1, 2]:
+            assert get({'format': 'json', 'limit': limit, 'offset': 1}).status_code == 200
+        assert get({'format': 'json', 'limit': 0}).status_code == 200
+        assert get({'format': 'csv', 'limit': 3}).status_code == 429
+
+    @pytest.mark.django_db
+    def test_redirected_lists_charged(self, throttle, settings, monkeypatch):
+        monkeypatch.setattr(exports, 'start_worker', lambda: None)
+        settings.FOREGROUND_COST_LIMIT = 4
+        make_inmates_with_histories(3)
+        assert get({'format': 'json', 'limit': 0, 'related': 1}).status_code == 303
+        assert get({'format': 'csv', 'limit': 0}).status_code == 429
+        assert get({'format': 'csv', 'limit': 0, 'related': 1}).status_code == 429
+
+
+def get(params, **extra):
+    response = Client().get(INMATES_URL, params, **extra)
+    if response.streaming:
+        ''.join(response.streaming_content)
+    return response
@@ -0,0 +1,97 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.test.client import Client
+import pytest
+
+from countyapi.api import JailResource
+from countyapi.cache import local_cache
+from countyapi.models import CountyInmate, CourtDate, CourtLocation, ChargesHistory, DailyBookingsCounts, \
+    DailyPopulationCounts, HousingHistory, HousingLocation
+from test_api_query_counts import make_inmates_with_histories
+
+API = '/api/1.0/'
+
+LIST_URLS = ['countyinmate/', 'courtdate/', 'courtlocation/', 'housinghistory/', 'housinglocation/',
+             'chargeshistory/', 'dailypopulationcounts/', 'dailybookingscounts/']
+
+
+class TestValuesPlan:
+
+    """
+        Tests that lists and details built with the values plans are exactly the ones full_dehydrate builds,
+        for every endpoint, with and without related=1, in the buffered and streamed formats.
+    """
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('url', LIST_URLS)
+    @pytest.mark.parametrize('params', [
+        {'format': 'json'},
+        {'format': 'json', 'related': 1},
+        {'format': 'csv'},
+        {'format': 'json', 'limit': 0},
+        {'format': 'json', 'limit': 0, 'related': 1},
+        {'format': 'csv', 'limit': 0},
+    ])
+    def test_list(self, url, params, monkeypatch):
+        make_data()
+        assert_same_response(API + url, dict(params, order_by=ordering(url)), monkeypatch)
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('params', [{}, {'related': 1}])
+    def test_details(self, params, monkeypatch):
+        jail_ids = make_data()
+        details = ['countyinmate/%s/' % jail_ids[0],
+                   'countyinmate/%s/' % jail_ids[-1],
+                   'courtdate/%d/' % CourtDate.objects.all()[0].pk,
+                   'courtlocation/%d/' % CourtLocation.objects.all()[0].pk,
+                   'housinghistory/%d/' % HousingHistory.objects.all()[0].pk,
+                   'housinglocation/%s/' % HousingLocation.objects.all()[0].pk,
+                   'chargeshistory/%d/' % ChargesHistory.objects.all()[0].pk,
+                   'dailypopulationcounts/%d/' % DailyPopulationCounts.objects.all()[0].pk]
+        for url in details:
+            assert_same_response(API + url, dict(params, format='json'), monkeypatch)
+
+    @pytest.mark.django_db
+    def test_detail_not_found(self):
+        cache.clear()
+        local_cache.clear()
+        assert Client().get(API + 'countyinmate/2014-0101001/').status_code == 404
+
+
+def assert_same_response(url, params, monkeypatch):
+    monkeypatch.setattr(JailResource, 'use_values_plan', True)
+    values_plan_content = get_content(url, params)
+    monkeypatch.setattr(JailResource, 'use_values_plan', False)
+    full_dehydrate_content = get_content(url, params)
+    assert values_plan_content == full_dehydrate_content
+
+
+def get_content(url, params):
+    cache.clear()
+    local_cache.clear()
+    response = Client().get(url, params)
+    assert response.status_code == 200
+    if response.streaming:
+        return ''.join(response.streaming_content)
+    return response.content
+
+
+def ordering(url):
+    return {'countyinmate/': 'jail_id', 'courtdate/': ['inmate', 'date'], 'courtlocation/': [],
+            'housinghistory/': ['inmate', 'housing_date_discovered'], 'housinglocation/': 'housing_location',
+            'chargeshistory/': ['inmate', 'date_seen'], 'dailypopulationcounts/': 'booking_date',
+            'dailybookingscounts/': 'booking_date'}[url]
+
+
+def make_data():
+    jail_ids = make_inmates_with_histories(3)
+    CountyInmate.objects.create(jail_id='2014-0101001', booking_date=date(2014, 1, 1), gender='F', race='W',
+                                bail_amount=5000, age_at_booking=30)
+    CourtDate.objects.create(inmate_id=jail_ids[0], location=CourtLocation.objects.create(location='Room 202'),
+                             date=date(2014, 2, 1))
+    HousingHistory.objects.create(inmate_id=jail_ids[0], housing_date_discovered=date(2014, 2, 1),
+                                  housing_location=HousingLocation.objects.create(housing_location='05-A-1-1-1'))
+    DailyPopulationCounts.objects.create(booking_date=date(2014, 1, 1), total=10, female_w=3, male_b=7)
+    DailyBookingsCounts.objects.create(booking_date=date(2014, 1, 1), total=4, male_minors=1)
+    return jail_ids + ['2014-0101001']
@@ -1,8 +1,9 @@
 
+from datetime import date, timedelta
 from gevent.queue import Queue
 from mock import Mock, call
 
-from scraper.inmates import Inmates
+from scraper.inmates import Inmates, DISCHARGE_BATCH_SIZE
 
 
 class TestInmates:
@@ -12,14 +13,13 @@ class TestInmates:
 
     def test_active_inmates_ids(self):
         inmate_class = Mock()
-        j_ids = [j_id for j_id in range(1, 4)]
-        input_values = [make_county_inmate(j_id) for j_id in j_ids]
-        inmate_class.active_inmates.return_value = input_values
+        j_ids = ['2014-0117%03d' % j_id for j_id in range(1, 4)]
+        inmate_class.active_inmates_ids.return_value = iter(j_ids)
         inmates = Inmates(inmate_class, self.__raw_inmate_data, Mock())
         response_q = Queue(1)
         inmates.active_inmates_ids(response_q)
         active_inmates_ids = response_q.get()
-        assert active_inmates_ids == j_ids
+        assert list(active_inmates_ids) == j_ids
         assert self.__raw_inmate_data.call_args_list == []
 
     def test_add_inmate(self):
@@ -41,9 +41,36 @@ class TestInmates:
         inmates = Inmates(inmate_class, self.__raw_inmate_data, monitor)
         inmate__id = 232
         inmates.discharge(inmate__id)
-        assert inmate_class.discharge.call_args_list == [call(inmate__id, monitor)]
+        assert inmate_class.discharge.call_args_list == []
+        inmates.finish()
+        assert inmate_class.discharge.call_args_list == [call([inmate__id], monitor)]
         assert self.__raw_inmate_data.call_args_list == []
 
+    def test_discharge_inmates_in_batches(self):
+        inmate_class = Mock()
+        monitor = Mock()
+        inmates = Inmates(inmate_class, self.__raw_inmate_data, monitor)
+        inmate_ids = range(DISCHARGE_BATCH_SIZE + 2)
+        for inmate_id in inmate_ids:
+            inmates.discharge(inmate_id)
+        assert inmate_class.discharge.call_args_list == [call(inmate_ids[:DISCHARGE_BATCH_SIZE], monitor)]
+        inmates.finish()
+        assert inmate_class.discharge.call_args_list == [call(inmate_ids[:DISCHARGE_BATCH_SIZE], monitor),
+                                                         call(inmate_ids[DISCHARGE_BATCH_SIZE:], monitor)]
+
+    def test_discharge_pending_inmates_before_finding_recently_discharged(self):
+        inmate_class = Mock()
+        monitor = Mock()
+        inmate_class.recently_discharged_inmates_ids.return_value = iter([])
+        inmates = Inmates(inmate_class, self.__raw_inmate_data, monitor)
+        inmate__id = 232
+        inmates.discharge(inmate__id)
+        response_q = Queue(1)
+        inmates.recently_discharged_inmates_ids(response_q)
+        response_q.get()
+        assert inmate_class.mock_calls == [call.discharge([inmate__id], monitor),
+                                        call.recently_discharged_inmates_ids()]
+
     def test_finish(self):
         Inmate_TestDouble.clear_class_vars()
         monitor = Mock()
@@ -52,16 +79,28 @@ class TestInmates:
         assert monitor.notify.call_args_list == [call(inmates.__class__, inmates.FINISHED_PROCESSING)]
         assert self.__raw_inmate_data.call_args_list == []
 
+    def test_known_inmates_ids_starting_with(self):
+        inmate_class = Mock()
+        j_ids = ['2014-0117%03d' % j_id for j_id in range(1, 4)]
+        inmate_class.known_inmates_ids_starting_with.return_value = iter(j_ids)
+        inmates = Inmates(inmate_class, self.__raw_inmate_data, Mock())
+        response_q = Queue(1)
+        start_date = date.today() - timedelta(10)
+        inmates.known_inmates_ids_starting_with(response_q, start_date)
+        known_inmates_ids = response_q.get()
+        assert list(known_inmates_ids) == j_ids
+        assert inmate_class.known_inmates_ids_starting_with.call_args_list == [call(start_date)]
+        assert self.__raw_inmate_data.call_args_list == []
+
     def test_recently_discharged_inmates_ids(self):
         inmate_class = Mock()
-        j_ids = [j_id for j_id in range(1, 4)]
-        input_values = [make_county_inmate(j_id) for j_id in j_ids]
-        inmate_class.recently_discharged_inmates.return_value = input_values
+        j_ids = ['2014-0117%03d' % j_id for j_id in range(1, 4)]
+        inmate_class.recently_discharged_inmates_ids.return_value = iter(j_ids)
         inmates = Inmates(inmate_class, self.__raw_inmate_data, Mock())
         response_q = Queue(1)
         inmates.recently_discharged_inmates_ids(response_q)
         recently_discharged_inmates_ids = response_q.get()
-        assert recently_discharged_inmates_ids == j_ids
+        assert list(recently_discharged_inmates_ids) == j_ids
         assert self.__raw_inmate_data.call_args_list == []
 
     def test_update_inmate(self):
@@ -101,8 +140,3 @@ class Inmate_TestDouble:
     def save(self):
         self.saved_count += 1
 
-
-def make_county_inmate(inmate_id):
-    county_inmate = Mock()
-    county_inmate.jail_id = inmate_id
-    return county_inmate
@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+import pytest
+
+from scraper.jail_ids import JailIds, encode_jail_id, decode_jail_id
+
+ONE_DAY = timedelta(1)
+BOOKING_DATE = date(2014, 1, 17)
+
+
+class TestJailIds:
+
+    def test_encode_decode(self):
+        assert encode_jail_id('2014-0117015') == 20140117015
+        assert decode_jail_id(20140117015) == '2014-0117015'
+
+    def test_from_ids_sorts_oldest_booking_first(self):
+        jail_ids = gen_jail_ids(BOOKING_DATE, 3, 2)
+        for unsorted in [jail_ids, list(reversed(jail_ids)), jail_ids[3:] + jail_ids[:3]]:
+            assert list(JailIds.from_ids(unsorted)) == jail_ids
+
+    def test_from_ids_skips_malformed_ids(self):
+        jail_ids = gen_jail_ids(BOOKING_DATE, 2, 2)
+        malformed = ['', None, '2014-01170', '201401170015', '2014-0117abc']
+        assert list(JailIds.from_ids(jail_ids[:2] + malformed + jail_ids[2:])) == jail_ids
+        for jail_id in malformed:
+            with pytest.raises(ValueError):
+                encode_jail_id(jail_id)
+
+    def test_booked_after(self):
+        jail_ids = gen_jail_ids(BOOKING_DATE, 4, 3)
+        booked_after = JailIds.from_ids(jail_ids).booked_after(BOOKING_DATE + ONE_DAY)
+        assert list(booked_after) == jail_ids[6:]
+        assert list(JailIds.from_ids(jail_ids).booked_after(BOOKING_DATE + ONE_DAY * 5)) == []
+
+    def test_booked_on_and_booking_numbers(self):
+        jail_ids = gen_jail_ids(BOOKING_DATE, 3, 3)
+        del jail_ids[4]
+        the_jail_ids = JailIds.from_ids(jail_ids)
+        assert list(the_jail_ids.booked_on(BOOKING_DATE + ONE_DAY)) == jail_ids[3:5]
+        assert the_jail_ids.booking_numbers(BOOKING_DATE + ONE_DAY) == {1, 3}
+        assert the_jail_ids.booking_numbers(BOOKING_DATE - ONE_DAY) == set()
+
+    def test_contains(self):
+        jail_ids = gen_jail_ids(BOOKING_DATE, 2, 3)
+        the_jail_ids = JailIds.from_ids(jail_ids[1:])
+        assert jail_ids[0] not in the_jail_ids
+        assert all(jail_id in the_jail_ids for jail_id in jail_ids[1:])
+        assert jail_ids[-1] not in the_jail_ids[:-1]
+
+    def test_slicing_shares_storage(self):
+        jail_ids = gen_jail_ids(BOOKING_DATE, 2, 4)
+        the_jail_ids = JailIds.from_ids(jail_ids)
+        a_slice = the_jail_ids[2:-1]
+        assert list(a_slice) == jail_ids[2:-1]
+        assert len(a_slice) == len(jail_ids[2:-1])
+        assert a_slice[0] == jail_ids[2]
+        assert a_slice[-1] == jail_ids[-2]
+        assert a_slice._codes is the_jail_ids._codes
+        with pytest.raises(IndexError):
+            a_slice[len(a_slice)]
+
+
+def gen_jail_ids(first_booking_date, number_days, inmates_per_day):
+    jail_ids = []
+    for day in range(number_days):
+        prefix = (first_booking_date + ONE_DAY * day).strftime('%Y-%m%d')
+        jail_ids.extend(prefix + '%03d' % booking_number for booking_number in range(1, inmates_per_day + 1))
+    return jail_ids